@@ -0,0 +1,85 @@
+"""
+Cold-start import cost of the API module.
+
+Run from apps/api:
+    python -m benchmarks.bench_import_time [--top 15] [--runs 3]
+
+Runs `python -X importtime -c "import main"` in fresh interpreters, prints the
+median wall time and the slowest top-level imports, and fails if any of the
+heavy media/ML packages got imported before a route needed them.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HEAVY = ("torch", "transformers", "sentence_transformers", "av", "scipy", "soundfile")
+
+_API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PROBE = (
+    "import sys, main; "
+    "print(','.join(m for m in %r if m in sys.modules))" % (HEAVY,)
+)
+
+
+def _run_once():
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE],
+        cwd=_API_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    wall = time.perf_counter() - t0
+    return wall, proc.stdout.strip(), proc.stderr
+
+
+def _parse_importtime(stderr: str):
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cum_us, name = line.split(":", 1)[1].split("|")
+        # importtime indents nested imports by two spaces per level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((int(cum_us), int(self_us), depth, name.strip()))
+    return rows
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--top", type=int, default=15)
+    ap.add_argument("--runs", type=int, default=3)
+    args = ap.parse_args()
+
+    walls = []
+    loaded = ""
+    stderr = ""
+    for _ in range(max(1, args.runs)):
+        wall, loaded, stderr = _run_once()
+        walls.append(wall)
+
+    rows = _parse_importtime(stderr)
+    total = next((cum for cum, _, _, name in rows if name == "main"), 0)
+
+    print(f"interpreter + import main: median {statistics.median(walls):.3f}s over {len(walls)} runs")
+    print(f"import main (importtime):  {total / 1e6:.3f}s")
+    print("\nslowest top-level imports (cumulative):")
+    for cum, _, depth, name in sorted((r for r in rows if r[2] <= 1), reverse=True)[: args.top]:
+        print(f"  {cum / 1000:9.1f} ms  {name}")
+
+    if loaded:
+        print(f"\nFAIL: heavy modules imported at startup: {loaded}")
+        return 1
+    print(f"\nOK: none of {', '.join(HEAVY)} imported at startup")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
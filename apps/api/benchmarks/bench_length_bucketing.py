@@ -0,0 +1,112 @@
+"""
+Length-bucketed vs caller-order batching for the text and wav2vec2 embedders.
+
+Run from apps/api:
+    python -m benchmarks.bench_length_bucketing [--texts 512] [--waves 48]
+
+Inputs are a realistic mix: ~80% short posts (5-30 words) and ~20% long bios
+(150-400 words); audio is a mix of 1-12 s clips. Padding ratios are printed
+even when the models are not installed.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from personalens.analyzers.batching import (
+    caller_order_batches,
+    length_bucketed_batches,
+    padding_ratio,
+)
+
+_WORDS = (
+    "team shipped product growth users revenue launch model data pipeline customers "
+    "hiring roadmap platform metrics quarter latency infra research design mentor "
+    "startup scale cloud mobile api backend frontend analytics partner community"
+).split()
+
+
+def make_texts(n: int, seed: int = 0):
+    rnd = random.Random(seed)
+    out = []
+    for _ in range(n):
+        k = rnd.randint(150, 400) if rnd.random() < 0.2 else rnd.randint(5, 30)
+        out.append(" ".join(rnd.choice(_WORDS) for _ in range(k)))
+    return out
+
+
+def make_waves(n: int, sr: int = 16000, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    return [rng.normal(scale=0.1, size=int(sr * rng.uniform(1.0, 12.0))).astype(np.float32) for _ in range(n)]
+
+
+def _timed(fn, repeat: int = 2):
+    best = float("inf")
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def bench_text(n: int):
+    from personalens.analyzers import text_embeddings as te
+
+    texts = make_texts(n)
+    print(f"\n== text: {n} texts ==")
+    try:
+        model = te.get_model()
+        lengths = te._token_counts(model, texts)
+    except Exception as ex:
+        print(f"model unavailable ({ex!r}); using word counts for padding only")
+        model = None
+        lengths = [len(t.split()) for t in texts]
+
+    bs = te._ENCODE_BATCH
+    print(f"padding ratio  caller-order: {padding_ratio(lengths, caller_order_batches(n, bs)):.3f}")
+    print(f"padding ratio  bucketed:     {padding_ratio(lengths, length_bucketed_batches(lengths, bs)):.3f}")
+    if model is None:
+        return
+
+    t_plain, a = _timed(lambda: te._encode(texts, True, bucket_by_length=False))
+    t_bucket, b = _timed(lambda: te._encode(texts, True, bucket_by_length=True))
+    agree = float(np.min(np.sum(a * b, axis=1)))
+    print(f"caller-order: {n / t_plain:8.1f} texts/s")
+    print(f"bucketed:     {n / t_bucket:8.1f} texts/s  (x{t_plain / t_bucket:.2f}, min cosine {agree:.5f})")
+
+
+def bench_wav2vec2(n: int):
+    from personalens.analyzers import wav2vec2_embedder as w2v
+
+    waves = make_waves(n)
+    lengths = [len(w) for w in waves]
+    bs = 8
+    print(f"\n== wav2vec2: {n} clips, batch {bs} ==")
+    print(f"padding ratio  caller-order: {padding_ratio(lengths, caller_order_batches(n, bs)):.3f}")
+    print(f"padding ratio  bucketed:     {padding_ratio(lengths, length_bucketed_batches(lengths, bs)):.3f}")
+    if not w2v.wav2vec2_available():
+        print(f"model unavailable ({w2v.wav2vec2_import_error()})")
+        return
+
+    total_sec = sum(lengths) / 16000.0
+    t_plain, _ = _timed(lambda: w2v.embed_segments_wav2vec2(waves, batch_size=bs, bucket_by_length=False), repeat=1)
+    t_bucket, _ = _timed(lambda: w2v.embed_segments_wav2vec2(waves, batch_size=bs, bucket_by_length=True), repeat=1)
+    print(f"caller-order: {total_sec / t_plain:8.1f} audio-s/s")
+    print(f"bucketed:     {total_sec / t_bucket:8.1f} audio-s/s  (x{t_plain / t_bucket:.2f})")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--texts", type=int, default=512)
+    ap.add_argument("--waves", type=int, default=48)
+    args = ap.parse_args()
+    bench_text(args.texts)
+    bench_wav2vec2(args.waves)
+
+
+if __name__ == "__main__":
+    main()
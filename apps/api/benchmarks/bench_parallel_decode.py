@@ -0,0 +1,76 @@
+"""
+Sequential vs process-parallel (time-sharded) video decoding.
+
+Run from apps/api:
+    python -m benchmarks.bench_parallel_decode [--seconds 120] [--fps 30] [--size 1280x720]
+        [--gop 60] [--bframes 2] [--workers 1,2,4,8] [--file clip.mp4]
+
+Synthesises an H.264 clip with PyAV (unless --file is given), decodes it
+with decode_video_to_frames once per worker count and reports wall time,
+speedup over one worker and whether frames and timestamps are identical to
+the sequential decode. The shard processes are started before timing.
+Worker counts above PERSONALENS_SHARD_WORKERS_MAX (default: CPU count) are
+capped, so set it to compare more workers than CPUs.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.bench_sparse_decode import make_clip
+from personalens.analyzers.video_shift import decode_video_to_frames
+from personalens.workers import shard_executor
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=120.0, help="length of the synthetic clip")
+    ap.add_argument("--fps", type=int, default=30)
+    ap.add_argument("--size", default="1280x720")
+    ap.add_argument("--gop", type=int, default=60)
+    ap.add_argument("--bframes", type=int, default=2)
+    ap.add_argument("--workers", default="1,2,4,8")
+    ap.add_argument("--target-fps", type=float, default=8.0)
+    ap.add_argument("--max-seconds", type=float, default=300.0)
+    ap.add_argument("--file", default=None)
+    args = ap.parse_args()
+
+    counts = [int(v) for v in args.workers.split(",") if v.strip()]
+    path = args.file
+    if path is None:
+        path = tempfile.mktemp(suffix=".mp4")
+        make_clip(path, args.seconds, args.fps, args.size, args.gop, args.bframes)
+        print(f"synthetic {args.size} @ {args.fps} fps, {args.seconds:.0f} s, gop {args.gop}, {args.bframes} B-frames")
+    print(f"{os.cpu_count()} CPUs")
+    try:
+        # start the shard processes so no timing includes spawning them
+        pool = shard_executor(max(counts))
+        list(pool.map(abs, range(4 * max(counts))))
+
+        t0 = time.perf_counter()
+        ref, ref_t, meta = decode_video_to_frames(path, target_fps=args.target_fps, max_seconds=args.max_seconds)
+        t_seq = time.perf_counter() - t0
+        print(f"sequential  {t_seq:6.2f} s  {meta['decoded_frames']} decoded, {meta['kept_frames']} kept")
+
+        for n in counts:
+            t0 = time.perf_counter()
+            frames, times, meta = decode_video_to_frames(
+                path, target_fps=args.target_fps, max_seconds=args.max_seconds, workers=n
+            )
+            dt = time.perf_counter() - t0
+            same = frames.shape == ref.shape and bool(np.array_equal(frames, ref)) and times == ref_t
+            print(
+                f"workers={n:<2d}  {dt:6.2f} s  (x{t_seq / dt:.2f})  shards {meta['shards']}"
+                f"  decoded {meta['decoded_frames']}  identical: {same}"
+            )
+    finally:
+        if args.file is None:
+            os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Single-process vs time-sharded audio shift analysis.
+
+Run from apps/api:
+    python -m benchmarks.bench_sharded_audio [--seconds 600] [--workers 2,4,8]
+        [--model facebook/wav2vec2-base] [--embedding-mode per_window] [--no-embeddings]
+
+Writes the synthetic speech-like signal of bench_wav2vec2_single_pass to a
+WAV file and runs analyze_audio_shift_file once in-process and once per
+worker count with shard_workers. Reports wall time, speedup and whether the
+result is identical to the single-process one. Every worker count is run
+once untimed first so process start-up and model loading are not counted.
+Worker counts above PERSONALENS_SHARD_WORKERS_MAX (default: CPU count) are
+capped, so set it to compare more workers than CPUs.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.bench_wav2vec2_single_pass import make_signal
+from personalens.analyzers.audio_shift import AudioShiftConfig, analyze_audio_shift_file
+
+
+def run(path: str, workers: int, args: argparse.Namespace):
+    t0 = time.perf_counter()
+    with open(path, "rb") as f:
+        res = analyze_audio_shift_file(
+            f,
+            cfg=AudioShiftConfig(shard_sec=args.shard_sec),
+            use_embeddings=not args.no_embeddings,
+            embedding_model=args.model,
+            embedding_mode=args.embedding_mode,
+            shard_workers=workers,
+        )
+    dt = time.perf_counter() - t0
+    res["config"].pop("shardWorkers")
+    res["config"].pop("shardSec")
+    res.pop("memory")  # buffer peaks differ by design
+    return res, dt
+
+
+def main() -> None:
+    import soundfile as sf
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=600.0)
+    ap.add_argument("--workers", default="2,4,8")
+    ap.add_argument("--shard-sec", type=float, default=60.0)
+    ap.add_argument("--model", default="facebook/wav2vec2-base")
+    ap.add_argument("--embedding-mode", default="per_window")
+    ap.add_argument("--no-embeddings", action="store_true")
+    args = ap.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix=".wav")
+    os.close(fd)
+    try:
+        sf.write(path, make_signal(args.seconds), 16000)
+        print(f"{args.seconds:.0f} s audio, {os.cpu_count()} CPUs, embeddings: "
+              f"{'off' if args.no_embeddings else args.embedding_mode}")
+
+        run(path, 1, args)  # load the model in this process
+        ref, t_seq = run(path, 1, args)
+        print(f"single process  {t_seq:7.2f} s  {ref['summary']['segments']} segments")
+        for n in (int(v) for v in args.workers.split(",") if v.strip()):
+            run(path, n, args)
+            res, dt = run(path, n, args)
+            print(f"shard_workers={n:<2d} {dt:7.2f} s  (x{t_seq / dt:.2f})  identical: {res == ref}")
+    finally:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
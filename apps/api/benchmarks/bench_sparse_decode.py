@@ -0,0 +1,89 @@
+"""
+Dense vs sparse video decoding for video shift.
+
+Run from apps/api:
+    python -m benchmarks.bench_sparse_decode [--seconds 60] [--fps 60] [--size 1280x720]
+        [--gop 60] [--bframes 2] [--target-fps 8,1,0.25] [--file clip.mp4]
+
+Synthesises an H.264 clip with PyAV (unless --file is given) and decodes it
+with iter_video_frames once per decode mode and target fps. Reports decoded
+vs kept frames, seeks, wall time and the largest difference between the kept
+timestamps and those of decode_mode="all".
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from personalens.analyzers.video_shift import DECODE_MODES, iter_video_frames
+
+
+def make_clip(path: str, seconds: float, fps: int, size: str, gop: int, bframes: int) -> None:
+    import av
+
+    w, h = (int(v) for v in size.split("x"))
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (h, w, 3), dtype=np.uint8)
+    out = av.open(path, "w")
+    stream = out.add_stream("h264", rate=fps)
+    stream.width, stream.height, stream.pix_fmt = w, h, "yuv420p"
+    stream.codec_context.gop_size = gop
+    stream.codec_context.options = {"bf": str(bframes), "sc_threshold": "0", "preset": "veryfast"}
+    for i in range(int(seconds * fps)):
+        frame = av.VideoFrame.from_ndarray(np.roll(base, 2 * i, axis=1), format="rgb24")
+        for pkt in stream.encode(frame):
+            out.mux(pkt)
+    for pkt in stream.encode():
+        out.mux(pkt)
+    out.close()
+
+
+def run(path: str, mode: str, target_fps: float, max_seconds: float):
+    meta = {}
+    t0 = time.perf_counter()
+    times = [t for t, _ in iter_video_frames(
+        path, target_fps=target_fps, max_seconds=max_seconds, max_frames=10 ** 6, meta=meta, decode_mode=mode
+    )]
+    return times, meta, time.perf_counter() - t0
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=60.0, help="length of the synthetic clip")
+    ap.add_argument("--fps", type=int, default=60)
+    ap.add_argument("--size", default="1280x720")
+    ap.add_argument("--gop", type=int, default=60)
+    ap.add_argument("--bframes", type=int, default=2)
+    ap.add_argument("--target-fps", default="8,1,0.25")
+    ap.add_argument("--max-seconds", type=float, default=300.0)
+    ap.add_argument("--file", default=None)
+    args = ap.parse_args()
+
+    path = args.file
+    if path is None:
+        path = tempfile.mktemp(suffix=".mp4")
+        make_clip(path, args.seconds, args.fps, args.size, args.gop, args.bframes)
+        print(f"synthetic {args.size} @ {args.fps} fps, {args.seconds:.0f} s, gop {args.gop}, {args.bframes} B-frames")
+    try:
+        for target in (float(v) for v in args.target_fps.split(",") if v.strip()):
+            results = {mode: run(path, mode, target, args.max_seconds) for mode in DECODE_MODES}
+            ref, _, t_ref = results["all"]
+            for mode, (times, meta, dt) in results.items():
+                n = min(len(times), len(ref))
+                dev = float(np.abs(np.subtract(times[:n], ref[:n])).max()) if n else 0.0
+                print(
+                    f"target {target:5.2f} fps  {mode:6s}  decoded {meta['decoded_frames']:6d}  kept {meta['kept_frames']:5d}"
+                    f"  seeks {meta['seeks']:4d}  {dt:6.2f} s  {meta['decoded_frames'] / dt:7.1f} decoded fps"
+                    f"  (x{t_ref / dt:.2f})  max |dt| vs all {dev:.3f} s{'' if len(times) == len(ref) else f', {len(times) - len(ref):+d} frames'}"
+                )
+    finally:
+        if args.file is None:
+            os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
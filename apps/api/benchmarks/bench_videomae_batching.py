@@ -0,0 +1,67 @@
+"""
+Per-segment vs batched VideoMAE embedding for video shift.
+
+Run from apps/api:
+    python -m benchmarks.bench_videomae_batching [--seconds 60] [--batch-sizes 1,4,8,16]
+        [--model MCG-NJU/videomae-base] [--file clip.mp4]
+
+Decodes a clip (synthesised with PyAV unless --file is given), builds the
+default 4 s / 2 s segments with 16 frames each, and embeds them once with the
+old per-segment loop (embed_segment_videomae, one forward pass per segment)
+and once per batch size with embed_segments_videomae. Reports segments/s and
+the largest deviation from the per-segment embeddings.
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import time
+
+import numpy as np
+
+from benchmarks.load_media_pool import make_video
+from personalens.analyzers.video_shift import (
+    _to_chw_uint8,
+    _uniform_pick_indices,
+    build_segments,
+    decode_video_to_frames,
+)
+from personalens.analyzers.videomae_embedder import embed_segment_videomae, embed_segments_videomae
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=60.0, help="length of the synthetic clip")
+    ap.add_argument("--file", default=None)
+    ap.add_argument("--model", default="MCG-NJU/videomae-base")
+    ap.add_argument("--batch-sizes", default="1,4,8,16")
+    ap.add_argument("--frames-per-segment", type=int, default=16)
+    args = ap.parse_args()
+
+    src = args.file or io.BytesIO(make_video(args.seconds))
+    frames, times, meta = decode_video_to_frames(src)
+    segs = build_segments(times, window_sec=4.0, hop_sec=2.0)
+    clips = []
+    for s in segs:
+        pick = _uniform_pick_indices(len(s.frame_indices), args.frames_per_segment)
+        clips.append([_to_chw_uint8(frames[s.frame_indices[j]]) for j in pick])
+
+    # load + warm the model so no timing includes it
+    embed_segment_videomae(clips[0], model_name=args.model)
+
+    t0 = time.perf_counter()
+    ref = np.stack([embed_segment_videomae(c, model_name=args.model) for c in clips], axis=0)
+    t_loop = time.perf_counter() - t0
+
+    print(f"{meta['duration_s_est']:.0f} s video, {len(segs)} segments x {args.frames_per_segment} frames")
+    print(f"per-segment loop:  {t_loop:7.2f} s  {len(segs) / t_loop:6.2f} seg/s")
+    for bs in (int(b) for b in args.batch_sizes.split(",") if b.strip()):
+        t0 = time.perf_counter()
+        E = embed_segments_videomae(clips, model_name=args.model, batch_size=bs)
+        dt = time.perf_counter() - t0
+        diff = float(np.abs(E - ref).max())
+        print(f"batch_size={bs:<3d}      {dt:7.2f} s  {len(segs) / dt:6.2f} seg/s  (x{t_loop / dt:.2f})  max |diff| {diff:.2e}")
+
+
+if __name__ == "__main__":
+    main()
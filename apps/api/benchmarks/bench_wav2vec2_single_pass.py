@@ -0,0 +1,96 @@
+"""
+Per-window vs single-pass wav2vec2 encoding for audio shift.
+
+Run from apps/api:
+    python -m benchmarks.bench_wav2vec2_single_pass [--seconds 120] [--model facebook/wav2vec2-base]
+
+Builds a synthetic speech-like signal (gliding harmonics, amplitude
+modulation, pauses, noise), segments it with the default 4 s / 2 s grid and
+embeds the windows both ways. Reports wall time, per-window cosine between
+the two embeddings and how well the resulting embeddingDistance values agree
+(Pearson r, and overlap of the top-10% most distant windows). Also checks
+that single-pass gives the same embeddings with batch_size=1 and 4.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from personalens.analyzers.audio_shift import AudioShiftConfig, _segments
+from personalens.analyzers.wav2vec2_embedder import (
+    embed_segments_wav2vec2,
+    embed_windows_wav2vec2,
+    wav2vec2_available,
+    wav2vec2_import_error,
+)
+
+
+def make_signal(seconds: float, sr: int = 16000, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sr)) / sr
+    f0 = 140.0 + 40.0 * np.sin(2 * np.pi * t / 7.0) + 25.0 * (t > seconds / 2)
+    phase = 2 * np.pi * np.cumsum(f0) / sr
+    x = sum(np.sin(k * phase) / k for k in range(1, 6))
+    x *= 0.6 + 0.4 * np.sin(2 * np.pi * 3.0 * t)  # syllable-rate envelope
+    x[(t % 6.0) > 5.3] = 0.0  # pauses
+    x += 0.02 * rng.normal(size=t.size)
+    return (0.2 * x).astype(np.float32)
+
+
+def _distances(mat: np.ndarray, baseline_idx) -> np.ndarray:
+    c = mat[baseline_idx].mean(axis=0)
+    c = c / (np.linalg.norm(c) + 1e-8)
+    return 1.0 - mat @ c
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=120.0)
+    ap.add_argument("--model", default="facebook/wav2vec2-base")
+    ap.add_argument("--chunk-sec", type=float, default=30.0)
+    args = ap.parse_args()
+
+    if not wav2vec2_available():
+        print(f"wav2vec2 unavailable: {wav2vec2_import_error()}")
+        return
+
+    cfg = AudioShiftConfig()
+    sr = cfg.target_sr
+    x = make_signal(args.seconds, sr)
+    segs = _segments(x, sr, cfg.window_sec, cfg.hop_sec)
+    baseline_idx = [k for k, (_, b) in enumerate(segs) if b <= int(cfg.baseline_sec * sr)] or [0, 1]
+
+    # load + warm the model so neither timing includes it
+    embed_segments_wav2vec2([x[:sr]], sr=sr, model_name=args.model)
+
+    t0 = time.perf_counter()
+    per_window, _ = embed_segments_wav2vec2([x[a:b] for a, b in segs], sr=sr, model_name=args.model)
+    t_window = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    single, _ = embed_windows_wav2vec2(x, segs, sr=sr, model_name=args.model, chunk_sec=args.chunk_sec)
+    t_single = time.perf_counter() - t0
+
+    single_b1, _ = embed_windows_wav2vec2(x, segs, sr=sr, model_name=args.model, chunk_sec=args.chunk_sec, batch_size=1)
+    batch_diff = float(np.abs(single - single_b1).max())
+
+    cos = np.sum(per_window * single, axis=1)
+    d_w = _distances(per_window, baseline_idx)
+    d_s = _distances(single, baseline_idx)
+    r = float(np.corrcoef(d_w, d_s)[0, 1]) if len(segs) > 2 else 1.0
+    k = max(1, len(segs) // 10)
+    top_w = set(np.argsort(-d_w)[:k].tolist())
+    top_s = set(np.argsort(-d_s)[:k].tolist())
+
+    print(f"{args.seconds:.0f} s audio, {len(segs)} windows ({cfg.window_sec} s / {cfg.hop_sec} s hop)")
+    print(f"per-window:  {t_window:7.2f} s")
+    print(f"single-pass: {t_single:7.2f} s  (x{t_window / t_single:.2f})")
+    print(f"cosine(per-window, single-pass)  mean {cos.mean():.4f}  min {cos.min():.4f}")
+    print(f"single-pass batch_size=4 vs 1  max |diff| {batch_diff:.2e}")
+    print(f"embeddingDistance  pearson r {r:.3f}  top-{k} overlap {len(top_w & top_s)}/{k}")
+
+
+if __name__ == "__main__":
+    main()
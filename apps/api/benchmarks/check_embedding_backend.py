@@ -0,0 +1,69 @@
+"""
+Agreement check for a non-reference text embedding backend.
+
+Run from apps/api:
+    python -m benchmarks.check_embedding_backend --backend torch-int8
+    python -m benchmarks.check_embedding_backend --backend onnx --min-cosine 0.995
+
+Encodes the fixture corpus with the fp32 torch reference and with the chosen
+backend, then reports per-text cosine agreement, the largest change in
+similarity-to-centroid (what drift/reasons/clusters consume) and encode
+throughput. Exits non-zero if the minimum cosine is below --min-cosine.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from personalens.analyzers import text_embeddings as te
+from personalens.analyzers.vector_math import similarities, unit_centroid
+
+_FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "text_corpus.txt")
+
+
+def _load_corpus(path: str):
+    with open(path, encoding="utf-8") as fh:
+        return [line.strip() for line in fh if line.strip()]
+
+
+def _encode_timed(model, texts):
+    te._encode(texts[:4], True, model=model)  # warm up
+    t0 = time.perf_counter()
+    mat = te._encode(texts, True, model=model)
+    return mat, time.perf_counter() - t0
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--backend", default="torch-int8", choices=[b for b in te.BACKENDS if b != "torch"])
+    ap.add_argument("--corpus", default=_FIXTURE)
+    ap.add_argument("--min-cosine", type=float, default=0.98)
+    args = ap.parse_args()
+
+    texts = _load_corpus(args.corpus)
+    ref, t_ref = _encode_timed(te.load_model("torch"), texts)
+    cand, t_cand = _encode_timed(te.load_model(args.backend), texts)
+
+    cos = np.sum(ref * cand, axis=1)
+    sim_ref = similarities(ref, unit_centroid(ref))
+    sim_cand = similarities(cand, unit_centroid(cand))
+    worst = int(np.argmin(cos))
+
+    print(f"corpus: {len(texts)} texts  backend: {args.backend}")
+    print(f"cosine vs fp32    mean {cos.mean():.5f}  min {cos.min():.5f}  (text #{worst})")
+    print(f"sim-to-centroid   max abs diff {np.max(np.abs(sim_ref - sim_cand)):.5f}")
+    print(f"throughput        fp32 {len(texts) / t_ref:.1f}/s  {args.backend} {len(texts) / t_cand:.1f}/s")
+
+    if float(cos.min()) < args.min_cosine:
+        print(f"FAIL: min cosine {cos.min():.5f} < {args.min_cosine}")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
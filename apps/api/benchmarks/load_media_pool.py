@@ -0,0 +1,194 @@
+"""
+Text-endpoint latency while media analyses run.
+
+Run from apps/api:
+    python -m benchmarks.load_media_pool [--kind video|audio] [--file clip.mp4] [--jobs 4]
+        [--pool thread|process] [--workers 1] [--seconds 20]
+
+Starts `uvicorn main:app` on a free port with the given PERSONALENS_MEDIA_POOL
+/ PERSONALENS_<KIND>_WORKERS, measures /analyze/text and /health latency on an
+idle server, then again while `--jobs` media uploads are in flight. With the
+analyses in a worker pool the two distributions should match; 429s are jobs
+turned away by PERSONALENS_<KIND>_MAX_PENDING.
+
+Without --file a clip is synthesised locally (H.264 via PyAV for video, a WAV
+for audio). Video needs the VideoMAE weights; audio runs with
+use_embeddings=false so it needs no model at all.
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import List, Tuple
+
+import httpx
+import numpy as np
+
+_API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TEXT = {"text": "I led the migration of 40 services to Kubernetes in Q3 and cut p95 latency by 35%."}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def make_video(seconds: float, fps: int = 30, size: Tuple[int, int] = (320, 240)) -> bytes:
+    import av
+
+    w, h = size
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (h, w, 3), dtype=np.uint8)
+    path = tempfile.mktemp(suffix=".mp4")
+    try:
+        out = av.open(path, "w")
+        stream = out.add_stream("h264", rate=fps)
+        stream.width, stream.height, stream.pix_fmt = w, h, "yuv420p"
+        for i in range(int(seconds * fps)):
+            frame = av.VideoFrame.from_ndarray(np.roll(base, 2 * i, axis=1), format="rgb24")
+            for pkt in stream.encode(frame):
+                out.mux(pkt)
+        for pkt in stream.encode():
+            out.mux(pkt)
+        out.close()
+        with open(path, "rb") as f:
+            return f.read()
+    finally:
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+def make_audio(seconds: float, sr: int = 16000) -> bytes:
+    import soundfile as sf
+
+    from benchmarks.bench_wav2vec2_single_pass import make_signal
+
+    buf = io.BytesIO()
+    sf.write(buf, make_signal(seconds, sr), sr, format="WAV")
+    return buf.getvalue()
+
+
+def _probe(client: httpx.Client, stop: threading.Event, out: List[Tuple[str, float]]) -> None:
+    while not stop.is_set():
+        for name, call in (
+            ("text", lambda: client.post("/analyze/text", json=_TEXT)),
+            ("health", lambda: client.get("/health")),
+        ):
+            t0 = time.perf_counter()
+            call().raise_for_status()
+            out.append((name, (time.perf_counter() - t0) * 1000.0))
+        time.sleep(0.02)
+
+
+def _summary(rows: List[Tuple[str, float]], name: str) -> str:
+    v = sorted(ms for n, ms in rows if n == name)
+    if not v:
+        return f"{name:6s} no samples"
+    p95 = v[min(len(v) - 1, int(0.95 * len(v)))]
+    return f"{name:6s} n={len(v):4d}  p50 {statistics.median(v):7.1f} ms  p95 {p95:7.1f} ms  max {v[-1]:7.1f} ms"
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--kind", choices=("video", "audio"), default="video")
+    ap.add_argument("--file", default=None)
+    ap.add_argument("--jobs", type=int, default=4)
+    ap.add_argument("--pool", choices=("thread", "process"), default="thread")
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--seconds", type=float, default=20.0, help="length of the synthetic clip")
+    ap.add_argument("--idle-sec", type=float, default=3.0)
+    args = ap.parse_args()
+
+    if args.file:
+        with open(args.file, "rb") as f:
+            payload = f.read()
+        fname = os.path.basename(args.file)
+    elif args.kind == "video":
+        payload, fname = make_video(args.seconds), "clip.mp4"
+    else:
+        payload, fname = make_audio(args.seconds), "clip.wav"
+
+    port = _free_port()
+    env = dict(
+        os.environ,
+        PERSONALENS_PRELOAD="",
+        PERSONALENS_MEDIA_POOL=args.pool,
+        **{f"PERSONALENS_{args.kind.upper()}_WORKERS": str(args.workers)},
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=_API_DIR,
+        env=env,
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        with httpx.Client(base_url=base, timeout=600.0) as client:
+            for _ in range(300):
+                try:
+                    client.get("/health")
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.1)
+            else:
+                raise SystemExit("server did not come up")
+
+            idle: List[Tuple[str, float]] = []
+            stop = threading.Event()
+            t = threading.Thread(target=_probe, args=(client, stop, idle))
+            t.start()
+            time.sleep(args.idle_sec)
+            stop.set()
+            t.join()
+
+            route = "/analyze/video/shift" if args.kind == "video" else "/analyze/audio/shift?use_embeddings=false"
+            statuses: List[int] = []
+            job_secs: List[float] = []
+
+            def submit() -> None:
+                t0 = time.perf_counter()
+                with httpx.Client(base_url=base, timeout=600.0) as c:
+                    r = c.post(route, files={"file": (fname, payload)})
+                statuses.append(r.status_code)
+                job_secs.append(time.perf_counter() - t0)
+
+            loaded: List[Tuple[str, float]] = []
+            stop = threading.Event()
+            probe = threading.Thread(target=_probe, args=(client, stop, loaded))
+            jobs = [threading.Thread(target=submit) for _ in range(args.jobs)]
+            t0 = time.perf_counter()
+            probe.start()
+            for j in jobs:
+                j.start()
+            for j in jobs:
+                j.join()
+            stop.set()
+            probe.join()
+            wall = time.perf_counter() - t0
+
+            pools = client.get("/stats/media-pools").json()[args.kind]
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    print(f"{args.kind} x{args.jobs} ({len(payload) / 1e6:.1f} MB upload), pool={args.pool} workers={args.workers}")
+    print(f"media jobs: {wall:.1f} s wall, statuses {sorted(statuses)}, per-job {min(job_secs):.1f}-{max(job_secs):.1f} s")
+    print("idle:")
+    print("  " + _summary(idle, "text"))
+    print("  " + _summary(idle, "health"))
+    print("while media jobs run:")
+    print("  " + _summary(loaded, "text"))
+    print("  " + _summary(loaded, "health"))
+    print(f"pool stats: {pools}")
+
+
+if __name__ == "__main__":
+    main()
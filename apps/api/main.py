@@ -1,11 +1,16 @@
 ﻿from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi import UploadFile, File
-import tempfile
+from fastapi import UploadFile, File, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from contextlib import asynccontextmanager
+import asyncio
+import json
 import os
+from typing import Optional
 
 from personalens.schemas import (
     TextRequest,
+    TextBatchRequest,
     TextSignalsResponse,
     TextMLResponse,
     DriftRequest,
@@ -13,21 +18,38 @@ from personalens.schemas import (
     TimelineRequest,
     TimelineResponse,
 )
-from personalens.analyzers.text_signals import analyze_text_signals
-from personalens.analyzers.text_embeddings import embed_text, embedding_model_name
+from personalens.analyzers.text_signals import analyze_text_signals, analyze_text_signals_batch
+from personalens.analyzers.text_embeddings import embed_text, embedding_model_name, embedding_cache_stats
+from personalens.analyzers.text_embeddings import check_model_name, embedding_batcher_stats
 from personalens.analyzers.text_drift import analyze_text_drift
 from personalens.analyzers.text_timeline import analyze_text_timeline
 from personalens.schemas import ReasonsRequest, ReasonsResponse
 from personalens.analyzers.text_reasons import analyze_text_reasons
 from personalens.schemas import ClustersRequest, ClustersResponse
 from personalens.analyzers.text_clusters import analyze_text_clusters
-from personalens.analyzers.audio_shift import analyze_audio_shift_bytes
-from personalens.analyzers.video_shift import analyze_video_shift
+from personalens.workers import POOLS, PoolBusy, audio_shift_job, max_shard_workers, shutdown_shard_executor, video_shift_job
+from personalens.jobs import JOBS, TERMINAL, public_job
+from personalens.uploads import UPLOAD_OPENAPI, UploadError, add_memory, receive_upload
+from personalens.warmup import readiness, start_warmup
+from personalens.model_registry import REGISTRY
 
 
 
 
-app = FastAPI(title="PersonaLens API", version="0.4.0", redirect_slashes=False)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Preload + warm the models listed in PERSONALENS_PRELOAD in the background;
+    # /health answers right away, /ready flips once warmup has finished.
+    start_warmup()
+    JOBS.start()
+    yield
+    await JOBS.stop()
+    for pool in POOLS.values():
+        pool.shutdown()
+    shutdown_shard_executor()
+
+
+app = FastAPI(title="PersonaLens API", version="0.4.0", redirect_slashes=False, lifespan=lifespan)
 
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -50,18 +72,99 @@ def health():
     return {"ok": True}
 
 
+@app.get("/ready")
+def ready():
+    state = readiness()
+    return JSONResponse(state, status_code=200 if state["ready"] else 503)
+
+
+@app.get("/models")
+def loaded_models():
+    """Encoders currently held by the shared model registry (LRU order) and their memory."""
+    return REGISTRY.snapshot()
+
+
+@app.get("/stats/embedding-cache")
+def embedding_cache():
+    return embedding_cache_stats()
+
+
+@app.get("/stats/embedding-batcher")
+def embedding_batcher():
+    return embedding_batcher_stats()
+
+
+@app.get("/stats/media-pools")
+def media_pools():
+    return {kind: pool.stats() for kind, pool in POOLS.items()}
+
+
 @app.post("/analyze/text", response_model=TextSignalsResponse)
 def analyze(req: TextRequest):
     return analyze_text_signals(req.text)
 
 
+def _ndjson_rows(texts):
+    for i, sig in enumerate(analyze_text_signals_batch(texts)):
+        yield json.dumps({"index": i, **sig}) + "\n"
+
+
+def _ndjson_rows_from_jsonl(fileobj):
+    # Each line is either a JSON string or an object with a "text" field.
+    # Bad lines produce an error row instead of aborting the whole stream.
+    # "index" counts records (blank lines are skipped and not counted);
+    # error messages name the line number in the file.
+    index = 0
+    for i, raw in enumerate(fileobj):
+        line = raw.decode("utf-8", errors="replace").strip() if isinstance(raw, bytes) else raw.strip()
+        if not line:
+            continue
+        try:
+            obj = json.loads(line)
+            text = obj.get("text") if isinstance(obj, dict) else obj
+            if not isinstance(text, str):
+                raise ValueError("expected a string or an object with a 'text' field")
+        except Exception as ex:
+            yield json.dumps({"index": index, "error": f"Line {i + 1}: {ex}"}) + "\n"
+        else:
+            yield json.dumps({"index": index, **analyze_text_signals(text)}) + "\n"
+        index += 1
+
+
+@app.post("/analyze/text/batch")
+def analyze_batch(req: TextBatchRequest):
+    """NDJSON stream of TextSignalsResponse rows (plus "index"), in input order."""
+    return StreamingResponse(_ndjson_rows(req.texts), media_type="application/x-ndjson")
+
+
+@app.post("/analyze/text/batch/jsonl")
+def analyze_batch_jsonl(file: UploadFile = File(...)):
+    """
+    Same as /analyze/text/batch, but reads an uploaded JSONL file line by line.
+    Blank lines are skipped; "index" numbers the remaining records from 0.
+    """
+    return StreamingResponse(_ndjson_rows_from_jsonl(file.file), media_type="application/x-ndjson")
+
+
+def _bad_text_model(name: Optional[str]):
+    # only configured models may be loaded: a free-form name would download and load anything
+    try:
+        check_model_name(name)
+    except ValueError as ex:
+        return JSONResponse({"ok": False, "error": str(ex)}, status_code=400)
+    return None
+
+
 @app.post("/analyze/text/ml", response_model=TextMLResponse)
 def analyze_ml(req: TextRequest):
+    bad = _bad_text_model(req.embedding_model)
+    if bad is not None:
+        return bad
     signals = analyze_text_signals(req.text)
-    emb = embed_text(req.text, normalize=True)
+    emb = embed_text(req.text, normalize=True, model_name=req.embedding_model)
     return {
         **signals,
-        "embeddingModel": embedding_model_name(),
+        "embeddingModel": embedding_model_name(req.embedding_model),
         "embeddingDim": len(emb),
         "embedding": emb,
     }
@@ -69,41 +172,197 @@ def analyze_ml(req: TextRequest):
 
 @app.post("/analyze/text/drift", response_model=DriftResponse)
 def analyze_drift(req: DriftRequest):
-    return analyze_text_drift(req.texts)
+    bad = _bad_text_model(req.embedding_model)
+    if bad is not None:
+        return bad
+    return analyze_text_drift(req.texts, model_name=req.embedding_model)
 
 
 @app.post("/analyze/text/timeline", response_model=TimelineResponse)
 def analyze_timeline(req: TimelineRequest):
+    bad = _bad_text_model(req.embedding_model)
+    if bad is not None:
+        return bad
     items = [{"date": it.date, "text": it.text} for it in req.items]
-    return analyze_text_timeline(items, window=req.window, stride=req.stride)
+    return analyze_text_timeline(items, window=req.window, stride=req.stride, model_name=req.embedding_model)
 
 @app.post("/analyze/text/reasons", response_model=ReasonsResponse)
 def analyze_reasons(req: ReasonsRequest):
-    return analyze_text_reasons(req.texts, indices=req.indices)
+    bad = _bad_text_model(req.embedding_model)
+    if bad is not None:
+        return bad
+    return analyze_text_reasons(req.texts, indices=req.indices, model_name=req.embedding_model)
 
 @app.post("/analyze/text/clusters", response_model=ClustersResponse)
 def analyze_clusters(req: ClustersRequest):
-    return analyze_text_clusters(req.texts, k=req.k, seed=req.seed, max_iter=req.max_iter)
+    bad = _bad_text_model(req.embedding_model)
+    if bad is not None:
+        return bad
+    return analyze_text_clusters(
+        req.texts, k=req.k, seed=req.seed, max_iter=req.max_iter, model_name=req.embedding_model
+    )
+
 
+def _check_workers(name: str, value: int):
+    # each shard worker is a process: refuse more than the server allows before reading the body
+    limit = max_shard_workers()
+    if value > limit:
+        return JSONResponse({"ok": False, "error": f"{name} must be at most {limit}."}, status_code=400)
+    return None
 
-@app.post("/analyze/audio/shift")
+
+async def _run_upload(kind: str, request: Request, job, default_suffix: str = "", **params):
+    # Uploads are streamed to disk (see personalens/uploads.py) and analysed
+    # from there inside the media pool, so neither the body nor the analysis
+    # ever runs on / buffers in the event loop.
+    pool = POOLS[kind]
+    if not pool.has_room():  # turn the request away before reading its body
+        return JSONResponse({"ok": False, "error": f"{kind} pool is busy; retry later."}, status_code=429)
+    try:
+        upload = await receive_upload(request, default_suffix=default_suffix)
+    except UploadError as ex:
+        return JSONResponse({"ok": False, "error": str(ex)}, status_code=ex.status_code)
+    f = upload.open()
+
+    def done() -> None:
+        # only once the analysis has stopped reading it, even if this request was cancelled
+        f.close()
+        upload.remove()
+
+    try:
+        result = await pool.run(job, f, on_done=done, **params)
+    except PoolBusy as ex:
+        done()
+        return JSONResponse({"ok": False, "error": str(ex)}, status_code=429)
+    if isinstance(result, dict):
+        result["upload"] = upload.stats()
+        add_memory(result, upload)
+    return result
+
+
+@app.post("/analyze/audio/shift", openapi_extra=UPLOAD_OPENAPI)
 async def analyze_audio_shift(
-    file: UploadFile = File(...),
+    request: Request,
     use_embeddings: bool = True,
     embedding_model: str = "facebook/wav2vec2-base",
     alpha: float = 0.5,
+    embedding_mode: str = "per_window",
+    max_audio_sec: Optional[float] = None,
+    shard_workers: int = 1,
 ):
-    data = await file.read()
-    return analyze_audio_shift_bytes(
-        data,
+    bad = _check_workers("shard_workers", shard_workers)
+    if bad is not None:
+        return bad
+    # Decoded block by block from the stored upload inside the audio pool.
+    return await _run_upload(
+        "audio",
+        request,
+        audio_shift_job,
+        max_audio_sec=max_audio_sec,
         use_embeddings=use_embeddings,
         embedding_model=embedding_model,
         combine_alpha=alpha,
+        embedding_mode=embedding_mode,
+        shard_workers=shard_workers,
     )
 
-@app.post("/analyze/video/shift")
+@app.post("/analyze/video/shift", openapi_extra=UPLOAD_OPENAPI)
 async def analyze_video_shift_route(
-    file: UploadFile = File(...),
+    request: Request,
+    model_name: str = "MCG-NJU/videomae-base",
+    frames_per_segment: int = 16,
+    target_fps: float = 8.0,
+    window_sec: float = 4.0,
+    hop_sec: float = 2.0,
+    baseline_sec: float = 20.0,
+    thr: float = 1.25,
+    max_seconds: float = 300.0,
+    short_side: int = 224,
+    embed_batch_size: int = 8,
+    decode_mode: str = "all",
+    decode_workers: int = 1,
+):
+    bad = _check_workers("decode_workers", decode_workers)
+    if bad is not None:
+        return bad
+    return await _run_upload(
+        "video",
+        request,
+        video_shift_job,
+        default_suffix=".mp4",
+        model_name=model_name,
+        frames_per_segment=frames_per_segment,
+        target_fps=target_fps,
+        window_sec=window_sec,
+        hop_sec=hop_sec,
+        baseline_sec=baseline_sec,
+        thr=thr,
+        max_seconds=max_seconds,
+        short_side=short_side,
+        embed_batch_size=embed_batch_size,
+        decode_mode=decode_mode,
+        decode_workers=decode_workers,
+    )
+
+
+# ---- background jobs: submit, poll, stream progress ----
+
+async def _submit_job(kind: str, request: Request, params: dict, default_suffix: str = ""):
+    # every queued job keeps its upload on disk: turn requests away once the queue is full
+    if not await JOBS.has_room():
+        return JSONResponse({"ok": False, "error": "Job queue is full; retry later."}, status_code=429)
+    try:
+        upload = await receive_upload(request, dir=JOBS.job_dir, default_suffix=default_suffix)
+    except UploadError as ex:
+        return JSONResponse({"ok": False, "error": str(ex)}, status_code=ex.status_code)
+    try:
+        job = await JOBS.submit(kind, params, upload.path)
+    except PoolBusy as ex:
+        upload.remove()
+        return JSONResponse({"ok": False, "error": str(ex)}, status_code=429)
+    return JSONResponse(
+        {
+            "ok": True,
+            "jobId": job["id"],
+            "status": job["status"],
+            "statusUrl": f"/jobs/{job['id']}",
+            "eventsUrl": f"/jobs/{job['id']}/events",
+            "upload": upload.stats(),
+        },
+        status_code=202,
+    )
+
+
+@app.post("/jobs/audio/shift", openapi_extra=UPLOAD_OPENAPI)
+async def submit_audio_shift_job(
+    request: Request,
+    use_embeddings: bool = True,
+    embedding_model: str = "facebook/wav2vec2-base",
+    alpha: float = 0.5,
+    embedding_mode: str = "per_window",
+    max_audio_sec: Optional[float] = None,
+    shard_workers: int = 1,
+):
+    bad = _check_workers("shard_workers", shard_workers)
+    if bad is not None:
+        return bad
+    return await _submit_job(
+        "audio",
+        request,
+        {
+            "max_audio_sec": max_audio_sec,
+            "use_embeddings": use_embeddings,
+            "embedding_model": embedding_model,
+            "combine_alpha": alpha,
+            "embedding_mode": embedding_mode,
+            "shard_workers": shard_workers,
+        },
+    )
+
+
+@app.post("/jobs/video/shift", openapi_extra=UPLOAD_OPENAPI)
+async def submit_video_shift_job(
+    request: Request,
     model_name: str = "MCG-NJU/videomae-base",
     frames_per_segment: int = 16,
     target_fps: float = 8.0,
@@ -112,31 +371,80 @@ async def analyze_video_shift_route(
     baseline_sec: float = 20.0,
     thr: float = 1.25,
     max_seconds: float = 300.0,
+    short_side: int = 224,
+    embed_batch_size: int = 8,
+    decode_mode: str = "all",
+    decode_workers: int = 1,
 ):
-    # Persist upload to temp file so PyAV can open it reliably.
-    suffix = os.path.splitext(file.filename or "")[1] or ".mp4"
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+    bad = _check_workers("decode_workers", decode_workers)
+    if bad is not None:
+        return bad
+    return await _submit_job(
+        "video",
+        request,
+        {
+            "model_name": model_name,
+            "frames_per_segment": frames_per_segment,
+            "target_fps": target_fps,
+            "window_sec": window_sec,
+            "hop_sec": hop_sec,
+            "baseline_sec": baseline_sec,
+            "thr": thr,
+            "max_seconds": max_seconds,
+            "short_side": short_side,
+            "embed_batch_size": embed_batch_size,
+            "decode_mode": decode_mode,
+            "decode_workers": decode_workers,
+        },
+        default_suffix=".mp4",
+    )
+
+
+def _unknown_job():
+    return JSONResponse({"ok": False, "error": "Unknown or expired job id."}, status_code=404)
+
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    job = JOBS.store.get(job_id)
+    return public_job(job) if job is not None else _unknown_job()
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request):
+    """
+    Server-sent events: `progress` (stage, done/total), `segment` (partial
+    per-segment results) and a final `done` or `error`. Each event carries its
+    sequence number as the SSE id, so a reconnecting client resumes from
+    Last-Event-ID without missing or repeating events.
+    """
+    if await asyncio.to_thread(JOBS.store.get, job_id) is None:
+        return _unknown_job()
     try:
-        content = await file.read()
-        tmp.write(content)
-        tmp.flush()
-        tmp.close()
-
-        result = analyze_video_shift(
-            file_path=tmp.name,
-            model_name=model_name,
-            frames_per_segment=frames_per_segment,
-            target_fps=target_fps,
-            window_sec=window_sec,
-            hop_sec=hop_sec,
-            baseline_sec=baseline_sec,
-            thr=thr,
-            max_seconds=max_seconds,
-        )
-        return result
-    finally:
-        try:
-            os.unlink(tmp.name)
-        except Exception:
-            pass
+        after = int(request.headers.get("last-event-id") or 0)
+    except ValueError:
+        after = 0
 
+    async def stream():
+        last, idle = after, 0.0
+        while True:
+            # store calls may wait on a SQLite lock: keep them off the event loop
+            batch = await asyncio.to_thread(JOBS.store.events, job_id, last)
+            for seq, event, data in batch:
+                last = seq
+                yield f"id: {seq}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+                if event in TERMINAL:
+                    return
+            if await asyncio.to_thread(JOBS.store.get, job_id) is None or await request.is_disconnected():
+                return
+            idle = 0.0 if batch else idle + 0.25
+            if idle >= 15.0:  # keep proxies from closing a quiet stream
+                idle = 0.0
+                yield ": keepalive\n\n"
+            await asyncio.sleep(0.25)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
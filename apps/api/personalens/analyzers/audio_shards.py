@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .audio_shift import AudioShiftConfig, _analyze_group, _make_embed_fn, _stream_grid
+from .segments import grid_windows
+
+# Sharded audio analysis: the parent still decodes and resamples the stream
+# block by block, but instead of analysing window groups itself it cuts the
+# grid into shards of whole groups (about cfg.shard_sec each), copies each
+# shard's samples plus one pitch frame either side into a shared memory
+# block and hands it to a worker process. Shards overlap by about a window.
+# Groups are the same as in _stream_windows, so every window sees the same
+# samples, pitch frames and embedding batches and the stitched result is
+# identical to the single-process one.
+
+
+@dataclass(frozen=True)
+class _Shard:
+    shm_name: str
+    start: int  # sample index of the block's first sample
+    n: int  # samples in the block
+    batches: Tuple[Tuple[Tuple[int, int], ...], ...]  # window groups, global sample bounds
+
+
+def _analyze_shard(
+    shard: _Shard, sr: int, cfg: AudioShiftConfig, embed_args: Dict[str, Any]
+) -> Tuple[List[Dict[str, Any]], List[Tuple[np.ndarray, Dict[str, Any]]]]:
+    """Worker: features and per-group embeddings for one shard."""
+    from personalens.workers import _attach
+
+    shm = _attach(shard.shm_name)
+    try:
+        view = np.ndarray((shard.n,), dtype=np.float32, buffer=shm.buf)
+        x = view.copy()
+        del view
+    finally:
+        shm.close()
+
+    embed_fn, _ = _make_embed_fn(sr, warnings=[], **embed_args)
+    feats: List[Dict[str, Any]] = []
+    embeds: List[Tuple[np.ndarray, Dict[str, Any]]] = []
+    for batch in shard.batches:
+        new_feats, emb = _analyze_group(x, shard.start, list(batch), sr, cfg, embed_fn)
+        feats.extend(new_feats)
+        if emb is not None:
+            embeds.append(emb)
+    return feats, embeds
+
+
+def _free(shm: shared_memory.SharedMemory) -> None:
+    try:
+        shm.close()
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def stream_windows_sharded(
+    blocks: Iterable[np.ndarray],
+    sr: int,
+    cfg: AudioShiftConfig,
+    workers: int,
+    embed_args: Optional[Dict[str, Any]] = None,
+    on_group: Optional[Callable[[int, List[Dict[str, Any]]], None]] = None,
+    info: Optional[Dict[str, Any]] = None,
+) -> Tuple[List[Tuple[int, int]], List[Dict[str, Any]], List[Tuple[np.ndarray, Dict[str, Any]]], int]:
+    """
+    Drop-in for _stream_windows that analyses shards in up to `workers`
+    processes (personalens.workers.shard_executor) while decoding continues.
+    At most 2 * workers shards are in flight, which bounds the audio held in
+    shared memory. `embed_args` are the _make_embed_fn arguments (None: no
+    embeddings); each worker loads the model once and keeps it, in its own
+    registry, so every worker adds a full copy of the model's memory. `on_group`
+    is called once per finished shard, in order. `info` gets
+    buffer_peak_bytes as in _stream_windows, counting shard blocks in flight.
+    """
+    from personalens.workers import shard_executor
+
+    win, hop, p_frame, p_hop, group = _stream_grid(sr, cfg)
+    per_shard = group * max(1, int(round(cfg.shard_sec / max(cfg.stream_batch_sec, 1e-9))))
+    if embed_args is None:
+        embed_args = {
+            "use_embeddings": False,
+            "embedding_model": "",
+            "embed_batch_size": 1,
+            "embedding_mode": "per_window",
+        }
+    pool = shard_executor(workers)
+
+    buf = np.zeros(0, dtype=np.float32)
+    buf_start = 0  # sample index of buf[0]
+    total = 0
+    next_i = 0  # next window index to hand out
+
+    segs: List[Tuple[int, int]] = []
+    feats: List[Dict[str, Any]] = []
+    embeds: List[Tuple[np.ndarray, Dict[str, Any]]] = []
+    pending: Deque[Tuple[List[Tuple[int, int]], shared_memory.SharedMemory, Any]] = deque()
+    peak = 0
+
+    def held(extra: int = 0) -> None:
+        nonlocal peak
+        peak = max(peak, buf.nbytes + extra + sum(shm.size for _, shm, _ in pending))
+
+    def collect(limit: int) -> None:
+        # take finished shards in order; block on the oldest while more than `limit` are out
+        while pending and (len(pending) > limit or pending[0][2].done()):
+            windows, shm, fut = pending.popleft()
+            try:
+                new_feats, new_embeds = fut.result()
+            finally:
+                _free(shm)
+            segs.extend(windows)
+            feats.extend(new_feats)
+            embeds.extend(new_embeds)
+            if on_group is not None:
+                on_group(len(segs), new_feats)
+
+    def submit(windows: List[Tuple[int, int]]) -> None:
+        pa = max(0, (windows[0][0] - p_frame) // p_hop * p_hop)
+        pb = min(total, windows[-1][1] + p_frame)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, (pb - pa) * 4))
+        try:
+            view = np.ndarray((pb - pa,), dtype=np.float32, buffer=shm.buf)
+            view[:] = buf[pa - buf_start : pb - buf_start]
+            del view
+            batches = tuple(tuple(windows[s : s + group]) for s in range(0, len(windows), group))
+            fut = pool.submit(_analyze_shard, _Shard(shm.name, pa, pb - pa, batches), sr, cfg, embed_args)
+        except BaseException:
+            _free(shm)
+            raise
+        pending.append((windows, shm, fut))
+        held()
+        collect(2 * max(1, workers))
+
+    def drain(final: bool) -> None:
+        nonlocal next_i
+        ready, _ = grid_windows(total if final else total - p_frame, win, hop, start=next_i, final=final)
+        n = len(ready) if final else len(ready) // per_shard * per_shard
+        for s in range(0, n, per_shard):
+            submit(ready[s : s + per_shard])
+        next_i += n
+
+    try:
+        for blk in blocks:
+            if len(buf):
+                old, buf = buf, np.concatenate([buf, blk])
+                held(old.nbytes + blk.nbytes)
+                del old
+            else:
+                buf = blk
+                held()
+            total += len(blk)
+            drain(final=False)
+
+            keep = max(0, (next_i * hop - p_frame) // p_hop * p_hop)
+            if keep > buf_start:
+                buf = buf[keep - buf_start :]
+                buf_start = keep
+            collect(2 * max(1, workers))
+
+        drain(final=True)
+        collect(0)
+        if info is not None:
+            info["buffer_peak_bytes"] = peak
+    finally:
+        for _, shm, fut in pending:
+            fut.cancel()
+            _free(shm)
+    return segs, feats, embeds, total
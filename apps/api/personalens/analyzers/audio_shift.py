@@ -3,18 +3,24 @@ from __future__ import annotations
 import io
 import math
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, BinaryIO, Callable, Dict, Iterable, List, Optional, Tuple
 
 import numpy as np
-import soundfile as sf
-from scipy.signal import resample_poly
 
+from .audio_stream import iter_audio_blocks
+from .segments import grid_windows
+from .pitch import pool_pitch, track_pitch
 from .wav2vec2_embedder import (
     embed_segments_wav2vec2,
+    embed_windows_wav2vec2,
     wav2vec2_available,
     wav2vec2_import_error,
 )
 
+# embed_fn(region, windows relative to region) -> ((len(windows), D) unit rows, meta)
+EmbedFn = Callable[[np.ndarray, List[Tuple[int, int]]], Tuple[np.ndarray, Dict[str, Any]]]
+ProgressFn = Callable[[Dict[str, Any]], None]
+
 
 @dataclass
 class AudioShiftConfig:
@@ -31,108 +37,294 @@ class AudioShiftConfig:
     fmin: float = 70.0
     fmax: float = 350.0
 
+    # frame-level pitch tracker (pooled per segment)
+    pitch_frame_sec: float = 0.04
+    pitch_hop_sec: float = 0.01
+    voicing_threshold: float = 0.25
+
     # silence threshold for pause ratio (on float audio in [-1,1])
     silence_abs_threshold: float = 0.01
 
     # numeric stability
     eps: float = 1e-8
 
-    # safety limits (to avoid huge CPU runs)
-    max_audio_sec: float = 180.0  # truncate beyond this
+    # streaming: source audio is decoded/resampled this many seconds at a time,
+    # and windows are analysed in groups spanning about stream_batch_sec
+    read_block_sec: float = 10.0
+    stream_batch_sec: float = 30.0
 
+    # optional cap on analysed audio (None = whole file; memory stays bounded)
+    max_audio_sec: Optional[float] = None
 
-def _to_mono(x: np.ndarray) -> np.ndarray:
-    if x.ndim == 1:
-        return x.astype(np.float32, copy=False)
-    return x.mean(axis=1).astype(np.float32, copy=False)
+    # sharded mode (shard_workers > 1): windows are analysed in processes,
+    # about shard_sec of audio (whole stream_batch_sec groups) per task
+    shard_sec: float = 60.0
 
 
-def _read_wav_bytes(file_bytes: bytes) -> Tuple[np.ndarray, int]:
-    buf = io.BytesIO(file_bytes)
-    x, sr = sf.read(buf, dtype="float32", always_2d=True)
-    x = _to_mono(x)
-    return x, int(sr)
+def _prefix(v: np.ndarray) -> np.ndarray:
+    # prefix[i] = sum(v[:i]); windows then cost O(1) each: prefix[j] - prefix[i]
+    out = np.zeros(len(v) + 1, dtype=v.dtype)
+    np.cumsum(v, out=out[1:])
+    return out
 
 
-def _resample(x: np.ndarray, sr: int, target_sr: int) -> Tuple[np.ndarray, int]:
-    if sr == target_sr:
-        return x, sr
-    g = math.gcd(sr, target_sr)
-    up = target_sr // g
-    down = sr // g
-    y = resample_poly(x, up, down).astype(np.float32, copy=False)
-    return y, target_sr
+def _window_features(
+    x: np.ndarray,
+    segs: List[Tuple[int, int]],
+    silence_thr: float,
+    eps: float,
+) -> Dict[str, np.ndarray]:
+    """
+    RMS / zero-crossing rate / pause ratio for every (a, b) window.
 
+    Energy, sign changes and the silence mask are reduced once over the
+    signal into blocks of g = gcd(all window bounds) samples (g = hop for the
+    regular window/hop grid), then prefix-summed over blocks. Every sample is
+    touched once and each window is O(1), so the cost is linear in audio
+    length however much the windows overlap.
+    """
+    if not segs:
+        empty = np.zeros(0, dtype=np.float64)
+        return {"rms": empty, "zcr": empty, "pauseRatio": empty}
 
-def _rms(x: np.ndarray, eps: float) -> float:
-    return float(np.sqrt(np.mean(x * x) + eps))
+    bounds = np.asarray(segs, dtype=np.int64)
+    a, b = bounds[:, 0], bounds[:, 1]
+    g = max(1, int(np.gcd.reduce(bounds.ravel())))
+    m = int(b.max())  # a multiple of g
+    xb = x[:m].reshape(-1, g)
 
+    sq = _prefix((xb * xb).sum(axis=1, dtype=np.float64))
+    silent = _prefix((np.abs(xb) < silence_thr).sum(axis=1, dtype=np.int64))
 
-def _zcr(x: np.ndarray) -> float:
-    s = np.sign(x)
-    s[s == 0] = 1
-    return float(np.mean(s[1:] != s[:-1]))
+    # pair i = (x[i], x[i+1]); zeros count as positive, like np.sign with 0 -> +1
+    neg = x[: m + 1] < 0
+    cross = np.zeros(m, dtype=bool)
+    cross[: len(neg) - 1] = neg[1:] != neg[:-1]
+    cross_blocks = _prefix(cross.reshape(-1, g).sum(axis=1, dtype=np.int64))
 
+    ia, ib = a // g, b // g
+    n = np.maximum(b - a, 1)
+    pairs = b - a - 1
 
-def _pause_ratio(x: np.ndarray, thr: float) -> float:
-    return float(np.mean(np.abs(x) < thr))
+    rms = np.sqrt((sq[ib] - sq[ia]) / n + eps)
+    # window pairs are a .. b-2, so drop pair b-1 (the one leaving the window)
+    zc = cross_blocks[ib] - cross_blocks[ia] - cross[np.maximum(b - 1, 0)]
+    zcr = np.where(pairs > 0, zc / np.maximum(pairs, 1), 0.0)
+    pause = (silent[ib] - silent[ia]) / n
+    return {"rms": rms, "zcr": zcr, "pauseRatio": pause}
 
 
-def _pitch_autocorr(x: np.ndarray, sr: int, fmin: float, fmax: float, eps: float) -> float:
-    if len(x) < int(0.05 * sr):
-        return 0.0
+def _segments(x: np.ndarray, sr: int, window_sec: float, hop_sec: float) -> List[Tuple[int, int]]:
+    win = max(1, int(window_sec * sr))
+    hop = max(1, int(hop_sec * sr))
+    return grid_windows(len(x), win, hop, final=True)[0]
 
-    x = x - float(np.mean(x))
-    w = np.hanning(len(x)).astype(np.float32)
-    xw = x * w
 
-    ac = np.correlate(xw, xw, mode="full")[len(xw) - 1 :]
-    ac0 = float(ac[0]) + eps
-    ac = ac / ac0
+def _cos_sim_to_unit_centroid(mat_unit: np.ndarray, centroid_unit: np.ndarray) -> np.ndarray:
+    # both assumed L2-normalized
+    return mat_unit @ centroid_unit
 
-    lag_min = int(sr / fmax)
-    lag_max = int(sr / fmin)
-    lag_max = min(lag_max, len(ac) - 1)
 
-    if lag_max <= lag_min + 2:
-        return 0.0
+def _stream_grid(sr: int, cfg: AudioShiftConfig) -> Tuple[int, int, int, int, int]:
+    # (window, hop, pitch frame, pitch hop) in samples, and windows per group
+    win = max(1, int(cfg.window_sec * sr))
+    hop = max(1, int(cfg.hop_sec * sr))
+    p_frame = max(1, int(round(cfg.pitch_frame_sec * sr)))
+    p_hop = max(1, int(round(cfg.pitch_hop_sec * sr)))
+    group = max(1, int(cfg.stream_batch_sec / max(cfg.hop_sec, 1e-9)))
+    return win, hop, p_frame, p_hop, group
+
+
+def _analyze_group(
+    x: np.ndarray,
+    x_start: int,
+    batch: List[Tuple[int, int]],
+    sr: int,
+    cfg: AudioShiftConfig,
+    embed_fn: Optional[EmbedFn] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[Tuple[np.ndarray, Dict[str, Any]]]]:
+    """
+    Features (and embeddings, if embed_fn) for one group of windows. `x` holds
+    samples [x_start, x_start + len(x)) and must cover the windows plus one
+    pitch frame before them; it ends at the end of the audio or at least one
+    pitch frame past the last window.
+    """
+    _, _, p_frame, p_hop, _ = _stream_grid(sr, cfg)
+    a0, b0 = batch[0][0], batch[-1][1]
+    region = x[a0 - x_start : b0 - x_start]
+    local = [(a - a0, b - a0) for a, b in batch]
+
+    # pitch frames stay on the global hop grid: start the tracked span on a
+    # hop multiple at least one frame before the first window
+    pa = max(0, (a0 - p_frame) // p_hop * p_hop)
+    pb = min(x_start + len(x), b0 + p_frame)
+    track = track_pitch(
+        x[pa - x_start : pb - x_start],
+        sr,
+        fmin=cfg.fmin,
+        fmax=cfg.fmax,
+        frame_sec=cfg.pitch_frame_sec,
+        hop_sec=cfg.pitch_hop_sec,
+        voicing_threshold=cfg.voicing_threshold,
+        silence_threshold=cfg.silence_abs_threshold,
+        eps=cfg.eps,
+    )
+    track.centers += pa
+    pitch_stats = pool_pitch(track, batch)
+    win_feats = _window_features(region, local, cfg.silence_abs_threshold, cfg.eps)
 
-    seg = ac[lag_min:lag_max]
-    peak_i = int(np.argmax(seg)) + lag_min
-    peak_v = float(ac[peak_i])
+    feats = []
+    for k, ((a, b), ps) in enumerate(zip(batch, pitch_stats)):
+        feats.append(
+            {
+                "startMs": int(1000 * a / sr),
+                "endMs": int(1000 * b / sr),
+                "rms": float(win_feats["rms"][k]),
+                "zcr": float(win_feats["zcr"][k]),
+                "pauseRatio": float(win_feats["pauseRatio"][k]),
+                "pitchHz": ps["pitchHz"],
+                "pitchStdHz": ps["pitchStdHz"],
+                "voicedRatio": ps["voicedRatio"],
+            }
+        )
+    return feats, embed_fn(region, local) if embed_fn is not None else None
 
-    if peak_v < 0.25:
-        return 0.0
 
-    f0 = sr / float(peak_i)
-    return float(f0)
+def _stream_windows(
+    blocks: Iterable[np.ndarray],
+    sr: int,
+    cfg: AudioShiftConfig,
+    embed_fn: Optional[EmbedFn] = None,
+    on_group: Optional[Callable[[int, List[Dict[str, Any]]], None]] = None,
+    info: Optional[Dict[str, Any]] = None,
+) -> Tuple[List[Tuple[int, int]], List[Dict[str, Any]], List[Tuple[np.ndarray, Dict[str, Any]]], int]:
+    """
+    Consume resampled audio blocks and analyse windows as soon as they (plus
+    one pitch frame of lookahead) have arrived, in groups of about
+    `stream_batch_sec`.
+
+    Only audio from the first unfinished window (minus one pitch frame) on is
+    kept, so memory is bounded by roughly stream_batch_sec + read_block_sec of
+    samples however long the file is. Results match analysing the whole signal
+    at once: window features are exact sums over each window, and pitch frames
+    are taken on the same global frame grid. `on_group(done, new_feats)` is
+    called after each group. `info`, if given, gets buffer_peak_bytes: the
+    most sample bytes held at once (old buffer, block and joined buffer while
+    they are concatenated).
+    """
+    win, hop, p_frame, p_hop, group = _stream_grid(sr, cfg)
+
+    buf = np.zeros(0, dtype=np.float32)
+    buf_start = 0  # sample index of buf[0]
+    total = 0
+    next_i = 0  # next window index to analyse
+
+    segs: List[Tuple[int, int]] = []
+    feats: List[Dict[str, Any]] = []
+    embeds: List[Tuple[np.ndarray, Dict[str, Any]]] = []
+
+    def run(batch: List[Tuple[int, int]]) -> None:
+        new_feats, emb = _analyze_group(buf, buf_start, batch, sr, cfg, embed_fn)
+        feats.extend(new_feats)
+        segs.extend(batch)
+        if emb is not None:
+            embeds.append(emb)
+        if on_group is not None:
+            on_group(len(segs), new_feats)
+
+    def drain(final: bool) -> None:
+        nonlocal next_i
+        ready, _ = grid_windows(total if final else total - p_frame, win, hop, start=next_i, final=final)
+        n = len(ready) if final else len(ready) // group * group
+        for s in range(0, n, group):
+            run(ready[s : s + group])
+        next_i += n
+
+    peak = 0
+    for blk in blocks:
+        if len(buf):
+            joined = np.concatenate([buf, blk])
+            peak = max(peak, buf.nbytes + blk.nbytes + joined.nbytes)
+            buf = joined
+        else:
+            buf = blk
+            peak = max(peak, buf.nbytes)
+        total += len(blk)
+        drain(final=False)
+
+        keep = max(0, (next_i * hop - p_frame) // p_hop * p_hop)
+        if keep > buf_start:
+            buf = buf[keep - buf_start :]
+            buf_start = keep
+
+    drain(final=True)
+    if info is not None:
+        info["buffer_peak_bytes"] = peak
+    return segs, feats, embeds, total
+
+
+def _make_embed_fn(
+    sr: int,
+    use_embeddings: bool,
+    embedding_model: str,
+    embed_batch_size: int,
+    embedding_mode: str,
+    warnings: List[str],
+) -> Tuple[Optional[EmbedFn], str]:
+    # (embed_fn or None, the embedding mode actually used); problems go to `warnings`
+    if not use_embeddings:
+        return None, embedding_mode
+    if not wav2vec2_available():
+        warnings.append(f"wav2vec2 disabled: {wav2vec2_import_error()}")
+        return None, embedding_mode
+    if embedding_mode == "single_pass":
+        # encode each group once, mean-pool frame states per window
+        def embed_fn(region, local):
+            return embed_windows_wav2vec2(region, local, sr=sr, model_name=embedding_model)
+
+        return embed_fn, embedding_mode
+
+    if embedding_mode != "per_window":
+        warnings.append(f"Unknown embedding_mode '{embedding_mode}'; using per_window.")
+        embedding_mode = "per_window"
+
+    def embed_fn(region, local):
+        waves = [region[a:b] for (a, b) in local]
+        return embed_segments_wav2vec2(
+            waves, sr=sr, model_name=embedding_model, batch_size=embed_batch_size
+        )
 
+    return embed_fn, embedding_mode
 
-def _segments(x: np.ndarray, sr: int, window_sec: float, hop_sec: float) -> List[Tuple[int, int]]:
-    win = max(1, int(window_sec * sr))
-    hop = max(1, int(hop_sec * sr))
-    out = []
-    i = 0
-    while i + win <= len(x):
-        out.append((i, i + win))
-        i += hop
-    if not out and len(x) > 0:
-        out.append((0, len(x)))
-    return out
 
+def _expected_windows(info: Dict[str, Any], cfg: AudioShiftConfig) -> int:
+    # window count implied by the header's frame count (0 if the format does not say)
+    src_sr, frames = info.get("sourceSr"), info.get("frames")
+    if not src_sr or not frames or frames < 0:
+        return 0
+    dur = frames / float(src_sr)
+    if cfg.max_audio_sec:
+        dur = min(dur, cfg.max_audio_sec)
+    n = int(dur * cfg.target_sr)
+    win = max(1, int(cfg.window_sec * cfg.target_sr))
+    hop = max(1, int(cfg.hop_sec * cfg.target_sr))
+    return (n - win) // hop + 1 if n >= win else 1
 
-def _cos_sim_to_unit_centroid(mat_unit: np.ndarray, centroid_unit: np.ndarray) -> np.ndarray:
-    # both assumed L2-normalized
-    return mat_unit @ centroid_unit
+
+def analyze_audio_shift_bytes(file_bytes: bytes, cfg: AudioShiftConfig | None = None, **kwargs: Any) -> Dict[str, Any]:
+    return analyze_audio_shift_file(io.BytesIO(file_bytes), cfg, **kwargs)
 
 
-def analyze_audio_shift_bytes(
-    file_bytes: bytes,
+def analyze_audio_shift_file(
+    fileobj: BinaryIO,
     cfg: AudioShiftConfig | None = None,
     use_embeddings: bool = True,
     embedding_model: str = "facebook/wav2vec2-base",
     embed_batch_size: int = 8,
     combine_alpha: float = 0.5,  # alpha*prosody + (1-alpha)*embedding
+    embedding_mode: str = "per_window",  # or "single_pass"
+    progress: Optional[ProgressFn] = None,
+    shard_workers: int = 1,
 ) -> Dict[str, Any]:
     """
     Baseline-relative delivery shift:
@@ -140,21 +332,77 @@ def analyze_audio_shift_bytes(
       - Wav2Vec2 embedding-distance anomaly (1 - cosine sim to baseline centroid)
       - Fused anomaly score
 
+    `fileobj` is any seekable binary file (e.g. the spooled upload); it is
+    decoded and analysed in blocks, never loaded whole.
+
+    `progress`, if given, receives {"stage": "decode"}, then per analysed group
+    {"stage": "embed", "done": n, "total": N, "segments": [...]} with the raw
+    per-segment features (z-scores need the finished baseline), and finally
+    {"stage": "score"}. N is estimated from the file header.
+
+    With shard_workers > 1, windows are analysed in that many processes, about
+    cfg.shard_sec of audio per task, while decoding goes on (see
+    audio_shards); embed events then arrive once per shard. Segments and
+    scores are identical to the single-process run, and the baseline is
+    still computed once, from the segments inside baseline_sec. The count is
+    capped at personalens.workers.max_shard_workers(). Every worker loads its
+    own copy of the embedding model, which PERSONALENS_MODEL_BUDGET_MB (a
+    per-process budget) does not count: model memory grows with the workers.
+
     Not medical. Not deception detection. Not truth verification.
     """
     cfg = cfg or AudioShiftConfig()
     warnings: List[str] = []
+    sr = cfg.target_sr
+
+    embed_fn, embedding_mode = _make_embed_fn(
+        sr, use_embeddings, embedding_model, embed_batch_size, embedding_mode, warnings
+    )
+
+    info: Dict[str, Any] = {}
+    blocks = iter_audio_blocks(
+        fileobj, sr, block_sec=cfg.read_block_sec, max_sec=cfg.max_audio_sec, info=info
+    )
+
+    on_group = None
+    if progress is not None:
+        progress({"stage": "decode"})
+
+        def on_group(done: int, new_feats: List[Dict[str, Any]]) -> None:
+            progress(
+                {
+                    "stage": "embed",
+                    "done": done,
+                    "total": max(done, _expected_windows(info, cfg)),
+                    "segments": new_feats,
+                }
+            )
 
-    x, sr = _read_wav_bytes(file_bytes)
-    x, sr = _resample(x, sr, cfg.target_sr)
-
-    dur_sec = len(x) / float(sr + 1e-9)
-    if dur_sec > cfg.max_audio_sec:
-        max_n = int(cfg.max_audio_sec * sr)
-        x = x[:max_n]
-        warnings.append(f"Audio truncated to {cfg.max_audio_sec:.0f}s for CPU safety.")
-
-    segs = _segments(x, sr, cfg.window_sec, cfg.hop_sec)
+    shard_workers = max(1, int(shard_workers))
+    if shard_workers > 1:
+        from personalens.workers import max_shard_workers
+
+        shard_workers = min(shard_workers, max_shard_workers())
+    if shard_workers > 1:
+        from .audio_shards import stream_windows_sharded
+
+        embed_args = None
+        if embed_fn is not None:
+            embed_args = {
+                "use_embeddings": True,
+                "embedding_model": embedding_model,
+                "embed_batch_size": embed_batch_size,
+                "embedding_mode": embedding_mode,
+            }
+        segs, feats, embeds, n_samples = stream_windows_sharded(
+            blocks, sr, cfg, shard_workers, embed_args, on_group, info=info
+        )
+    else:
+        segs, feats, embeds, n_samples = _stream_windows(blocks, sr, cfg, embed_fn, on_group, info=info)
+    if progress is not None:
+        progress({"stage": "score"})
+    if info.get("truncated"):
+        warnings.append(f"Audio truncated to {cfg.max_audio_sec:.0f}s (max_audio_sec).")
 
     baseline_end = int(cfg.baseline_sec * sr)
     baseline_idx = [k for k, (a, b) in enumerate(segs) if b <= baseline_end]
@@ -162,21 +410,6 @@ def analyze_audio_shift_bytes(
         baseline_idx = list(range(min(2, len(segs))))
         warnings.append("Baseline too short; using first available segments as baseline.")
 
-    # -------- Prosody features per segment --------
-    feats = []
-    for (a, b) in segs:
-        s = x[a:b]
-        feats.append(
-            {
-                "startMs": int(1000 * a / sr),
-                "endMs": int(1000 * b / sr),
-                "rms": _rms(s, cfg.eps),
-                "zcr": _zcr(s),
-                "pauseRatio": _pause_ratio(s, cfg.silence_abs_threshold),
-                "pitchHz": _pitch_autocorr(s, sr, cfg.fmin, cfg.fmax, cfg.eps),
-            }
-        )
-
     def stat(key: str, ignore_zeros: bool = False):
         vals = []
         for i in baseline_idx:
@@ -200,6 +433,8 @@ def analyze_audio_shift_bytes(
     mu_zcr, sd_zcr = stat("zcr")
     mu_pause, sd_pause = stat("pauseRatio")
     mu_pitch, sd_pitch = stat("pitchHz", ignore_zeros=True)
+    mu_pitch_sd, sd_pitch_sd = stat("pitchStdHz", ignore_zeros=True)
+    mu_voiced, sd_voiced = stat("voicedRatio")
 
     prosody_anoms: List[float] = []
     z_prosody_list: List[dict] = []
@@ -231,36 +466,30 @@ def analyze_audio_shift_bytes(
     embed_z = [None] * len(segs)
     embed_anom = [0.0] * len(segs)
 
-    if use_embeddings:
-        if not wav2vec2_available():
-            warnings.append(f"wav2vec2 disabled: {wav2vec2_import_error()}")
-        else:
-            waves = [x[a:b] for (a, b) in segs]
-            mat, meta = embed_segments_wav2vec2(
-                waves, sr=sr, model_name=embedding_model, batch_size=embed_batch_size
-            )
-            embed_meta = meta
+    if embeds:
+        mat = np.concatenate([m for m, _ in embeds], axis=0)
+        embed_meta = embeds[-1][1]
 
-            # baseline centroid (unit)
-            base = mat[baseline_idx, :]
-            centroid = base.mean(axis=0).astype(np.float32, copy=False)
-            centroid = centroid / (np.linalg.norm(centroid) + cfg.eps)
+        # baseline centroid (unit)
+        base = mat[baseline_idx, :]
+        centroid = base.mean(axis=0).astype(np.float32, copy=False)
+        centroid = centroid / (np.linalg.norm(centroid) + cfg.eps)
 
-            sims = _cos_sim_to_unit_centroid(mat, centroid)  # (N,)
-            dists = (1.0 - sims).astype(np.float32, copy=False)  # higher = further from baseline
+        sims = _cos_sim_to_unit_centroid(mat, centroid)  # (N,)
+        dists = (1.0 - sims).astype(np.float32, copy=False)  # higher = further from baseline
 
-            # baseline dist stats
-            base_d = dists[baseline_idx]
-            embed_mu = float(base_d.mean())
-            embed_sd = float(base_d.std(ddof=0)) + cfg.eps
+        # baseline dist stats
+        base_d = dists[baseline_idx]
+        embed_mu = float(base_d.mean())
+        embed_sd = float(base_d.std(ddof=0)) + cfg.eps
 
-            for i in range(len(segs)):
-                dz = (float(dists[i]) - embed_mu) / embed_sd
-                embed_dist[i] = float(dists[i])
-                embed_z[i] = float(dz)
-                embed_anom[i] = abs(float(dz))
+        for i in range(len(segs)):
+            dz = (float(dists[i]) - embed_mu) / embed_sd
+            embed_dist[i] = float(dists[i])
+            embed_z[i] = float(dz)
+            embed_anom[i] = abs(float(dz))
 
-            embedding_used = True
+        embedding_used = True
 
     # -------- Fuse scores --------
     alpha = float(combine_alpha)
@@ -316,6 +545,8 @@ def analyze_audio_shift_bytes(
                     "zcr": round(float(f["zcr"]), 6),
                     "pauseRatio": round(float(f["pauseRatio"]), 6),
                     "pitchHz": round(float(f["pitchHz"]), 2),
+                    "pitchStdHz": round(float(f["pitchStdHz"]), 2),
+                    "voicedRatio": round(float(f["voicedRatio"]), 4),
                     "embeddingDistance": round(float(embed_dist[i]), 6) if embed_dist[i] is not None else None,
                 },
                 "z": {
@@ -336,15 +567,22 @@ def analyze_audio_shift_bytes(
         "ok": True,
         "mode": "audio_prosody_plus_wav2vec2_baseline_shift",
         "sr": sr,
+        "durationSec": round(n_samples / float(sr), 3),
         "config": {
             "windowSec": cfg.window_sec,
             "hopSec": cfg.hop_sec,
             "baselineSec": cfg.baseline_sec,
             "pitchHzRange": [cfg.fmin, cfg.fmax],
+            "pitchFrameSec": cfg.pitch_frame_sec,
+            "pitchHopSec": cfg.pitch_hop_sec,
             "maxAudioSec": cfg.max_audio_sec,
+            "readBlockSec": cfg.read_block_sec,
+            "shardWorkers": shard_workers,
+            "shardSec": cfg.shard_sec if shard_workers > 1 else None,
             "useEmbeddings": bool(use_embeddings),
             "embeddingModel": embedding_model,
             "embedBatchSize": embed_batch_size,
+            "embeddingMode": embedding_mode,
             "combineAlpha": alpha,
         },
         "baseline": {
@@ -352,6 +590,8 @@ def analyze_audio_shift_bytes(
             "zcr": {"mean": round(mu_zcr, 6), "std": round(sd_zcr, 6)},
             "pauseRatio": {"mean": round(mu_pause, 6), "std": round(sd_pause, 6)},
             "pitchHz": {"mean": round(mu_pitch, 2), "std": round(sd_pitch, 2)},
+            "pitchStdHz": {"mean": round(mu_pitch_sd, 2), "std": round(sd_pitch_sd, 2)},
+            "voicedRatio": {"mean": round(mu_voiced, 4), "std": round(sd_voiced, 4)},
             "embeddingDistance": {
                 "mean": round(float(embed_mu), 6) if embed_mu is not None else None,
                 "std": round(float(embed_sd), 6) if embed_sd is not None else None,
@@ -375,6 +615,8 @@ def analyze_audio_shift_bytes(
             "decayK": k_decay,
         },
         "segments": segments_out,
+        # samples held by the streaming pipeline (plus shard blocks in flight); not model memory
+        "memory": {"audioBufferPeakBytes": int(info.get("buffer_peak_bytes", 0))},
         "warnings": warnings,
         "disclaimer": "Baseline-relative delivery shift signals (prosody + wav2vec2 embeddings). Not medical, not deception detection, not truth verification.",
     }
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from typing import List, Sequence
+
+
+def length_bucketed_batches(lengths: Sequence[int], batch_size: int) -> List[List[int]]:
+    """
+    Groups item indices into batches of similar length to minimise padding.
+
+    Indices are sorted by length (stable, shortest first) and cut into
+    consecutive batches of `batch_size`. Callers write each batch's results
+    back to `out[idxs]`, which restores the original order.
+    """
+    batch_size = max(1, int(batch_size))
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    return [order[i : i + batch_size] for i in range(0, len(order), batch_size)]
+
+
+def equal_length_batches(lengths: Sequence[int], batch_size: int) -> List[List[int]]:
+    """
+    Like length_bucketed_batches, but a batch only ever holds items of exactly
+    the same length, so nothing is padded. For models whose outputs change
+    with zero padding (e.g. wav2vec2-base: group norm, no attention mask).
+    """
+    batch_size = max(1, int(batch_size))
+    by_len: dict = {}
+    for i in sorted(range(len(lengths)), key=lambda i: lengths[i]):
+        by_len.setdefault(lengths[i], []).append(i)
+    return [idxs[i : i + batch_size] for idxs in by_len.values() for i in range(0, len(idxs), batch_size)]
+
+
+def caller_order_batches(n: int, batch_size: int) -> List[List[int]]:
+    """Plain consecutive batches in input order (the un-bucketed baseline)."""
+    batch_size = max(1, int(batch_size))
+    return [list(range(i, min(n, i + batch_size))) for i in range(0, n, batch_size)]
+
+
+def padding_ratio(lengths: Sequence[int], batches: List[List[int]]) -> float:
+    """Fraction of padded positions when each batch is padded to its longest item."""
+    padded = sum(max(lengths[i] for i in b) * len(b) for b in batches if b)
+    real = sum(lengths)
+    return float(1.0 - real / padded) if padded else 0.0
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+EncodeFn = Callable[..., np.ndarray]  # encode_fn(texts, normalize, model_name=...)
+
+
+@dataclass
+class _Job:
+    texts: List[str]
+    normalize: bool
+    model_name: Optional[str] = None
+    future: Future = field(default_factory=Future)
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class EmbeddingBatcher:
+    """
+    Cross-request micro-batching in front of a sentence encoder.
+
+    Callers (FastAPI threadpool workers) submit texts and block on a Future.
+    One background thread drains the queue: it takes the first pending job,
+    keeps collecting jobs for up to `max_wait_ms` or until `max_batch` texts
+    are pending, runs one encode per (model, normalize flag), and fans the
+    rows back.
+    `max_wait_ms <= 0` bypasses the queue and encodes inline.
+    """
+
+    def __init__(self, encode_fn: EncodeFn, max_batch: int = 64, max_wait_ms: float = 5.0):
+        self.encode_fn = encode_fn
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait_ms = float(max_wait_ms)
+        self._queue: "queue.Queue[_Job]" = queue.Queue()
+        self._worker: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "batches": 0,
+            "texts": 0,
+            "jobs": 0,
+            "maxBatchSize": 0,
+            "totalWaitMs": 0.0,
+            "maxWaitMs": 0.0,
+        }
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._worker.start()
+
+    def encode(self, texts: List[str], normalize: bool = True, model_name: Optional[str] = None) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        if self.max_wait_ms <= 0:
+            return np.asarray(self.encode_fn(list(texts), normalize, model_name=model_name))
+
+        job = _Job(texts=list(texts), normalize=bool(normalize), model_name=model_name)
+        self._ensure_worker()
+        self._queue.put(job)
+        return job.future.result()
+
+    def _collect(self) -> List[_Job]:
+        first = self._queue.get()
+        batch = [first]
+        pending = len(first.texts)
+        deadline = time.perf_counter() + self.max_wait_ms / 1000.0
+        while pending < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                job = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(job)
+            pending += len(job.texts)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+
+            groups: Dict[Any, List[_Job]] = {}
+            for j in batch:
+                groups.setdefault((j.model_name, j.normalize), []).append(j)
+
+            for (model_name, flag), jobs in groups.items():
+                texts = [t for j in jobs for t in j.texts]
+                try:
+                    mat = np.asarray(self.encode_fn(texts, flag, model_name=model_name))
+                except BaseException as ex:
+                    for j in jobs:
+                        j.future.set_exception(ex)
+                    continue
+                offset = 0
+                for j in jobs:
+                    j.future.set_result(mat[offset : offset + len(j.texts)])
+                    offset += len(j.texts)
+
+                waits = [(started - j.enqueued_at) * 1000.0 for j in jobs]
+                with self._stats_lock:
+                    s = self._stats
+                    s["batches"] += 1
+                    s["texts"] += len(texts)
+                    s["jobs"] += len(jobs)
+                    s["maxBatchSize"] = max(s["maxBatchSize"], len(texts))
+                    s["totalWaitMs"] += sum(waits)
+                    s["maxWaitMs"] = max(s["maxWaitMs"], max(waits))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            s = dict(self._stats)
+        return {
+            "enabled": self.max_wait_ms > 0,
+            "maxBatch": self.max_batch,
+            "maxWaitMs": self.max_wait_ms,
+            "queueDepth": self._queue.qsize(),
+            "batches": s["batches"],
+            "jobs": s["jobs"],
+            "texts": s["texts"],
+            "avgBatchSize": round(s["texts"] / s["batches"], 2) if s["batches"] else 0.0,
+            "maxBatchSize": s["maxBatchSize"],
+            "avgWaitMs": round(s["totalWaitMs"] / s["jobs"], 3) if s["jobs"] else 0.0,
+            "peakWaitMs": round(s["maxWaitMs"], 3),
+        }
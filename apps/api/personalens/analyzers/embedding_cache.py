@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+CacheKey = Tuple[str, bool, str]
+
+
+def text_key(model_name: str, normalize: bool, text: str) -> CacheKey:
+    """Content-addressed key: (model name, normalize flag, sha256 of the text)."""
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return (model_name, bool(normalize), digest)
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache:
+      - in-memory LRU bounded by `max_items` (0 disables it)
+      - optional on-disk tier (one .npy per key under `disk_dir`)
+
+    Values are float32 vectors. Thread-safe; disk writes are atomic renames so
+    several workers can share one directory.
+    """
+
+    def __init__(self, max_items: int = 10000, disk_dir: Optional[str] = None):
+        self.max_items = max(0, int(max_items))
+        self.disk_dir = disk_dir or None
+        self._mem: "OrderedDict[CacheKey, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memoryHits": 0, "diskHits": 0, "misses": 0, "evictions": 0}
+
+    def _disk_path(self, key: CacheKey) -> str:
+        model_name, normalize, digest = key
+        safe_model = re.sub(r"[^A-Za-z0-9._-]+", "_", model_name)
+        sub = "norm" if normalize else "raw"
+        return os.path.join(self.disk_dir, safe_model, sub, digest[:2], digest + ".npy")
+
+    def _remember(self, key: CacheKey, vec: np.ndarray) -> None:
+        # caller holds the lock
+        if self.max_items <= 0:
+            return
+        self._mem[key] = vec
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_items:
+            self._mem.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def get(self, key: CacheKey) -> Optional[np.ndarray]:
+        with self._lock:
+            vec = self._mem.get(key)
+            if vec is not None:
+                self._mem.move_to_end(key)
+                self._stats["memoryHits"] += 1
+                return vec
+
+        if self.disk_dir:
+            try:
+                vec = np.load(self._disk_path(key), allow_pickle=False)
+            except Exception:
+                vec = None
+            if vec is not None:
+                with self._lock:
+                    self._stats["diskHits"] += 1
+                    self._remember(key, vec)
+                return vec
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def put(self, key: CacheKey, vec: np.ndarray) -> None:
+        vec = np.asarray(vec, dtype=np.float32)
+        with self._lock:
+            self._remember(key, vec)
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+                with os.fdopen(fd, "wb") as fh:
+                    np.save(fh, vec, allow_pickle=False)
+                os.replace(tmp, path)
+            except Exception:
+                # Disk tier is best-effort; the in-memory tier still has the value.
+                pass
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._stats)
+            out["size"] = len(self._mem)
+        lookups = out["memoryHits"] + out["diskHits"] + out["misses"]
+        out["maxItems"] = self.max_items
+        out["diskDir"] = self.disk_dir
+        out["hitRate"] = round((out["memoryHits"] + out["diskHits"]) / lookups, 4) if lookups else 0.0
+        return out
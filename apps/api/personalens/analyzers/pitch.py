@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+@dataclass
+class PitchTrack:
+    f0: np.ndarray  # (F,) Hz, 0.0 where unvoiced
+    voiced: np.ndarray  # (F,) bool
+    centers: np.ndarray  # (F,) frame centre in samples
+
+
+def _next_pow2(n: int) -> int:
+    return 1 << max(0, int(n - 1).bit_length())
+
+
+def track_pitch(
+    x: np.ndarray,
+    sr: int,
+    fmin: float = 70.0,
+    fmax: float = 350.0,
+    frame_sec: float = 0.04,
+    hop_sec: float = 0.01,
+    voicing_threshold: float = 0.25,
+    silence_threshold: float = 0.01,
+    eps: float = 1e-8,
+    block_frames: int = 2048,
+) -> PitchTrack:
+    """
+    Frame-level f0 over the whole signal via FFT autocorrelation.
+
+    Frames are strided views of `x` (no copies until a block is windowed);
+    each block of frames is mean-removed, Hann-windowed and autocorrelated as
+    irfft(|rfft|^2), which is O(frame log frame) per frame instead of the
+    O(n^2) of a direct correlation. The strongest normalised peak inside
+    [sr/fmax, sr/fmin] gives the lag (refined by parabolic interpolation);
+    frames below `voicing_threshold` or quieter than `silence_threshold` RMS
+    are unvoiced.
+    """
+    x = np.asarray(x, dtype=np.float32).reshape(-1)
+    frame = max(1, int(round(frame_sec * sr)))
+    hop = max(1, int(round(hop_sec * sr)))
+    lag_min = max(1, int(sr / fmax))
+    lag_max = min(int(sr / fmin), frame - 1)
+
+    if len(x) < frame or lag_max <= lag_min + 2:
+        return PitchTrack(
+            f0=np.zeros(0, dtype=np.float32),
+            voiced=np.zeros(0, dtype=bool),
+            centers=np.zeros(0, dtype=np.float64),
+        )
+
+    frames = np.lib.stride_tricks.sliding_window_view(x, frame)[::hop]  # (F, frame) view
+    n_frames = frames.shape[0]
+    nfft = _next_pow2(2 * frame)
+    window = np.hanning(frame).astype(np.float32)
+
+    f0 = np.zeros(n_frames, dtype=np.float32)
+    voiced = np.zeros(n_frames, dtype=bool)
+
+    for s in range(0, n_frames, block_frames):
+        blk = frames[s : s + block_frames].astype(np.float32)
+        rms = np.sqrt(np.mean(blk * blk, axis=1) + eps)
+        blk = (blk - blk.mean(axis=1, keepdims=True)) * window
+
+        spec = np.fft.rfft(blk, n=nfft, axis=1)
+        ac = np.fft.irfft(spec.real ** 2 + spec.imag ** 2, n=nfft, axis=1)[:, : lag_max + 2]
+        ac = ac / (ac[:, :1] + eps)
+
+        seg = ac[:, lag_min:lag_max]
+        peak = np.argmax(seg, axis=1)
+        lag = peak + lag_min
+        rows = np.arange(len(lag))
+        peak_v = ac[rows, lag]
+
+        # parabolic interpolation around the integer peak
+        y0 = ac[rows, lag - 1]
+        y2 = ac[rows, lag + 1]
+        denom = y0 - 2.0 * peak_v + y2
+        ok = np.abs(denom) > eps
+        delta = np.where(ok, 0.5 * (y0 - y2) / np.where(ok, denom, 1.0), 0.0)
+        delta = np.clip(delta, -0.5, 0.5)
+        lag_f = lag.astype(np.float32) + delta.astype(np.float32)
+
+        v = (peak_v >= voicing_threshold) & (rms >= silence_threshold)
+        voiced[s : s + len(lag)] = v
+        f0[s : s + len(lag)] = np.where(v, sr / lag_f, 0.0)
+
+    centers = np.arange(n_frames, dtype=np.float64) * hop + frame / 2.0
+    return PitchTrack(f0=f0, voiced=voiced, centers=centers)
+
+
+def pool_pitch(track: PitchTrack, segs: List[Tuple[int, int]]) -> List[Dict[str, float]]:
+    """
+    Per-segment pitch stats from a frame-level track: median and std of
+    voiced f0 (0.0 when the segment has no voiced frames) and voiced ratio.
+    Frames are assigned by their centre sample.
+    """
+    out: List[Dict[str, float]] = []
+    if not segs:
+        return out
+
+    bounds = np.asarray(segs, dtype=np.float64)
+    lo = np.searchsorted(track.centers, bounds[:, 0], side="left")
+    hi = np.searchsorted(track.centers, bounds[:, 1], side="left")
+
+    for a, b in zip(lo.tolist(), hi.tolist()):
+        n = b - a
+        if n <= 0:
+            out.append({"pitchHz": 0.0, "pitchStdHz": 0.0, "voicedRatio": 0.0})
+            continue
+        vmask = track.voiced[a:b]
+        vf0 = track.f0[a:b][vmask]
+        out.append(
+            {
+                "pitchHz": float(np.median(vf0)) if vf0.size else 0.0,
+                "pitchStdHz": float(vf0.std()) if vf0.size > 1 else 0.0,
+                "voicedRatio": float(vmask.mean()),
+            }
+        )
+    return out
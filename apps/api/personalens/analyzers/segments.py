@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import math
+from typing import List, Optional, Tuple, TypeVar
+
+import numpy as np
+
+# Window k of a grid spans [k * hop, k * hop + window) on a position axis:
+# sample indices for audio, seconds for video. Both analyzers build their
+# segments from the same grid; video additionally maps every window to the
+# frames whose timestamps fall inside it.
+
+Num = TypeVar("Num", int, float)
+
+
+def _last_fitting(extent: Num, offset: Num, hop: Num) -> int:
+    # largest k with k * hop + offset <= extent (-1 if none), exact for ints
+    # and for the float products the loops used to compare against
+    if extent - offset < 0:
+        return -1
+    k = int(math.floor((extent - offset) / hop))
+    while (k + 1) * hop + offset <= extent:
+        k += 1
+    while k >= 0 and k * hop + offset > extent:
+        k -= 1
+    return k
+
+
+def grid_windows(
+    extent: Num,
+    window: Num,
+    hop: Num,
+    start: int = 0,
+    final: bool = False,
+    tail: bool = False,
+) -> Tuple[List[Tuple[Num, Num]], int]:
+    """
+    Windows with index >= `start` that are complete once positions up to
+    `extent` are known (k * hop + window <= extent), and the next window
+    index. With `final=True` no more data will come:
+      - tail=True also closes the windows that start within the data
+        (k * hop <= extent), as the video timeline does;
+      - otherwise, if the whole grid is empty, the entire extent [0, extent)
+        becomes one window, as the audio analysis does.
+    Calling it repeatedly with a growing extent and the returned index, then
+    once with final=True, yields exactly the windows of a single final call.
+    """
+    last = _last_fitting(extent, window, hop)
+    if final and tail:
+        last = max(last, _last_fitting(extent, 0, hop))
+    out = [(k * hop, k * hop + window) for k in range(start, last + 1)]
+    nxt = max(start, last + 1)
+    if final and not tail and start == 0 and not out and extent > 0:
+        out.append((0, extent))
+        nxt = 1
+    return out, nxt
+
+
+class Timeline:
+    """
+    Growing array of frame timestamps with searchsorted lookups.
+
+    Timestamps normally arrive in presentation order; if one ever goes
+    backwards, lookups go through a stable argsort of everything seen so far,
+    so results match scanning the timestamps in arrival order either way.
+    """
+
+    def __init__(self, capacity: int = 256):
+        self._t = np.empty(max(1, int(capacity)), dtype=np.float64)
+        self._n = 0
+        self._monotonic = True
+        self._order: Optional[np.ndarray] = None  # argsort of _t[:_order_n] when not monotonic
+        self._order_n = 0
+
+    def __len__(self) -> int:
+        return self._n
+
+    @property
+    def times(self) -> np.ndarray:
+        return self._t[: self._n]
+
+    @property
+    def monotonic(self) -> bool:
+        return self._monotonic
+
+    @property
+    def last(self) -> float:
+        return float(self._t[self._n - 1])
+
+    def append(self, t: float) -> None:
+        if self._n == len(self._t):
+            grown = np.empty(2 * len(self._t), dtype=np.float64)
+            grown[: self._n] = self._t[: self._n]
+            self._t = grown
+        if self._n and t < self._t[self._n - 1]:
+            self._monotonic = False
+        self._t[self._n] = t
+        self._n += 1
+
+    def _sorted(self) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        if self._monotonic:
+            return self.times, None
+        if self._order_n != self._n:
+            self._order = np.argsort(self.times, kind="stable")
+            self._order_n = self._n
+        return self.times[self._order], self._order
+
+    def members(self, t0: float, t1: float) -> List[int]:
+        """Indices (in arrival order) of the timestamps with t0 <= t < t1."""
+        st, order = self._sorted()
+        lo, hi = np.searchsorted(st, [t0, t1], side="left")
+        if order is None:
+            return list(range(int(lo), int(hi)))
+        return sorted(int(i) for i in order[lo:hi])
+
+    def nearest(self, x: float) -> int:
+        """Index of the timestamp closest to x; ties go to the earliest index (like np.argmin)."""
+        st, order = self._sorted()
+        j = int(np.searchsorted(st, x, side="left"))
+        cands = []
+        if j > 0:
+            # leftmost of equal values: with a stable sort, the smallest index
+            cands.append(int(np.searchsorted(st, st[j - 1], side="left")))
+        if j < len(st):
+            cands.append(j)
+        pick = [(abs(float(st[c]) - x), c if order is None else int(order[c])) for c in cands]
+        return min(pick)[1]
+
+
+class WindowedTimeline(Timeline):
+    """
+    Timeline plus a window grid: append() frame timestamps as they are decoded
+    and close() hands out each window (t0, t1, frame indices) once a frame at
+    or past its end has been seen, or at the end with final=True. A window
+    with no frames gets the frame nearest its midpoint so the timeline stays
+    intact.
+
+    Closing as frames arrive gives the windows of a single close(final=True)
+    only while timestamps are monotonic: a frame that goes back in time may
+    belong to windows already handed out. From then on close() hands out
+    nothing until final=True, and a caller that already took windows should
+    reopen() and close(final=True) to get the whole grid again.
+    """
+
+    def __init__(self, window: float, hop: float, capacity: int = 256):
+        super().__init__(capacity)
+        self.window = float(window)
+        self.hop = float(hop)
+        self.next_index = 0
+
+    def close(self, final: bool = False) -> List[Tuple[float, float, List[int]]]:
+        if not len(self) or not (final or self.monotonic):
+            return []
+        wins, self.next_index = grid_windows(
+            self.last, self.window, self.hop, start=self.next_index, final=final, tail=True
+        )
+        out = []
+        for t0, t1 in wins:
+            idxs = self.members(t0, t1)
+            if not idxs:
+                idxs = [self.nearest((t0 + t1) / 2.0)]
+            out.append((t0, t1, idxs))
+        return out
+
+    def reopen(self) -> None:
+        """Forget which windows were handed out; the next close() starts from the first."""
+        self.next_index = 0
+
+    @property
+    def next_start(self) -> float:
+        """Start time of the first window not handed out yet."""
+        return self.next_index * self.hop
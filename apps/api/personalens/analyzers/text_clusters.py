@@ -1,11 +1,13 @@
 from __future__ import annotations
 
-import math
 import random
 import re
 from typing import Any, Dict, List, Optional
 
-from personalens.analyzers.text_embeddings import embed_texts, embedding_model_name
+import numpy as np
+
+from personalens.analyzers.text_embeddings import embed_texts_array, embedding_model_name
+from personalens.analyzers.vector_math import similarities, unit_centroid
 
 _STOPWORDS = {
     "a","an","the","and","or","but","if","then","else","when","while","for","to","of","in","on","at","by","from",
@@ -15,25 +17,6 @@ _STOPWORDS = {
     "than","too","not","no","yes","do","does","did","done","have","has","had",
 }
 
-def _dot(a: List[float], b: List[float]) -> float:
-    return sum(x * y for x, y in zip(a, b))
-
-def _norm(v: List[float]) -> float:
-    return math.sqrt(sum(x * x for x in v)) or 1.0
-
-def _normalize(v: List[float]) -> List[float]:
-    n = _norm(v)
-    return [x / n for x in v]
-
-def _mean_vec(vecs: List[List[float]]) -> List[float]:
-    dim = len(vecs[0])
-    out = [0.0] * dim
-    for v in vecs:
-        for i, x in enumerate(v):
-            out[i] += x
-    out = [x / len(vecs) for x in out]
-    return _normalize(out)
-
 def _extract_keywords(text: str, k: int = 6) -> List[str]:
     toks = re.findall(r"[a-z0-9]+(?:[-+][a-z0-9]+)*", (text or "").lower())
     freq: Dict[str, int] = {}
@@ -47,7 +30,7 @@ def _extract_keywords(text: str, k: int = 6) -> List[str]:
     return [w for w, _ in ranked[:k]]
 
 def _kmeans_cosine(
-    vecs: List[List[float]],
+    vecs: np.ndarray,
     k: int,
     seed: int = 42,
     max_iter: int = 25,
@@ -56,8 +39,9 @@ def _kmeans_cosine(
     K-means on unit-normalized vectors using cosine distance.
     Since vectors are normalized, cosine similarity = dot product.
     Distance = 1 - similarity.
+    vecs: (N, D) matrix. Returns centroids as a (k, D) matrix.
     """
-    n = len(vecs)
+    n = int(vecs.shape[0])
     if k < 2:
         k = 2
     if k > n:
@@ -65,55 +49,40 @@ def _kmeans_cosine(
 
     rnd = random.Random(seed)
     init_idx = rnd.sample(range(n), k)
-    centroids = [vecs[i][:] for i in init_idx]  # already normalized
+    centroids = np.asarray(vecs[init_idx], dtype=np.float64)  # already normalized
 
-    assignments = [-1] * n
+    assignments = np.full(n, -1, dtype=np.int64)
 
     for _ in range(max_iter):
-        changed = False
-
-        # Assign step
-        for i, v in enumerate(vecs):
-            best_c = 0
-            best_sim = _dot(v, centroids[0])
-            for c in range(1, k):
-                sim = _dot(v, centroids[c])
-                if sim > best_sim:
-                    best_sim = sim
-                    best_c = c
-            if assignments[i] != best_c:
-                assignments[i] = best_c
-                changed = True
-
-        if not changed:
+        # Assign step (argmax keeps the lowest cluster id on ties)
+        new_assign = np.argmax(similarities(vecs, centroids.T), axis=1)
+        if np.array_equal(new_assign, assignments):
             break
+        assignments = new_assign
 
         # Update step
-        buckets: List[List[int]] = [[] for _ in range(k)]
-        for i, c in enumerate(assignments):
-            buckets[c].append(i)
-
         for c in range(k):
-            if not buckets[c]:
+            members = vecs[assignments == c]
+            if members.shape[0] == 0:
                 # Re-seed empty cluster with a random point
-                centroids[c] = vecs[rnd.randrange(n)][:]
+                centroids[c] = vecs[rnd.randrange(n)]
                 continue
-            cluster_vecs = [vecs[i] for i in buckets[c]]
-            centroids[c] = _mean_vec(cluster_vecs)
+            centroids[c] = unit_centroid(members)
 
-    return {"k": k, "assignments": assignments, "centroids": centroids}
+    return {"k": k, "assignments": assignments.tolist(), "centroids": centroids}
 
 def analyze_text_clusters(
     texts: List[str],
     k: int = 3,
     seed: int = 42,
     max_iter: int = 25,
+    model_name: Optional[str] = None,
 ) -> Dict[str, Any]:
     cleaned = [(t or "").strip() for t in (texts or []) if (t or "").strip()]
     if len(cleaned) < 2:
         return {"ok": False, "error": "Need at least 2 non-empty texts to cluster."}
 
-    vecs = embed_texts(cleaned, normalize=True)  # unit vectors
+    vecs = embed_texts_array(cleaned, normalize=True, model_name=model_name)  # (N, D) unit vectors
     km = _kmeans_cosine(vecs, k=k, seed=seed, max_iter=max_iter)
 
     assignments = km["assignments"]
@@ -142,8 +111,7 @@ def analyze_text_clusters(
             )
             continue
 
-        centroid = centroids[c]
-        sims = [float(_dot(vecs[i], centroid)) for i in idxs]
+        sims = similarities(vecs[idxs], centroids[c]).tolist()
         avg_sim = sum(sims) / len(sims)
 
         # representative = closest to centroid (highest similarity)
@@ -180,7 +148,7 @@ def analyze_text_clusters(
 
     return {
         "ok": True,
-        "embeddingModel": embedding_model_name(),
+        "embeddingModel": embedding_model_name(model_name),
         "count": len(cleaned),
         "k": k_used,
         "seed": seed,
@@ -1,28 +1,17 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List
-import math
+from typing import Any, Dict, List, Optional
 
-from personalens.analyzers.text_embeddings import embed_texts, embedding_model_name
+from personalens.analyzers.text_embeddings import embed_texts_array, embedding_model_name
+from personalens.analyzers.vector_math import (
+    outlier_indices,
+    similarities,
+    similarity_stats,
+    unit_centroid,
+)
 
 
-def _dot(a: List[float], b: List[float]) -> float:
-    return sum(x * y for x, y in zip(a, b))
-
-
-def _mean(xs: List[float]) -> float:
-    return sum(xs) / len(xs) if xs else 0.0
-
-
-def _std(xs: List[float]) -> float:
-    if len(xs) <= 1:
-        return 0.0
-    m = _mean(xs)
-    var = sum((x - m) ** 2 for x in xs) / (len(xs) - 1)
-    return math.sqrt(var)
-
-
-def analyze_text_drift(texts: List[str]) -> Dict[str, Any]:
+def analyze_text_drift(texts: List[str], model_name: Optional[str] = None) -> Dict[str, Any]:
     """
     Computes semantic consistency/drift using transformer embeddings.
 
@@ -42,24 +31,18 @@ def analyze_text_drift(texts: List[str]) -> Dict[str, Any]:
             "error": "Need at least 2 non-empty texts to compute drift.",
         }
 
-    vecs = embed_texts(cleaned, normalize=True)
-    dim = len(vecs[0]) if vecs else 0
+    vecs = embed_texts_array(cleaned, normalize=True, model_name=model_name)  # (N, D)
+    dim = int(vecs.shape[1]) if vecs.size else 0
 
     # centroid = mean(vecs) then normalize to unit length
-    centroid = [0.0] * dim
-    for v in vecs:
-        for i, x in enumerate(v):
-            centroid[i] += x
-    centroid = [x / len(vecs) for x in centroid]
-
-    norm = math.sqrt(sum(x * x for x in centroid)) or 1.0
-    centroid = [x / norm for x in centroid]
+    centroid = unit_centroid(vecs)
 
-    sims = [_dot(v, centroid) for v in vecs]  # cosine similarity to centroid
-    mean_sim = _mean(sims)
-    min_sim = min(sims)
-    max_sim = max(sims)
-    std_sim = _std(sims)
+    sims = similarities(vecs, centroid)  # cosine similarity to centroid
+    st = similarity_stats(sims)
+    mean_sim = st["mean"]
+    min_sim = st["min"]
+    max_sim = st["max"]
+    std_sim = st["std"]
 
     # Convert similarity to a “drift score” on 0..100:
     # high similarity => low drift
@@ -68,19 +51,18 @@ def analyze_text_drift(texts: List[str]) -> Dict[str, Any]:
 
     # Identify outliers: anything much lower than the mean
     # threshold: mean - 1.25 * std (simple, interpretable baseline)
-    threshold = mean_sim - (1.25 * std_sim)
-    outlier_indices = [i for i, s in enumerate(sims) if s < threshold]
+    outliers = outlier_indices(sims, mean_sim, std_sim, k=1.25).tolist()
 
     return {
         "ok": True,
-        "embeddingModel": embedding_model_name(),
+        "embeddingModel": embedding_model_name(model_name),
         "count": len(cleaned),
         "embeddingDim": dim,
-        "similarityToCentroid": [round(s, 4) for s in sims],
+        "similarityToCentroid": [round(s, 4) for s in sims.tolist()],
         "meanSimilarity": round(mean_sim, 4),
         "minSimilarity": round(min_sim, 4),
         "maxSimilarity": round(max_sim, 4),
         "stdSimilarity": round(std_sim, 4),
         "driftScore": round(drift_score, 2),
-        "outlierIndices": outlier_indices,
+        "outlierIndices": outliers,
     }
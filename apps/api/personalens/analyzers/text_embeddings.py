@@ -1,46 +1,209 @@
 from __future__ import annotations
 
-from typing import List
-import threading
+from typing import Any, Dict, List, Optional
+import os
 
-_MODEL = None
-_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
-_LOCK = threading.Lock()
+import numpy as np
 
+from personalens.analyzers.batching import caller_order_batches, length_bucketed_batches
+from personalens.analyzers.embedding_batcher import EmbeddingBatcher
+from personalens.analyzers.embedding_cache import EmbeddingCache, text_key
+from personalens.model_registry import REGISTRY
 
-def get_model():
-    global _MODEL
-    if _MODEL is None:
-        with _LOCK:
-            if _MODEL is None:
-                from sentence_transformers import SentenceTransformer
-                _MODEL = SentenceTransformer(_MODEL_NAME)
-    return _MODEL
+# Default sentence-transformers model; requests may pick another one from
+# PERSONALENS_TEXT_MODELS (comma-separated, default: just the default model),
+# loaded on demand through the shared model registry.
+_MODEL_NAME = os.environ.get("PERSONALENS_TEXT_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+_ALLOWED_MODELS = [_MODEL_NAME] + [
+    m for m in (x.strip() for x in os.environ.get("PERSONALENS_TEXT_MODELS", "").split(",")) if m and m != _MODEL_NAME
+]
 
+# Inference backend for CPU nodes:
+#   torch       fp32 PyTorch (reference)
+#   torch-int8  PyTorch with dynamic int8 quantization of the Linear layers
+#   onnx        exported ONNX graph on onnxruntime (needs sentence-transformers[onnx]);
+#               PERSONALENS_EMBED_ONNX_FILE picks a pre-quantized file, e.g.
+#               "onnx/model_qint8_avx512_vnni.onnx"
+BACKENDS = ("torch", "torch-int8", "onnx")
+_BACKEND = os.environ.get("PERSONALENS_EMBED_BACKEND", "torch").strip().lower()
+_ONNX_FILE = os.environ.get("PERSONALENS_EMBED_ONNX_FILE") or None
 
-def embed_text(text: str, normalize: bool = True) -> List[float]:
-    model = get_model()
-    vec = model.encode(
-        [text],
-        normalize_embeddings=normalize,
-        show_progress_bar=False,
-    )[0]
-    return vec.tolist()
+# Shared across drift/timeline/reasons/clusters so re-sent texts are not re-encoded.
+# PERSONALENS_EMBED_CACHE_SIZE=0 disables the memory tier; the disk tier is off
+# unless PERSONALENS_EMBED_CACHE_DIR is set.
+_CACHE = EmbeddingCache(
+    max_items=int(os.environ.get("PERSONALENS_EMBED_CACHE_SIZE", "10000")),
+    disk_dir=os.environ.get("PERSONALENS_EMBED_CACHE_DIR") or None,
+)
 
 
-def embed_texts(texts: List[str], normalize: bool = True) -> List[List[float]]:
+def load_model(backend: str = "torch", model_name: Optional[str] = None):
+    """Builds a fresh SentenceTransformer for `backend` (see BACKENDS)."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}'. Use one of: {', '.join(BACKENDS)}.")
+    from sentence_transformers import SentenceTransformer
+
+    name = model_name or _MODEL_NAME
+    if backend == "torch":
+        return SentenceTransformer(name)
+    if backend == "torch-int8":
+        import torch
+
+        model = SentenceTransformer(name, device="cpu")
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    # onnx
+    kwargs = {"file_name": _ONNX_FILE} if _ONNX_FILE else None
+    return SentenceTransformer(name, device="cpu", backend="onnx", model_kwargs=kwargs)
+
+
+def allowed_models() -> List[str]:
+    return list(_ALLOWED_MODELS)
+
+
+def check_model_name(model_name: Optional[str] = None) -> None:
+    """Raises ValueError unless the model may be loaded (see PERSONALENS_TEXT_MODELS)."""
+    if model_name and model_name not in _ALLOWED_MODELS:
+        raise ValueError(f"Unknown embedding_model '{model_name}'. Use one of: {', '.join(_ALLOWED_MODELS)}.")
+
+
+def get_model(model_name: Optional[str] = None):
+    check_model_name(model_name)
+    name = model_name or _MODEL_NAME
+    return REGISTRY.get(
+        "text",
+        embedding_model_name(name),
+        lambda: load_model(_BACKEND, name),
+        device="auto" if _BACKEND == "torch" else "cpu",
+    )
+
+
+# Forward-pass batch size, and whether to group texts of similar token count
+# into the same batch (short posts no longer get padded to a long bio).
+_ENCODE_BATCH = int(os.environ.get("PERSONALENS_EMBED_ENCODE_BATCH", "32"))
+_BUCKET_BY_LENGTH = os.environ.get("PERSONALENS_EMBED_BUCKET", "1") != "0"
+
+
+def _token_counts(model, texts: List[str]) -> List[int]:
+    tok = getattr(model, "tokenizer", None)
+    if tok is None:
+        return [len(t) for t in texts]
+    enc = tok(
+        texts,
+        add_special_tokens=True,
+        truncation=True,
+        max_length=getattr(model, "max_seq_length", None) or 512,
+    )
+    return [len(ids) for ids in enc["input_ids"]]
+
+
+def _encode(
+    texts: List[str],
+    normalize: bool,
+    bucket_by_length: bool | None = None,
+    model=None,
+    model_name: Optional[str] = None,
+) -> np.ndarray:
+    model = model if model is not None else get_model(model_name)
+    if bucket_by_length is None:
+        bucket_by_length = _BUCKET_BY_LENGTH
+
+    if bucket_by_length:
+        batches = length_bucketed_batches(_token_counts(model, texts), _ENCODE_BATCH)
+    else:
+        batches = caller_order_batches(len(texts), _ENCODE_BATCH)
+
+    out = None
+    for idxs in batches:
+        vecs = model.encode(
+            [texts[i] for i in idxs],
+            batch_size=len(idxs),
+            normalize_embeddings=normalize,
+            show_progress_bar=False,
+        )
+        if out is None:
+            out = np.empty((len(texts), vecs.shape[1]), dtype=np.float32)
+        out[idxs] = vecs
+    return out if out is not None else np.zeros((0, 0), dtype=np.float32)
+
+
+# Cache misses from concurrent requests are coalesced into one encode call.
+# PERSONALENS_EMBED_BATCH_WAIT_MS=0 turns this off (encode inline per request).
+_BATCHER = EmbeddingBatcher(
+    _encode,
+    max_batch=int(os.environ.get("PERSONALENS_EMBED_MAX_BATCH", "64")),
+    max_wait_ms=float(os.environ.get("PERSONALENS_EMBED_BATCH_WAIT_MS", "5")),
+)
+
+
+def embed_text(text: str, normalize: bool = True, model_name: Optional[str] = None) -> List[float]:
+    return embed_texts_array([text], normalize=normalize, model_name=model_name)[0].tolist()
+
+
+def embed_texts_array(
+    texts: List[str],
+    normalize: bool = True,
+    model_name: Optional[str] = None,
+) -> np.ndarray:
+    """
+    Batch embedding for multiple texts as an (N, D) float32 matrix.
+    Only cache misses are sent to the model; rows come back in input order.
+    `model_name` overrides the default sentence-transformers model.
+    """
+    name = model_name or _MODEL_NAME
+    keys = [text_key(embedding_model_name(name), normalize, t) for t in texts]
+    found = {}
+    missing: Dict[Any, str] = {}
+    for k, t in zip(keys, texts):
+        if k in found or k in missing:
+            continue
+        vec = _CACHE.get(k)
+        if vec is None:
+            missing[k] = t
+        else:
+            found[k] = vec
+
+    if missing:
+        vecs = _BATCHER.encode(list(missing.values()), normalize=normalize, model_name=name)
+        for k, v in zip(missing.keys(), vecs):
+            _CACHE.put(k, v)
+            found[k] = v
+
+    if not keys:
+        return np.zeros((0, 0), dtype=np.float32)
+    return np.stack([found[k] for k in keys]).astype(np.float32, copy=False)
+
+
+def embed_texts(
+    texts: List[str],
+    normalize: bool = True,
+    model_name: Optional[str] = None,
+) -> List[List[float]]:
     """
     Batch embedding for multiple texts (faster than calling embed_text repeatedly).
-    Returns a list of vectors (JSON-serializable).
+    Returns a list of vectors (JSON-serializable); analyzers should prefer
+    embed_texts_array and only convert at the response boundary.
     """
-    model = get_model()
-    vecs = model.encode(
-        texts,
-        normalize_embeddings=normalize,
-        show_progress_bar=False,
-    )
-    return [v.tolist() for v in vecs]
+    return embed_texts_array(texts, normalize=normalize, model_name=model_name).tolist()
+
+
+def embedding_backend() -> str:
+    return _BACKEND
+
+
+def embedding_model_name(model_name: Optional[str] = None) -> str:
+    # Non-reference backends are tagged so responses (and cache keys) say what ran.
+    name = model_name or _MODEL_NAME
+    if _BACKEND == "torch":
+        return name
+    if _BACKEND == "onnx" and _ONNX_FILE:
+        # the disk cache outlives the process: fp32 and quantized files must not share keys
+        return f"{name} [onnx:{_ONNX_FILE}]"
+    return f"{name} [{_BACKEND}]"
+
+
+def embedding_cache_stats() -> Dict[str, Any]:
+    return _CACHE.stats()
 
 
-def embedding_model_name() -> str:
-    return _MODEL_NAME
+def embedding_batcher_stats() -> Dict[str, Any]:
+    return _BATCHER.stats()
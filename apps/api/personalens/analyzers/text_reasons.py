@@ -1,11 +1,16 @@
 from __future__ import annotations
 
-import math
 import re
 from typing import Any, Dict, List, Optional
 
 from personalens.analyzers.text_signals import analyze_text_signals
-from personalens.analyzers.text_embeddings import embed_texts, embedding_model_name
+from personalens.analyzers.text_embeddings import embed_texts_array, embedding_model_name
+from personalens.analyzers.vector_math import (
+    outlier_indices,
+    similarities,
+    similarity_stats,
+    unit_centroid,
+)
 
 
 _STOPWORDS = {
@@ -17,33 +22,6 @@ _STOPWORDS = {
 }
 
 
-def _dot(a: List[float], b: List[float]) -> float:
-    return sum(x * y for x, y in zip(a, b))
-
-
-def _mean(xs: List[float]) -> float:
-    return sum(xs) / len(xs) if xs else 0.0
-
-
-def _std(xs: List[float]) -> float:
-    if len(xs) <= 1:
-        return 0.0
-    m = _mean(xs)
-    var = sum((x - m) ** 2 for x in xs) / (len(xs) - 1)
-    return math.sqrt(var)
-
-
-def _centroid(vecs: List[List[float]]) -> List[float]:
-    dim = len(vecs[0])
-    c = [0.0] * dim
-    for v in vecs:
-        for i, x in enumerate(v):
-            c[i] += x
-    c = [x / len(vecs) for x in c]
-    n = math.sqrt(sum(x * x for x in c)) or 1.0
-    return [x / n for x in c]
-
-
 def _extract_keywords(text: str, k: int = 6) -> List[str]:
     """
     Lightweight keyword extraction (no extra deps):
@@ -102,6 +80,7 @@ def _reason_tags(signals: Dict[str, Any], sim_to_centroid: Optional[float], is_o
 def analyze_text_reasons(
     texts: List[str],
     indices: Optional[List[int]] = None,
+    model_name: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
     Batch reasons:
@@ -135,14 +114,11 @@ def analyze_text_reasons(
     outlier_local: List[int] = []
 
     if len(cleaned_subset) >= 2:
-        vecs = embed_texts(cleaned_subset, normalize=True)
-        c = _centroid(vecs)
-        sims = [_dot(v, c) for v in vecs]
-
-        mean_sim = _mean(sims)
-        std_sim = _std(sims)
-        threshold = mean_sim - (1.25 * std_sim)
-        outlier_local = [i for i, s in enumerate(sims) if s < threshold]
+        vecs = embed_texts_array(cleaned_subset, normalize=True, model_name=model_name)
+        sim_arr = similarities(vecs, unit_centroid(vecs))
+        st = similarity_stats(sim_arr)
+        outlier_local = outlier_indices(sim_arr, st["mean"], st["std"], k=1.25).tolist()
+        sims = sim_arr.tolist()
 
     outlier_set = set(outlier_local)
 
@@ -166,7 +142,7 @@ def analyze_text_reasons(
 
     return {
         "ok": True,
-        "embeddingModel": embedding_model_name() if len(cleaned_subset) >= 2 else None,
+        "embeddingModel": embedding_model_name(model_name) if len(cleaned_subset) >= 2 else None,
         "count": len(cleaned_subset),
         "items": items,
     }
@@ -1,5 +1,6 @@
 import re
-from typing import List, Optional, Dict, Any
+from functools import lru_cache
+from typing import List, Optional, Dict, Any, Iterable, Iterator, Tuple
 
 BUZZWORDS = [
     "synergy","leverage","scalable","disrupt","disruption","ai","ml","deep learning","blockchain",
@@ -25,17 +26,51 @@ def word_list(text: str) -> List[str]:
     return re.findall(r"[a-z0-9]+(?:[-+][a-z0-9]+)*", t)
 
 
+def _alternation(phrases) -> str:
+    # Longest first so a phrase is never shadowed by a shorter prefix of itself.
+    ordered = sorted(set(phrases), key=lambda p: (-len(p), p))
+    return "|".join(re.escape(p) for p in ordered)
+
+
+@lru_cache(maxsize=32)
+def _compile_phrases(phrases: Tuple[str, ...]) -> "re.Pattern[str]":
+    return re.compile(r"\b(?:" + _alternation(phrases) + r")\b")
+
+
 def count_phrases(text: str, phrases: List[str]) -> int:
     """
     Counts occurrences of each phrase in `phrases` within `text`.
     Uses word-boundary guards on both ends to reduce substring matches.
+    The combined pattern is compiled once per phrase list and cached.
     """
-    t = normalize(text)
-    total = 0
-    for p in phrases:
-        pat = r"\b" + re.escape(p) + r"\b"
-        total += len(re.findall(pat, t))
-    return total
+    if not phrases:
+        return 0
+    pat = _compile_phrases(tuple(phrases))
+    return sum(1 for _ in pat.finditer(normalize(text)))
+
+
+# One pattern for all three lexicons; the named group tells us which list hit.
+# The lists share no entries and no entry starts inside another at a word
+# boundary, so a single left-to-right scan gives the same counts as running
+# one `\bphrase\b` search per entry.
+_LEXICON_RE = re.compile(
+    r"\b(?:"
+    r"(?P<buzzword>" + _alternation(BUZZWORDS) + r")"
+    r"|(?P<hedge>" + _alternation(HEDGES) + r")"
+    r"|(?P<absolute>" + _alternation(ABSOLUTES) + r")"
+    r")\b"
+)
+
+
+def count_lexicon_hits(text: str) -> Dict[str, int]:
+    """
+    Single pass over `text` counting BUZZWORDS / HEDGES / ABSOLUTES hits.
+    Returns {"buzzword": n, "hedge": n, "absolute": n}.
+    """
+    counts = {"buzzword": 0, "hedge": 0, "absolute": 0}
+    for m in _LEXICON_RE.finditer(normalize(text)):
+        counts[m.lastgroup] += 1
+    return counts
 
 
 _METRIC_RE = re.compile(
@@ -57,9 +92,10 @@ def analyze_text_signals(text: str) -> Dict[str, Any]:
     sentences = [s.strip() for s in re.split(r"[.!?]+", text or "") if s.strip()]
     sentence_count = max(1, len(sentences))
 
-    buzzword_hits = count_phrases(text, BUZZWORDS)
-    hedge_hits = count_phrases(text, HEDGES)
-    absolute_hits = count_phrases(text, ABSOLUTES)
+    lexicon = count_lexicon_hits(text)
+    buzzword_hits = lexicon["buzzword"]
+    hedge_hits = lexicon["hedge"]
+    absolute_hits = lexicon["absolute"]
 
     metric_hits = len(list(_METRIC_RE.finditer(text or "")))
 
@@ -83,3 +119,13 @@ def analyze_text_signals(text: str) -> Dict[str, Any]:
         "absoluteHits": absolute_hits,
         "buzzwordPer100Words": round(buzzword_per_100, 1),
     }
+
+
+def analyze_text_signals_batch(texts: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily yields analyze_text_signals(...) for each text, in input order.
+    Consumes `texts` one item at a time so callers can stream arbitrarily
+    large inputs (e.g. a JSONL upload) with flat memory.
+    """
+    for text in texts:
+        yield analyze_text_signals(text)
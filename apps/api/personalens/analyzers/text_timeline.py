@@ -1,41 +1,24 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 from datetime import date
-import math
 
-from personalens.analyzers.text_embeddings import embed_texts, embedding_model_name
-
-
-def _dot(a: List[float], b: List[float]) -> float:
-    return sum(x * y for x, y in zip(a, b))
-
-
-def _mean(xs: List[float]) -> float:
-    return sum(xs) / len(xs) if xs else 0.0
-
-
-def _std(xs: List[float]) -> float:
-    if len(xs) <= 1:
-        return 0.0
-    m = _mean(xs)
-    var = sum((x - m) ** 2 for x in xs) / (len(xs) - 1)
-    return math.sqrt(var)
-
-
-def _centroid(vecs: List[List[float]]) -> List[float]:
-    dim = len(vecs[0])
-    c = [0.0] * dim
-    for v in vecs:
-        for i, x in enumerate(v):
-            c[i] += x
-    c = [x / len(vecs) for x in c]
-    # normalize centroid
-    n = math.sqrt(sum(x * x for x in c)) or 1.0
-    return [x / n for x in c]
-
-
-def analyze_text_timeline(items: List[Dict[str, str]], window: int = 3, stride: int = 1) -> Dict[str, Any]:
+from personalens.analyzers.text_embeddings import embed_texts_array, embedding_model_name
+from personalens.analyzers.vector_math import (
+    consecutive_similarities,
+    outlier_indices,
+    similarities,
+    similarity_stats,
+    unit_centroid,
+)
+
+
+def analyze_text_timeline(
+    items: List[Dict[str, str]],
+    window: int = 3,
+    stride: int = 1,
+    model_name: Optional[str] = None,
+) -> Dict[str, Any]:
     """
     Timeline drift:
       - Sort items by date.
@@ -64,13 +47,14 @@ def analyze_text_timeline(items: List[Dict[str, str]], window: int = 3, stride:
     texts = [x["text"] for x in cleaned]
     dates = [x["date"].isoformat() for x in cleaned]
 
-    vecs = embed_texts(texts, normalize=True)
-    n = len(vecs)
+    vecs = embed_texts_array(texts, normalize=True, model_name=model_name)  # (N, D)
+    n = int(vecs.shape[0])
 
     # Pairwise similarity/drift
+    pair_sims = consecutive_similarities(vecs).tolist()  # cosine similarity (normalized)
     pairwise = []
     for i in range(1, n):
-        sim = _dot(vecs[i - 1], vecs[i])  # cosine similarity (normalized)
+        sim = pair_sims[i - 1]
         drift = max(0.0, min(100.0, (1.0 - sim) * 100.0))
         pairwise.append(
             {
@@ -93,15 +77,14 @@ def analyze_text_timeline(items: List[Dict[str, str]], window: int = 3, stride:
     for start in range(0, n - w + 1, s):
         end = start + w  # exclusive
         slice_vecs = vecs[start:end]
-        c = _centroid(slice_vecs)
-        sims = [_dot(v, c) for v in slice_vecs]
-        mean_sim = _mean(sims)
-        std_sim = _std(sims)
+        c = unit_centroid(slice_vecs)
+        sims = similarities(slice_vecs, c)
+        st = similarity_stats(sims)
+        mean_sim = st["mean"]
+        std_sim = st["std"]
 
         drift_score = max(0.0, min(100.0, (1.0 - mean_sim) * 100.0))
-        threshold = mean_sim - (1.25 * std_sim)
-        outliers_local = [i for i, val in enumerate(sims) if val < threshold]
-        outliers_global = [start + i for i in outliers_local]
+        outliers_global = (start + outlier_indices(sims, mean_sim, std_sim, k=1.25)).tolist()
 
         windows.append(
             {
@@ -111,8 +94,8 @@ def analyze_text_timeline(items: List[Dict[str, str]], window: int = 3, stride:
                 "endDate": dates[end - 1],
                 "count": w,
                 "meanSimilarity": round(mean_sim, 4),
-                "minSimilarity": round(min(sims), 4),
-                "maxSimilarity": round(max(sims), 4),
+                "minSimilarity": round(st["min"], 4),
+                "maxSimilarity": round(st["max"], 4),
                 "stdSimilarity": round(std_sim, 4),
                 "driftScore": round(drift_score, 2),
                 "outlierIndices": outliers_global,
@@ -121,7 +104,7 @@ def analyze_text_timeline(items: List[Dict[str, str]], window: int = 3, stride:
 
     return {
         "ok": True,
-        "embeddingModel": embedding_model_name(),
+        "embeddingModel": embedding_model_name(model_name),
         "count": n,
         "window": w,
         "stride": s,
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from typing import Dict
+
+import numpy as np
+
+# Shared matrix helpers for the text analyzers.
+# Inputs are (N, D) embedding matrices; reductions run in float64 so the
+# rounded outputs match the old pure-Python loops.
+
+
+def l2_normalize_rows(mat: np.ndarray, eps: float = 0.0) -> np.ndarray:
+    n = np.linalg.norm(mat, axis=-1, keepdims=True)
+    n = np.where(n > eps, n, 1.0)
+    return mat / n
+
+
+def unit_centroid(mat: np.ndarray) -> np.ndarray:
+    """Mean of the rows, L2-normalized (zero vector stays zero)."""
+    c = np.asarray(mat).mean(axis=0, dtype=np.float64)
+    return l2_normalize_rows(c)
+
+
+def similarities(mat: np.ndarray, vec: np.ndarray) -> np.ndarray:
+    """Dot product of every row with `vec` (cosine similarity for unit vectors)."""
+    return np.asarray(mat, dtype=np.float64) @ np.asarray(vec, dtype=np.float64)
+
+
+def consecutive_similarities(mat: np.ndarray) -> np.ndarray:
+    """Dot product of each row with the previous one: shape (N - 1,)."""
+    m = np.asarray(mat, dtype=np.float64)
+    return np.einsum("ij,ij->i", m[:-1], m[1:])
+
+
+def similarity_stats(sims: np.ndarray) -> Dict[str, float]:
+    """mean / sample std (ddof=1, 0 for a single value) / min / max as Python floats."""
+    sims = np.asarray(sims, dtype=np.float64)
+    if sims.size == 0:
+        return {"mean": 0.0, "std": 0.0, "min": 0.0, "max": 0.0}
+    return {
+        "mean": float(sims.mean()),
+        "std": float(sims.std(ddof=1)) if sims.size > 1 else 0.0,
+        "min": float(sims.min()),
+        "max": float(sims.max()),
+    }
+
+
+def outlier_indices(sims: np.ndarray, mean: float, std: float, k: float = 1.25) -> np.ndarray:
+    """Indices whose similarity falls below mean - k * std."""
+    return np.flatnonzero(np.asarray(sims) < (mean - k * std))
@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import bisect
+from collections import deque
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# A long video can be decoded by several processes at once. The timeline is
+# cut at keyframes into shards; each worker opens the file, seeks to its
+# shard's keyframe and writes the frames the sequential decoder would keep
+# straight into a shared memory block, and the parent hands them out in
+# order. Which frames are kept is worked out up front from the packet
+# timestamps (a demux-only pass, no decoding), so the output matches
+# iter_video_frames(decode_mode="all") frame for frame.
+#
+# Shards hold about _SHARD_BYTES of kept frames (at least _SHARD_MIN_FRAMES)
+# and only 2 * workers of them are decoded or waiting at a time, so shared
+# memory use does not grow with the length of the video.
+_SHARD_BYTES = 32 << 20
+_SHARD_MIN_FRAMES = 32
+
+
+@dataclass(frozen=True)
+class _Shard:
+    path: str
+    start_pts: Optional[int]  # keyframe to seek to (None: decode from the beginning)
+    keep_pts: Tuple[int, ...]  # pts of the frames to keep, ascending
+    expected: int  # frames with start_pts <= pts <= keep_pts[-1], to check nothing was dropped
+    size: Tuple[int, int]  # (width, height) of the kept frames
+    short_side: Optional[int]
+    shm_name: str = ""
+
+
+@dataclass
+class _Plan:
+    src_fps: float
+    stride: int
+    time_base: float
+    src_size: Tuple[int, int]
+    size: Tuple[int, int]
+    kept: List[int]
+    shards: List[_Shard]
+
+
+def _plan(
+    path: str,
+    target_fps: float,
+    max_seconds: float,
+    max_frames: int,
+    short_side: Optional[int],
+    workers: int,
+) -> Optional[_Plan]:
+    # None if the stream cannot be planned from packet timestamps alone
+    import av  # type: ignore
+
+    from .video_shift import _decode_size, _sampling
+
+    container = av.open(path)
+    try:
+        stream = container.streams.video[0]
+        if stream.time_base is None:
+            return None
+        src_fps, stride = _sampling(stream, target_fps)
+        time_base = float(stream.time_base)
+        width, height = stream.codec_context.width, stream.codec_context.height
+        pts: List[int] = []
+        keyframes: List[int] = []
+        for pkt in container.demux(stream):
+            if pkt.size == 0:  # flush packet
+                continue
+            if pkt.pts is None:
+                return None
+            pts.append(pkt.pts)
+            if pkt.is_keyframe:
+                keyframes.append(pkt.pts)
+            # frames come out in presentation order, so once packets are well
+            # past max_seconds every frame the decoder would keep has been seen
+            if pkt.pts * time_base > max_seconds + 10.0:
+                break
+    finally:
+        container.close()
+
+    order = sorted(pts)
+    if not order or not width or not height or len(set(order)) != len(order):
+        return None
+    keyframes.sort()
+
+    # the sequential decoder keeps every stride-th frame up to max_seconds
+    kept = [p for i, p in enumerate(order) if i % stride == 0 and p * time_base <= max_seconds][:max_frames]
+    if not kept:
+        return None
+
+    # at least one shard per worker, and small enough to keep a few in memory
+    size = _decode_size(width, height, short_side)
+    per_shard = max(_SHARD_MIN_FRAMES, _SHARD_BYTES // (size[0] * size[1] * 3))
+    count = max(1, workers, -(-len(kept) // per_shard))
+
+    # cut at the keyframes nearest (at or before) equal shares of the frames to decode
+    last = bisect.bisect_right(order, kept[-1]) - 1
+    starts: List[Optional[int]] = [None]
+    for k in range(1, count):
+        j = bisect.bisect_right(keyframes, order[last * k // count]) - 1
+        if j >= 0 and keyframes[j] > order[0] and (starts[-1] is None or keyframes[j] > starts[-1]):
+            starts.append(keyframes[j])
+
+    shards: List[_Shard] = []
+    for i, start in enumerate(starts):
+        end = starts[i + 1] if i + 1 < len(starts) else None
+        lo = 0 if start is None else bisect.bisect_left(kept, start)
+        hi = len(kept) if end is None else bisect.bisect_left(kept, end)
+        if lo == hi:
+            continue
+        first = 0 if start is None else bisect.bisect_left(order, start)
+        shards.append(
+            _Shard(
+                path=path,
+                start_pts=start,
+                keep_pts=tuple(kept[lo:hi]),
+                expected=bisect.bisect_right(order, kept[hi - 1]) - first,
+                size=size,
+                short_side=short_side,
+            )
+        )
+    return _Plan(src_fps, stride, time_base, (width, height), size, kept, shards)
+
+
+def _decode_shard(shard: _Shard) -> Tuple[int, int]:
+    """Worker: decode one shard into its shared memory block. Returns (decoded, in_range) frame counts."""
+    import av  # type: ignore
+
+    from personalens.workers import _attach
+
+    from .video_shift import _decode_size
+
+    w, h = shard.size
+    keep = shard.keep_pts
+    shm = _attach(shard.shm_name)
+    out = None
+    try:
+        out = np.ndarray((len(keep), h, w, 3), dtype=np.uint8, buffer=shm.buf)
+        container = av.open(shard.path)
+        try:
+            stream = container.streams.video[0]
+            stream.thread_type = "AUTO"
+            if shard.start_pts is not None:
+                container.seek(shard.start_pts, stream=stream, backward=True, any_frame=False)
+            decoded = in_range = j = 0
+            for frame in container.decode(stream):
+                decoded += 1
+                if frame.pts is None:
+                    raise RuntimeError("Decoded a frame without a timestamp.")
+                if shard.start_pts is not None and frame.pts < shard.start_pts:
+                    continue  # before the keyframe (or leading frames of an open GOP)
+                in_range += 1
+                if frame.pts > keep[j]:
+                    raise RuntimeError(f"Frame at pts {keep[j]} was not decoded.")
+                if frame.pts == keep[j]:
+                    if _decode_size(frame.width, frame.height, shard.short_side) != (w, h):
+                        raise RuntimeError("Frame size changed mid-stream.")
+                    out[j] = frame.to_ndarray(width=w, height=h, format="rgb24")
+                    j += 1
+                    if j == len(keep):
+                        break
+            if j != len(keep):
+                raise RuntimeError(f"Stream ended before pts {keep[j]}.")
+            return decoded, in_range
+        finally:
+            container.close()
+    finally:
+        del out
+        shm.close()
+
+
+def _free(shm: shared_memory.SharedMemory) -> None:
+    try:
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+    try:
+        shm.close()
+    except BufferError:
+        pass  # a frame view is still alive; the mapping goes when it does
+
+
+def iter_video_frames_sharded(
+    file_path: str,
+    target_fps: float = 8.0,
+    max_seconds: float = 300.0,
+    max_frames: int = 4000,
+    short_side: Optional[int] = 224,
+    workers: int = 2,
+    meta: Optional[Dict[str, Any]] = None,
+) -> Iterator[Tuple[float, np.ndarray]]:
+    """
+    Same frames and timestamps as iter_video_frames(decode_mode="all"), decoded
+    by up to `workers` processes (see personalens.workers.shard_executor;
+    capped at max_shard_workers()) from keyframe-aligned shards. Shards are
+    handed out in order; at most 2 * workers of them hold a shared memory
+    block at a time, each block created when its shard is submitted and freed
+    once its frames have been yielded.
+
+    Falls back to the sequential decoder if the stream lacks packet
+    timestamps. Raises RuntimeError if a worker does not see exactly the
+    frames the plan expects. `meta` is filled like iter_video_frames does,
+    plus decode_workers and shards.
+    """
+    from personalens.workers import max_shard_workers, shard_executor
+
+    from .video_shift import iter_video_frames
+
+    if meta is None:
+        meta = {}
+    workers = min(workers, max_shard_workers())
+    plan = _plan(file_path, target_fps, max_seconds, max_frames, short_side, workers) if workers > 1 else None
+    if plan is None or len(plan.shards) < 2:
+        meta.update(decode_workers=1, shards=1)
+        yield from iter_video_frames(file_path, target_fps, max_seconds, max_frames, short_side, meta=meta)
+        return
+
+    meta.update(
+        src_fps=plan.src_fps,
+        target_fps=target_fps,
+        stride=plan.stride,
+        decode_mode="all",
+        src_size=list(plan.src_size),
+        frame_size=list(plan.size),
+        expected_kept=len(plan.kept),
+        decode_workers=workers,
+        shards=len(plan.shards),
+    )
+    w, h = plan.size
+    todo = iter(plan.shards)
+    pending: Deque[Tuple[_Shard, shared_memory.SharedMemory, Any]] = deque()
+    frames = None
+    decoded = kept = 0
+
+    def submit(limit: int) -> None:
+        # create blocks only for shards about to be decoded
+        while len(pending) < limit:
+            shard = next(todo, None)
+            if shard is None:
+                return
+            shm = shared_memory.SharedMemory(create=True, size=len(shard.keep_pts) * h * w * 3)
+            try:
+                fut = pool.submit(_decode_shard, _Shard(**{**shard.__dict__, "shm_name": shm.name}))
+            except BaseException:
+                _free(shm)
+                raise
+            pending.append((shard, shm, fut))
+
+    try:
+        pool = shard_executor(workers)
+        submit(2 * workers)
+        while pending:
+            shard, shm, fut = pending[0]
+            n, in_range = fut.result()
+            if in_range != shard.expected:
+                raise RuntimeError(
+                    f"Shard from pts {shard.start_pts} decoded {in_range} frames, expected {shard.expected}."
+                )
+            decoded += n
+            frames = np.ndarray((len(shard.keep_pts), h, w, 3), dtype=np.uint8, buffer=shm.buf)
+            for i, p in enumerate(shard.keep_pts):
+                yield p * plan.time_base, frames[i].copy()
+                kept += 1
+            frames = None
+            pending.popleft()
+            _free(shm)
+            submit(2 * workers)
+    finally:
+        frames = None
+        for _, shm, fut in pending:
+            fut.cancel()
+            _free(shm)
+        meta.update(
+            decoded_frames=decoded,
+            kept_frames=kept,
+            seeks=sum(1 for s in plan.shards if s.start_pts is not None),
+        )
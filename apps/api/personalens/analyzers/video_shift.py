@@ -1,14 +1,25 @@
 from __future__ import annotations
 
+import bisect
 import math
 import os
+import queue
+import sys
 import tempfile
+import threading
+import time
 from dataclasses import dataclass
-from typing import Any, Dict, List, Tuple
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple, Union
 
 import numpy as np
 
-from .videomae_embedder import embed_segment_videomae
+from .segments import WindowedTimeline
+from .videomae_embedder import VideoMAEFrameCache, embed_frame_clips_videomae
+
+ProgressFn = Callable[[Dict[str, Any]], None]
+
+DECODE_MODES = ("all", "nonref", "seek")
+_SEEK_MIN_SKIP = 12  # frames a seek must skip to beat decoding through them
 
 
 @dataclass
@@ -59,73 +70,300 @@ def _to_chw_uint8(rgb_hwc: np.ndarray) -> np.ndarray:
     return np.transpose(rgb_hwc, (2, 0, 1)).astype(np.uint8, copy=False)
 
 
-def decode_video_to_frames(
-    file_path: str,
-    target_fps: float = 8.0,
-    max_seconds: float = 300.0,
-    max_frames: int = 4000,
-) -> Tuple[List[np.ndarray], List[float], Dict[str, Any]]:
-    """
-    Decodes video into RGB frames (HWC uint8) sampled down to ~target_fps.
-    Uses PyAV (FFmpeg binding). :contentReference[oaicite:5]{index=5}
-    """
-    try:
-        import av  # type: ignore
-    except Exception as e:
-        raise RuntimeError(
-            "PyAV is not installed or failed to import. Install with: pip install av"
-        ) from e
+def _decode_size(width: int, height: int, short_side: Optional[int]) -> Tuple[int, int]:
+    # scale so the shorter edge is `short_side` (never upscale), keep aspect ratio
+    if not short_side or min(width, height) <= short_side:
+        return width, height
+    scale = short_side / float(min(width, height))
+    return max(1, int(round(width * scale))), max(1, int(round(height * scale)))
 
-    container = av.open(file_path)
-    stream = container.streams.video[0]
 
+def _expected_kept(stream: Any, container: Any, src_fps: float, stride: int, max_seconds: float, max_frames: int) -> int:
+    # kept-frame estimate from container metadata, used to size the frame buffer
+    dur = None
+    if stream.duration is not None and stream.time_base is not None:
+        dur = float(stream.duration * stream.time_base)
+    elif container.duration is not None:
+        dur = container.duration / 1_000_000.0  # av.time_base is microseconds
+    if not dur or dur <= 0:
+        return min(max_frames, 256)
+    dur = min(dur, max_seconds)
+    return max(1, min(max_frames, int(math.ceil(dur * src_fps / stride)) + 2))
+
+
+def _sampling(stream: Any, target_fps: float) -> Tuple[float, int]:
     avg_rate = stream.average_rate
     src_fps = _safe_float(avg_rate, 30.0) if avg_rate is not None else 30.0
     src_fps = max(1.0, src_fps)
 
     # Downsample frames by simple stride.
     stride = max(1, int(round(src_fps / max(0.1, target_fps))))
+    return src_fps, stride
 
-    frames: List[np.ndarray] = []
-    times: List[float] = []
 
-    i = 0
-    kept = 0
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return round(peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0, 1)
 
-    time_base = float(stream.time_base) if stream.time_base is not None else (1.0 / src_fps)
 
+def _frames_every_stride(container: Any, stride: int, src_fps: float, time_base: float, max_seconds: float, stats: Dict[str, int]):
+    # decode everything, keep every `stride`-th frame
+    i = 0
     for frame in container.decode(video=0):
         # Timestamp in seconds if available
-        if frame.pts is not None:
-            t = float(frame.pts * time_base)
-        else:
-            t = i / src_fps
-
+        t = float(frame.pts * time_base) if frame.pts is not None else i / src_fps
         if t > max_seconds:
+            return
+        if i % stride == 0:
+            yield t, frame
+        i += 1
+        stats["decoded"] = i
+
+
+def _frames_on_grid(frames: Iterator[Any], origin: float, period: float, src_fps: float, time_base: float, max_seconds: float, stats: Dict[str, int]):
+    # keep the first decoded frame at or after each sample time origin + k * period
+    # (half a source frame of tolerance); for constant frame rate video with
+    # every frame decoded these are exactly the frames the stride picks
+    tol = 0.5 / src_fps
+    k = 0
+    for frame in frames:
+        t = float(frame.pts * time_base) if frame.pts is not None else stats["decoded"] / src_fps
+        stats["decoded"] += 1
+        if t > max_seconds:
+            return
+        if t + tol >= origin + k * period:
+            yield t, frame
+            k = int(math.floor((t + tol - origin) / period)) + 1
+
+
+def _keyframe_times(container: Any, stream: Any, time_base: float, max_seconds: float) -> List[float]:
+    # demux only (no decoding) to find where the decoder can jump in
+    kfs: List[float] = []
+    for pkt in container.demux(stream):
+        if pkt.pts is None:
+            continue
+        t = float(pkt.pts * time_base)
+        if pkt.is_keyframe:
+            kfs.append(t)
+        if t > max_seconds + 10.0:
             break
+    container.seek(0)
+    return sorted(kfs)
+
+
+def _frames_seeking(container: Any, stream: Any, origin: float, period: float, src_fps: float, time_base: float, max_seconds: float, stats: Dict[str, int]):
+    # like _frames_on_grid, but when the keyframe before the next sample time
+    # lies ahead of the decoder, seek there instead of decoding the frames in
+    # between
+    kfs = _keyframe_times(container, stream, time_base, max_seconds)
+    tol = 0.5 / src_fps
+    frames = container.decode(stream)
+    pos: Optional[float] = None  # time of the last decoded frame
+    k = 0
+    while True:
+        s = origin + k * period
+        if s > max_seconds:
+            return
+        j = bisect.bisect_right(kfs, s + tol) - 1
+        if j >= 0 and pos is not None and (kfs[j] - pos) * src_fps > _SEEK_MIN_SKIP:
+            container.seek(int(round(kfs[j] / time_base)), stream=stream, backward=True, any_frame=False)
+            frames = container.decode(stream)
+            stats["seeks"] += 1
+        for frame in frames:
+            t = float(frame.pts * time_base) if frame.pts is not None else stats["decoded"] / src_fps
+            stats["decoded"] += 1
+            pos = t
+            if t > max_seconds:
+                return
+            if t + tol >= s:
+                yield t, frame
+                break
+        else:
+            return
+        k = int(math.floor((pos + tol - origin) / period)) + 1
 
-        if i % stride == 0:
-            rgb = frame.to_rgb().to_ndarray()  # (H, W, 3) uint8
-            frames.append(rgb)
-            times.append(t)
-            kept += 1
 
-            if kept >= max_frames:
-                break
+def iter_video_frames(
+    file_path: Union[str, BinaryIO],
+    target_fps: float = 8.0,
+    max_seconds: float = 300.0,
+    max_frames: int = 4000,
+    short_side: Optional[int] = 224,
+    meta: Optional[Dict[str, Any]] = None,
+    decode_mode: str = "all",
+) -> Iterator[Tuple[float, np.ndarray]]:
+    """
+    Decodes video with PyAV (FFmpeg binding) and yields (t, rgb_hwc) for the
+    frames kept at ~target_fps, scaled by FFmpeg while converting to RGB so
+    the shorter side is `short_side` (224 = VideoMAE's input; None keeps full
+    resolution). Only kept frames are converted. :contentReference[oaicite:5]{index=5}
+
+    decode_mode (see DECODE_MODES):
+      - "all": decode every frame and keep every stride-th one.
+      - "nonref": the decoder skips non-reference frames (skip_frame=NONREF,
+        typically most B-frames); the frame at or just after each sample time
+        is kept. With dense sampling this decodes far fewer frames.
+      - "seek": decode everything near the sample times but seek to the
+        keyframe before a sample time whenever that keyframe lies ahead of
+        the decoder. Pays off when samples are further apart than the GOP.
+    For constant frame rate video "seek" keeps the same frames as "all";
+    "nonref" may pick the next decoded frame when the exact one was skipped.
+
+    FFmpeg decodes with its own frame/slice threads (thread_type="AUTO").
+    `meta`, if given, is filled with src_fps, target_fps, stride, src_size,
+    frame_size and expected_kept before the first frame, and decoded_frames /
+    kept_frames / seeks once decoding stops.
+    """
+    if decode_mode not in DECODE_MODES:
+        raise ValueError(f"Unknown decode_mode '{decode_mode}'. Use one of: {', '.join(DECODE_MODES)}.")
+    try:
+        import av  # type: ignore
+    except Exception as e:
+        raise RuntimeError(
+            "PyAV is not installed or failed to import. Install with: pip install av"
+        ) from e
 
-        i += 1
+    if meta is None:
+        meta = {}
+    container = av.open(file_path)
+    try:
+        stream = container.streams.video[0]
+        stream.thread_type = "AUTO"
+
+        src_fps, stride = _sampling(stream, target_fps)
+        meta.update(
+            src_fps=src_fps,
+            target_fps=target_fps,
+            stride=stride,
+            decode_mode=decode_mode,
+            src_size=[0, 0],
+            frame_size=[0, 0],
+        )
 
-    container.close()
+        time_base = float(stream.time_base) if stream.time_base is not None else (1.0 / src_fps)
+        origin = float(stream.start_time * time_base) if stream.start_time is not None else 0.0
+        period = stride / src_fps
+        stats = {"decoded": 0, "seeks": 0}
 
-    meta = {
-        "src_fps": src_fps,
-        "target_fps": target_fps,
-        "stride": stride,
-        "decoded_frames": i,
-        "kept_frames": kept,
-        "duration_s_est": float(times[-1]) if times else 0.0,
+        if decode_mode == "all":
+            picked = _frames_every_stride(container, stride, src_fps, time_base, max_seconds, stats)
+        elif decode_mode == "nonref":
+            stream.codec_context.skip_frame = "NONREF"
+            picked = _frames_on_grid(container.decode(stream), origin, period, src_fps, time_base, max_seconds, stats)
+        else:
+            picked = _frames_seeking(container, stream, origin, period, src_fps, time_base, max_seconds, stats)
+
+        size: Optional[Tuple[int, int]] = None
+        kept = 0
+        try:
+            for t, frame in picked:
+                if size is None:
+                    size = _decode_size(frame.width, frame.height, short_side)
+                    meta.update(
+                        src_size=[frame.width, frame.height],
+                        frame_size=list(size),
+                        expected_kept=_expected_kept(stream, container, src_fps, stride, max_seconds, max_frames),
+                    )
+
+                # (H, W, 3) uint8, scaled during the colour conversion
+                yield t, frame.to_ndarray(width=size[0], height=size[1], format="rgb24")
+                kept += 1
+
+                if kept >= max_frames:
+                    break
+        finally:
+            picked.close()
+            meta.update(decoded_frames=stats["decoded"], kept_frames=kept, seeks=stats["seeks"])
+    finally:
+        container.close()
+
+
+def _frame_source(
+    file_path: Union[str, BinaryIO],
+    target_fps: float = 8.0,
+    max_seconds: float = 300.0,
+    max_frames: int = 4000,
+    short_side: Optional[int] = 224,
+    meta: Optional[Dict[str, Any]] = None,
+    decode_mode: str = "all",
+    workers: int = 1,
+) -> Iterator[Tuple[float, np.ndarray]]:
+    # several decode processes need a path each can open; anything else decodes in this process
+    if workers > 1 and isinstance(file_path, str):
+        if decode_mode != "all":
+            raise ValueError("Parallel decoding (workers > 1) only supports decode_mode 'all'.")
+        from .video_shards import iter_video_frames_sharded
+
+        return iter_video_frames_sharded(file_path, target_fps, max_seconds, max_frames, short_side, workers, meta=meta)
+    return iter_video_frames(file_path, target_fps, max_seconds, max_frames, short_side, meta=meta, decode_mode=decode_mode)
+
+
+def _decode_meta(meta: Dict[str, Any], times: Sequence[float], buffer_bytes: int, peak_bytes: int) -> Dict[str, Any]:
+    return {
+        "src_fps": meta["src_fps"],
+        "target_fps": meta["target_fps"],
+        "stride": meta["stride"],
+        "decode_mode": meta["decode_mode"],
+        "decoded_frames": meta["decoded_frames"],
+        "seeks": meta["seeks"],
+        "decode_workers": meta.get("decode_workers", 1),
+        "shards": meta.get("shards", 1),
+        "kept_frames": meta["kept_frames"],
+        "duration_s_est": float(times[-1]) if len(times) else 0.0,
+        "src_size": meta["src_size"],
+        "frame_size": meta["frame_size"],
+        "frame_buffer_mb": round(buffer_bytes / (1024.0 * 1024.0), 2),
+        "frame_buffer_peak_mb": round(peak_bytes / (1024.0 * 1024.0), 2),
+        "peak_rss_mb": _peak_rss_mb(),
     }
-    return frames, times, meta
+
+
+def decode_video_to_frames(
+    file_path: Union[str, BinaryIO],
+    target_fps: float = 8.0,
+    max_seconds: float = 300.0,
+    max_frames: int = 4000,
+    short_side: Optional[int] = 224,
+    decode_mode: str = "all",
+    workers: int = 1,
+) -> Tuple[np.ndarray, List[float], Dict[str, Any]]:
+    """
+    Decodes video into RGB frames sampled down to ~target_fps (see
+    iter_video_frames). With workers > 1 and a file path, keyframe-aligned
+    time shards are decoded by that many processes and merged in order
+    through shared memory (see video_shards); the frames are the same.
+
+    Kept frames are written into one contiguous (N, H, W, 3) uint8 array. The
+    array is sized from the container's duration and grown by doubling if that
+    was an underestimate, then trimmed to the kept count.
+    """
+    meta: Dict[str, Any] = {}
+    buf: Optional[np.ndarray] = None
+    buf_peak = 0
+    times: List[float] = []
+    kept = 0
+
+    for t, rgb in _frame_source(file_path, target_fps, max_seconds, max_frames, short_side, meta, decode_mode, workers):
+        if buf is None:
+            buf = np.empty((meta["expected_kept"],) + rgb.shape, dtype=np.uint8)
+        elif kept == len(buf):
+            grown = np.empty((min(max_frames, 2 * len(buf)),) + buf.shape[1:], dtype=np.uint8)
+            grown[:kept] = buf
+            buf_peak = max(buf_peak, buf.nbytes + grown.nbytes)  # both exist while copying
+            buf = grown
+        buf_peak = max(buf_peak, buf.nbytes)
+
+        buf[kept] = rgb
+        times.append(t)
+        kept += 1
+
+    frames = buf[:kept] if buf is not None else np.zeros((0, 0, 0, 3), dtype=np.uint8)
+    return frames, times, _decode_meta(meta, times, frames.nbytes, buf_peak)
 
 
 def build_segments(
@@ -133,29 +371,145 @@ def build_segments(
     window_sec: float,
     hop_sec: float,
 ) -> List[Segment]:
-    if not times:
-        return []
+    timeline = WindowedTimeline(window_sec, hop_sec, capacity=len(times))
+    for t in times:
+        timeline.append(t)
+    return [Segment(t0=t0, t1=t1, frame_indices=idxs) for t0, t1, idxs in timeline.close(final=True)]
 
-    duration = float(times[-1])
-    segs: List[Segment] = []
 
-    t0 = 0.0
-    while t0 <= duration:
-        t1 = t0 + window_sec
-        idxs = [i for i, t in enumerate(times) if (t >= t0 and t < t1)]
-        # If no frames in window, try grabbing nearest frame to midpoint (keeps timeline intact).
-        if not idxs:
-            mid = (t0 + t1) / 2.0
-            nearest = int(np.argmin(np.abs(np.array(times) - mid)))
-            idxs = [nearest]
-        segs.append(Segment(t0=t0, t1=t1, frame_indices=idxs))
-        t0 += hop_sec
+def _baseline_indices(segments: List[Segment], baseline_sec: float, final: bool) -> Optional[List[int]]:
+    # Choose baseline segments by time coverage (at least 2); None until that is settled
+    idxs = [i for i, s in enumerate(segments) if s.t1 <= baseline_sec]
+    if not final and (not segments or segments[-1].t1 <= baseline_sec):
+        return None  # later segments may still fall inside the baseline
+    if len(idxs) < 2:
+        if not final and len(segments) < 2:
+            return None
+        idxs = list(range(min(2, len(segments))))
+    return idxs
 
-    return segs
+
+def _baseline_stats(E: np.ndarray, baseline_idxs: List[int]) -> Tuple[np.ndarray, float, float]:
+    # Baseline centroid
+    Eb = E[baseline_idxs]
+    centroid = Eb.mean(axis=0)
+    c_norm = np.linalg.norm(centroid)
+    if c_norm > 1e-12:
+        centroid = centroid / c_norm
+
+    # Baseline distance distribution
+    baseline_dists = []
+    for i in baseline_idxs:
+        sim = _cosine_sim(E[i], centroid)
+        dist = 1.0 - sim
+        baseline_dists.append(dist)
+    baseline_dists = np.array(baseline_dists, dtype=np.float32)
+
+    mu = float(baseline_dists.mean()) if baseline_dists.size else 0.0
+    sigma = float(baseline_dists.std()) if baseline_dists.size else 1.0
+    return centroid, mu, sigma
+
+
+def _segment_row(i: int, s: Segment, e: np.ndarray, centroid: np.ndarray, mu: float, sigma: float) -> Dict[str, Any]:
+    sim = _cosine_sim(e, centroid)
+    dist = 1.0 - sim
+    return {
+        "i": i,
+        "t0": round(s.t0, 3),
+        "t1": round(s.t1, 3),
+        "cosineSimToBaseline": sim,
+        "distToBaseline": dist,
+        "z": _zscore_abs(dist, mu, sigma),
+    }
+
+
+class _DecodeThread:
+    """
+    Runs the frame decoder (iter_video_frames, or its sharded variant for
+    workers > 1) on a background thread and hands (t, rgb) pairs to
+    the iterating thread through a bounded queue, so the decoder is at most
+    `maxsize` frames ahead. Leaving the `with` block stops and joins the
+    thread; a decode error is re-raised by the iterator.
+    """
+
+    _DONE = object()
+
+    def __init__(self, maxsize: int, **decode_kwargs: Any):
+        self.maxsize = max(1, int(maxsize))
+        self.meta: Dict[str, Any] = {}
+        self.elapsed = 0.0
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=self.maxsize)
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, kwargs=decode_kwargs, name="video-decode", daemon=True)
+
+    def _put(self, item: Any) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self, **decode_kwargs: Any) -> None:
+        t0 = time.perf_counter()
+        frames = _frame_source(meta=self.meta, **decode_kwargs)
+        try:
+            for item in frames:
+                if not self._put(item):
+                    break
+        except BaseException as e:
+            self._error = e
+        finally:
+            frames.close()
+            self.elapsed = time.perf_counter() - t0
+            self._put(self._DONE)
+
+    def __iter__(self) -> Iterator[Tuple[float, np.ndarray]]:
+        while True:
+            item = self._queue.get()
+            if item is self._DONE:
+                if self._error is not None:
+                    raise self._error
+                return
+            yield item
+
+    def __enter__(self) -> "_DecodeThread":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def _refetch_frames(indices: Set[int], file_path: Union[str, BinaryIO], **decode_kwargs: Any) -> Iterator[Tuple[int, np.ndarray]]:
+    # decode again and pick frames by arrival index (the decoders are deterministic)
+    if not isinstance(file_path, str):
+        file_path.seek(0)
+    left = set(indices)
+    frames = _frame_source(file_path, **decode_kwargs)
+    try:
+        for i, (_, rgb) in enumerate(frames):
+            if i in left:
+                left.discard(i)
+                yield i, rgb
+                if not left:
+                    return
+    finally:
+        frames.close()
+    if left:
+        raise RuntimeError("Frames changed between two decodes of the same video.")
+
+
+def _emit(progress: Optional[ProgressFn], **event: Any) -> None:
+    if progress is not None:
+        progress({k: v for k, v in event.items() if v is not None})
 
 
 def analyze_video_shift(
-    file_path: str,
+    file_path: Union[str, BinaryIO],
     model_name: str = "MCG-NJU/videomae-base",
     frames_per_segment: int = 16,
     target_fps: float = 8.0,
@@ -164,94 +518,190 @@ def analyze_video_shift(
     baseline_sec: float = 20.0,
     thr: float = 1.25,
     max_seconds: float = 300.0,
+    progress: Optional[ProgressFn] = None,
+    short_side: Optional[int] = 224,
+    embed_batch_size: int = 8,
+    decode_queue_frames: int = 128,
+    decode_mode: str = "all",
+    decode_workers: int = 1,
 ) -> Dict[str, Any]:
-    frames_hwc, times, decode_meta = decode_video_to_frames(
+    """
+    Decoding runs on a background thread (see _DecodeThread) that hands
+    frames over through a queue of at most `decode_queue_frames`; segments
+    are embedded `embed_batch_size` at a time (one VideoMAE forward pass per
+    batch) as soon as their windows close, so decoding and inference overlap.
+    Only frames a pending segment may still use are held. The result does not
+    depend on the batch or queue size. If a frame timestamp goes backwards,
+    windows stop closing early and the grid is rebuilt once decoding ends;
+    segments from the first changed one on are embedded again (frames already
+    dropped are decoded a second time), so the result still matches building
+    all segments at once.
+
+    `progress`, if given, receives dicts as work advances: {"stage": "decode"},
+    {"stage": "embed", "done": i, "segments": [row, ...]} while decoding,
+    {"stage": "segment", "total": S} once the decoder is done, further embed
+    events (now with "total") and {"stage": "score"}. Rows carry the final
+    per-segment values (before the percentile/spike extras); they start once
+    the baseline segments are embedded, which also flushes the rows so far,
+    and arrive one batch at a time.
+
+    `decode_mode` picks how frames are decoded (see iter_video_frames); "nonref"
+    and "seek" decode fewer frames when target_fps is well below the source
+    rate. `decode_workers` > 1 decodes time shards of a file path in that
+    many processes instead (decode_mode "all" only, same frames; see
+    video_shards). Frames of shards decoded ahead are then held in shared
+    memory until the pipeline reaches them.
+    """
+    if decode_mode not in DECODE_MODES:
+        return {"ok": False, "error": f"Unknown decode_mode '{decode_mode}'. Use one of: {', '.join(DECODE_MODES)}."}
+    if decode_workers > 1 and decode_mode != "all":
+        return {"ok": False, "error": "decode_workers > 1 only supports decode_mode 'all'."}
+
+    t_start = time.perf_counter()
+    _emit(progress, stage="decode")
+
+    batch = max(1, int(embed_batch_size))
+    frames: Dict[int, np.ndarray] = {}  # kept frame index -> RGB, only while a segment may still use it
+    timeline = WindowedTimeline(window_sec, hop_sec)  # frame timestamps + segment grid
+    segments: List[Segment] = []
+    held = held_peak = 0
+
+    seg_embeddings: List[np.ndarray] = []
+    seg_debug: List[Dict[str, Any]] = []
+    baseline_idxs: Optional[List[int]] = None
+    stats = None
+    embed_s = 0.0
+    cache = VideoMAEFrameCache(frames, model_name=model_name)
+
+    def embed_closed(final: bool) -> None:
+        nonlocal baseline_idxs, stats, held, embed_s
+        while len(segments) - len(seg_embeddings) >= (1 if final else batch):
+            t_embed = time.perf_counter()
+            b0 = len(seg_embeddings)
+            clips = []
+            for s in segments[b0 : b0 + batch]:
+                pick = _uniform_pick_indices(len(s.frame_indices), frames_per_segment)
+                clips.append([s.frame_indices[j] for j in pick])
+                seg_debug.append(
+                    {
+                        "t0": s.t0,
+                        "t1": s.t1,
+                        "frames_available": len(s.frame_indices),
+                        "frames_used": frames_per_segment,
+                        "picked_local_indices": pick,
+                    }
+                )
+
+            seg_embeddings.extend(embed_frame_clips_videomae(cache, clips, batch_size=batch))
+            done = len(seg_embeddings)
+
+            # Segments start in time order: a segment not closed yet starts at
+            # next_start or later (and may fall back to the frame just before it).
+            keep_from = 0
+            if timeline.monotonic:
+                keep_from = max(0, int(np.searchsorted(timeline.times, timeline.next_start)) - 1)
+            for s in segments[done:]:
+                keep_from = min(keep_from, min(s.frame_indices))
+            for i in [i for i in frames if i < keep_from]:
+                held -= frames.pop(i).nbytes
+            cache.evict_before(keep_from)
+            embed_s += time.perf_counter() - t_embed
+
+            if baseline_idxs is None:
+                baseline_idxs = _baseline_indices(segments, baseline_sec, final)
+            if progress is None:
+                continue
+            # once the baseline is embedded every further segment can be scored as it lands
+            rows = None
+            if stats is None and baseline_idxs is not None and done > max(baseline_idxs):
+                stats = _baseline_stats(np.stack(seg_embeddings, axis=0), baseline_idxs)
+                rows = [_segment_row(i, segments[i], seg_embeddings[i], *stats) for i in range(done)]
+            elif stats is not None:
+                rows = [_segment_row(i, segments[i], seg_embeddings[i], *stats) for i in range(b0, done)]
+            _emit(progress, stage="embed", done=done, total=len(segments) if final else None, segments=rows)
+
+    decoder = _DecodeThread(
+        decode_queue_frames,
         file_path=file_path,
         target_fps=target_fps,
         max_seconds=max_seconds,
+        short_side=short_side or None,
+        decode_mode=decode_mode,
+        workers=max(1, int(decode_workers)),
+    )
+    with decoder:
+        for t, rgb in decoder:
+            frames[len(timeline)] = rgb
+            timeline.append(t)
+            held += rgb.nbytes
+            held_peak = max(held_peak, held)
+
+            closed = timeline.close()
+            if closed:
+                segments.extend(Segment(t0=t0, t1=t1, frame_indices=idxs) for t0, t1, idxs in closed)
+                embed_closed(final=False)
+
+    rebuild: Dict[str, int] = {}
+    if not timeline.monotonic and segments:
+        # A frame went back in time, so windows handed out before it may have
+        # missed it: rebuild the grid in one go and redo everything from the
+        # first window that changed, decoding again any frame already dropped.
+        timeline.reopen()
+        rebuilt = [Segment(t0=t0, t1=t1, frame_indices=idxs) for t0, t1, idxs in timeline.close(final=True)]
+        same = 0
+        while same < min(len(segments), len(rebuilt)) and segments[same] == rebuilt[same]:
+            same += 1
+        if same < len(segments):
+            del segments[same:], seg_embeddings[same:], seg_debug[same:]
+            baseline_idxs = stats = None
+        segments.extend(rebuilt[len(segments) :])
+        missing = {i for s in segments[same:] for i in s.frame_indices if i not in frames}
+        if missing:
+            for i, rgb in _refetch_frames(
+                missing,
+                file_path=file_path,
+                target_fps=target_fps,
+                max_seconds=max_seconds,
+                short_side=short_side or None,
+                decode_mode=decode_mode,
+                workers=max(1, int(decode_workers)),
+            ):
+                frames[i] = rgb
+                held += rgb.nbytes
+            held_peak = max(held_peak, held)
+        rebuild = {"rebuilt_from_segment": same, "refetched_frames": len(missing)}
+
+    decode_meta = _decode_meta(decoder.meta, timeline.times, held, held_peak)
+    decode_meta.update(rebuild)
+    decode_meta.update(
+        decode_queue_frames=decoder.maxsize,
+        decode_s=round(decoder.elapsed, 3),
+        embed_s=round(embed_s, 3),
     )
 
-    if len(frames_hwc) < 2:
+    if len(timeline) < 2:
         return {
             "ok": False,
             "error": "Too few decodable frames. Try a different video or ensure it contains a video track.",
             "meta": decode_meta,
         }
 
-    segments = build_segments(times, window_sec=window_sec, hop_sec=hop_sec)
+    segments.extend(Segment(t0=t0, t1=t1, frame_indices=idxs) for t0, t1, idxs in timeline.close(final=True))
     if not segments:
         return {"ok": False, "error": "Could not create segments from frames.", "meta": decode_meta}
 
-    # Choose baseline segments by time coverage (at least 2)
-    baseline_idxs = [i for i, s in enumerate(segments) if s.t1 <= baseline_sec]
-    if len(baseline_idxs) < 2:
-        baseline_idxs = list(range(min(2, len(segments))))
-
-    # Compute embeddings per segment
-    seg_embeddings: List[np.ndarray] = []
-    seg_debug: List[Dict[str, Any]] = []
-
-    for s in segments:
-        seg_frames = [frames_hwc[i] for i in s.frame_indices]
-        pick = _uniform_pick_indices(len(seg_frames), frames_per_segment)
-        picked_frames = [_to_chw_uint8(seg_frames[j]) for j in pick]
-
-        emb = embed_segment_videomae(
-            picked_frames,
-            model_name=model_name,
-        )
-        seg_embeddings.append(emb)
-
-        seg_debug.append(
-            {
-                "t0": s.t0,
-                "t1": s.t1,
-                "frames_available": len(seg_frames),
-                "frames_used": frames_per_segment,
-                "picked_local_indices": pick,
-            }
-        )
+    _emit(progress, stage="segment", total=len(segments))
+    embed_closed(final=True)
+    baseline_idxs = _baseline_indices(segments, baseline_sec, final=True)
+    decode_meta.update(embed_s=round(embed_s, 3), wall_s=round(time.perf_counter() - t_start, 3))
 
+    _emit(progress, stage="score")
     E = np.stack(seg_embeddings, axis=0)  # (S, D)
-
-    # Baseline centroid
-    Eb = E[baseline_idxs]
-    centroid = Eb.mean(axis=0)
-    c_norm = np.linalg.norm(centroid)
-    if c_norm > 1e-12:
-        centroid = centroid / c_norm
-
-    # Baseline distance distribution
-    baseline_dists = []
-    for i in baseline_idxs:
-        sim = _cosine_sim(E[i], centroid)
-        dist = 1.0 - sim
-        baseline_dists.append(dist)
-    baseline_dists = np.array(baseline_dists, dtype=np.float32)
-
-    mu = float(baseline_dists.mean()) if baseline_dists.size else 0.0
-    sigma = float(baseline_dists.std()) if baseline_dists.size else 1.0
+    centroid, mu, sigma = _baseline_stats(E, baseline_idxs)
 
     # Segment anomalies
-    results = []
-    anomalies = []
-
-    for i, s in enumerate(segments):
-        sim = _cosine_sim(E[i], centroid)
-        dist = 1.0 - sim
-        z = _zscore_abs(dist, mu, sigma)
-        anomalies.append(z)
-
-        results.append(
-            {
-                "i": i,
-                "t0": round(s.t0, 3),
-                "t1": round(s.t1, 3),
-                "cosineSimToBaseline": sim,
-                "distToBaseline": dist,
-                "z": z,
-            }
-        )
+    results = [_segment_row(i, s, E[i], centroid, mu, sigma) for i, s in enumerate(segments)]
+    anomalies = [r["z"] for r in results]
 
     anomalies_np = np.array(anomalies, dtype=np.float32)
 
@@ -282,6 +732,8 @@ def analyze_video_shift(
             "name": model_name,
             "frames_per_segment": frames_per_segment,
             "target_fps": target_fps,
+            "embed_batch_size": batch,
+            **cache.stats(),
         },
         "params": {
             "window_sec": window_sec,
@@ -289,6 +741,9 @@ def analyze_video_shift(
             "baseline_sec": baseline_sec,
             "thr": thr,
             "max_seconds": max_seconds,
+            "short_side": short_side or None,
+            "decode_mode": decode_mode,
+            "decode_workers": max(1, int(decode_workers)),
         },
         "meta": decode_meta,
         "baseline": {
@@ -305,6 +760,8 @@ def analyze_video_shift(
             "totalSegments": len(results),
         },
         "segments": results,
+        # decoded frames held at once (meta.frame_buffer_peak_mb); not model memory
+        "memory": {"frameBufferPeakBytes": int(held_peak)},
         "disclaimer": "PersonaLens visual shift surfaces baseline-relative delivery/anomaly signals. It is not a lie detector, not medical, and does not verify truth.",
     }
     return payload
@@ -1,12 +1,17 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from functools import lru_cache
-from typing import List, Tuple
+from typing import TYPE_CHECKING, Dict, List, Sequence, Tuple
 
 import numpy as np
-import torch
-from transformers import VideoMAEImageProcessor, VideoMAEModel
+
+from personalens.model_registry import REGISTRY
+
+# torch/transformers are imported inside the functions below so that importing
+# this module (and video_shift) stays cheap until a video request arrives.
+if TYPE_CHECKING:
+    import torch
+    from transformers import VideoMAEImageProcessor, VideoMAEModel
 
 
 @dataclass(frozen=True)
@@ -16,8 +21,10 @@ class _VideoMAEBundle:
     device: torch.device
 
 
-@lru_cache(maxsize=4)
-def _get_videomae_bundle(model_name: str, device_str: str) -> _VideoMAEBundle:
+def _load_videomae_bundle(model_name: str, device_str: str) -> _VideoMAEBundle:
+    import torch
+    from transformers import VideoMAEImageProcessor, VideoMAEModel
+
     device = torch.device(device_str)
 
     processor = VideoMAEImageProcessor.from_pretrained(model_name)
@@ -28,44 +35,179 @@ def _get_videomae_bundle(model_name: str, device_str: str) -> _VideoMAEBundle:
     return _VideoMAEBundle(processor=processor, model=model, device=device)
 
 
+def _get_videomae_bundle(model_name: str, device_str: str) -> _VideoMAEBundle:
+    return REGISTRY.get(
+        "video",
+        model_name,
+        lambda: _load_videomae_bundle(model_name, device_str),
+        device=device_str,
+    )
+
+
+def _default_device() -> str:
+    import torch
+
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
 def _l2_normalize(v: torch.Tensor, eps: float = 1e-12) -> torch.Tensor:
+    import torch
+
     return v / (torch.linalg.norm(v, dim=-1, keepdim=True) + eps)
 
 
-def embed_segment_videomae(
-    frames_chw_uint8: List[np.ndarray],
+def embed_segments_videomae(
+    clips: Sequence[Sequence[np.ndarray]],
     model_name: str = "MCG-NJU/videomae-base",
     device: str | None = None,
+    batch_size: int = 8,
 ) -> np.ndarray:
     """
-    frames_chw_uint8: list of frames shaped (3, H, W), dtype uint8, values 0..255.
-    Returns: embedding vector (hidden_size,) as float32 numpy, L2-normalized.
+    clips: one list of (3, H, W) uint8 frames per segment.
+    Returns: (S, hidden_size) float32 numpy, rows L2-normalized, in input order.
+
+    Clips are run through the processor and model `batch_size` at a time
+    instead of one forward pass per segment. Clips with different frame
+    counts or sizes never share a batch, so no row is padded.
     """
-    if not frames_chw_uint8:
-        raise ValueError("No frames provided for embedding.")
+    if not clips:
+        raise ValueError("No clips provided for embedding.")
+    for frames in clips:
+        if len(frames) == 0:
+            raise ValueError("No frames provided for embedding.")
 
     if device is None:
-        device = "cuda" if torch.cuda.is_available() else "cpu"
+        device = _default_device()
 
     bundle = _get_videomae_bundle(model_name, device)
     processor = bundle.processor
-    model = bundle.model
 
-    # HF processor accepts a list of frames as a "video" input. :contentReference[oaicite:3]{index=3}
-    inputs = processor(frames_chw_uint8, return_tensors="pt")
-    pixel_values = inputs.pixel_values  # commonly [1, T, 3, 224, 224] (processor-dependent)
+    # group by clip geometry, keep input order within each group
+    groups: Dict[Tuple[int, ...], List[int]] = {}
+    for k, frames in enumerate(clips):
+        groups.setdefault((len(frames),) + tuple(np.shape(frames[0])), []).append(k)
 
-    if pixel_values.ndim == 4:
-        # (T, C, H, W) -> (1, T, C, H, W)
-        pixel_values = pixel_values.unsqueeze(0)
+    batch_size = max(1, int(batch_size))
+    out: np.ndarray | None = None
+    for idxs in groups.values():
+        for b in range(0, len(idxs), batch_size):
+            chunk = idxs[b : b + batch_size]
+            # HF processor takes a batch of videos, each a list of frames. :contentReference[oaicite:3]{index=3}
+            inputs = processor([list(clips[k]) for k in chunk], return_tensors="pt")
+            pixel_values = inputs.pixel_values  # (B, T, 3, 224, 224) (processor-dependent)
 
-    pixel_values = pixel_values.to(bundle.device)
+            if pixel_values.ndim == 4:
+                # (T, C, H, W) -> (1, T, C, H, W)
+                pixel_values = pixel_values.unsqueeze(0)
+
+            pooled = _forward_pooled(bundle, pixel_values)
+            if out is None:
+                out = np.empty((len(clips), pooled.shape[1]), dtype=np.float32)
+            out[chunk] = pooled
+
+    return out
+
+
+def _forward_pooled(bundle: _VideoMAEBundle, pixel_values: torch.Tensor) -> np.ndarray:
+    import torch
 
     with torch.no_grad():
-        outputs = model(pixel_values=pixel_values)
+        outputs = bundle.model(pixel_values=pixel_values.to(bundle.device))
         # outputs.last_hidden_state: (B, seq_len, hidden) :contentReference[oaicite:4]{index=4}
-        last = outputs.last_hidden_state
-        pooled = last.mean(dim=1)  # (B, hidden)
-        pooled = _l2_normalize(pooled).squeeze(0)
-
+        pooled = _l2_normalize(outputs.last_hidden_state.mean(dim=1))  # (B, hidden)
     return pooled.detach().cpu().to(torch.float32).numpy()
+
+
+class VideoMAEFrameCache:
+    """
+    Processor output (resize, crop, normalize) per decoded frame, keyed by
+    frame index. Overlapping segments and repeated picks share frames, so each
+    frame goes through the processor once however many clips use it. Frames
+    are processed on first use, a batch of misses per processor call, and
+    evict_before() drops frames no later clip will ask for; an evicted frame
+    that is asked for again is simply processed again.
+    """
+
+    def __init__(
+        self,
+        frames_hwc: Sequence[np.ndarray],
+        model_name: str = "MCG-NJU/videomae-base",
+        device: str | None = None,
+    ):
+        self.frames = frames_hwc
+        self.bundle = _get_videomae_bundle(model_name, device or _default_device())
+        self._store: Dict[int, torch.Tensor] = {}
+        self.processed = 0
+        self.hits = 0
+        self.peak = 0
+
+    def clip(self, idxs: Sequence[int]) -> torch.Tensor:
+        """(T, 3, h, w) float tensor for the frames at idxs, in order."""
+        import torch
+
+        missing = sorted({int(i) for i in idxs if int(i) not in self._store})
+        if missing:
+            # each frame is processed on its own, so a "video" of just the misses is exact
+            pv = self.bundle.processor([[self.frames[i] for i in missing]], return_tensors="pt").pixel_values
+            for i, t in zip(missing, pv.reshape((-1,) + tuple(pv.shape[-3:]))):
+                self._store[i] = t
+            self.processed += len(missing)
+            self.peak = max(self.peak, len(self._store))
+        self.hits += len(idxs) - len(missing)
+        return torch.stack([self._store[int(i)] for i in idxs], dim=0)
+
+    def evict_before(self, i: int) -> None:
+        for k in [k for k in self._store if k < i]:
+            del self._store[k]
+
+    def stats(self) -> Dict[str, int]:
+        return {"frames_preprocessed": self.processed, "frame_cache_hits": self.hits, "frame_cache_peak": self.peak}
+
+
+def embed_frame_clips_videomae(
+    cache: VideoMAEFrameCache,
+    clips: Sequence[Sequence[int]],
+    batch_size: int = 8,
+) -> np.ndarray:
+    """
+    clips: one list of frame indices (into cache.frames) per segment.
+    Returns: (S, hidden_size) float32 numpy, rows L2-normalized, in input
+    order; same values as embed_segments_videomae on the indexed frames.
+    """
+    if not clips:
+        raise ValueError("No clips provided for embedding.")
+    for idxs in clips:
+        if len(idxs) == 0:
+            raise ValueError("No frames provided for embedding.")
+
+    import torch
+
+    groups: Dict[int, List[int]] = {}
+    for k, idxs in enumerate(clips):
+        groups.setdefault(len(idxs), []).append(k)
+
+    batch_size = max(1, int(batch_size))
+    out: np.ndarray | None = None
+    for ks in groups.values():
+        for b in range(0, len(ks), batch_size):
+            chunk = ks[b : b + batch_size]
+            pooled = _forward_pooled(cache.bundle, torch.stack([cache.clip(clips[k]) for k in chunk], dim=0))
+            if out is None:
+                out = np.empty((len(clips), pooled.shape[1]), dtype=np.float32)
+            out[chunk] = pooled
+
+    return out
+
+
+def embed_segment_videomae(
+    frames_chw_uint8: List[np.ndarray],
+    model_name: str = "MCG-NJU/videomae-base",
+    device: str | None = None,
+) -> np.ndarray:
+    """
+    frames_chw_uint8: list of frames shaped (3, H, W), dtype uint8, values 0..255.
+    Returns: embedding vector (hidden_size,) as float32 numpy, L2-normalized.
+    """
+    if not frames_chw_uint8:
+        raise ValueError("No frames provided for embedding.")
+    return embed_segments_videomae([frames_chw_uint8], model_name=model_name, device=device, batch_size=1)[0]
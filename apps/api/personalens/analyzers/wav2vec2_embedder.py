@@ -3,32 +3,36 @@ from __future__ import annotations
 from typing import List, Optional, Tuple
 import numpy as np
 
-_IMPORT_ERROR: Optional[str] = None
-_HAS_TORCH = False
-
-try:
-    import torch
-    from transformers import Wav2Vec2Model, Wav2Vec2Processor
+from personalens.model_registry import REGISTRY
 
-    _HAS_TORCH = True
-except Exception as ex:
-    _IMPORT_ERROR = repr(ex)
-    _HAS_TORCH = False
+from .batching import caller_order_batches, equal_length_batches, length_bucketed_batches
 
-# Global cached singleton (so we don't reload per request)
-_CACHED = {
-    "model_name": None,
-    "processor": None,
-    "model": None,
-    "device": None,
-}
+_IMPORT_ERROR: Optional[str] = None
+_HAS_TORCH: Optional[bool] = None  # unknown until the first audio request
+
+
+def _check_torch() -> bool:
+    # torch/transformers are imported on first use, not at module import,
+    # so text-only workers never pay for them.
+    global _HAS_TORCH, _IMPORT_ERROR
+    if _HAS_TORCH is None:
+        try:
+            import torch  # noqa: F401
+            from transformers import Wav2Vec2Model, Wav2Vec2Processor  # noqa: F401
+
+            _HAS_TORCH = True
+        except Exception as ex:
+            _IMPORT_ERROR = repr(ex)
+            _HAS_TORCH = False
+    return _HAS_TORCH
 
 
 def wav2vec2_available() -> bool:
-    return _HAS_TORCH
+    return _check_torch()
 
 
 def wav2vec2_import_error() -> Optional[str]:
+    _check_torch()
     return _IMPORT_ERROR
 
 
@@ -38,25 +42,22 @@ def _l2_normalize(mat: np.ndarray, eps: float = 1e-8) -> np.ndarray:
 
 
 def _get_wav2vec2(model_name: str = "facebook/wav2vec2-base"):
-    if not _HAS_TORCH:
+    if not _check_torch():
         raise RuntimeError(f"torch/transformers not available: {_IMPORT_ERROR}")
 
-    if _CACHED["model"] is not None and _CACHED["model_name"] == model_name:
-        return _CACHED["processor"], _CACHED["model"], _CACHED["device"]
-
-    device = torch.device("cpu")
+    def load():
+        import torch
+        from transformers import Wav2Vec2Model, Wav2Vec2Processor
 
-    processor = Wav2Vec2Processor.from_pretrained(model_name)
-    model = Wav2Vec2Model.from_pretrained(model_name)
-    model.to(device)
-    model.eval()
+        device = torch.device("cpu")
+        processor = Wav2Vec2Processor.from_pretrained(model_name)
+        model = Wav2Vec2Model.from_pretrained(model_name)
+        model.to(device)
+        model.eval()
+        return processor, model, device
 
-    _CACHED["model_name"] = model_name
-    _CACHED["processor"] = processor
-    _CACHED["model"] = model
-    _CACHED["device"] = device
-
-    return processor, model, device
+    # Shared registry: several wav2vec2 variants can stay loaded side by side.
+    return REGISTRY.get("audio", model_name, load, device="cpu")
 
 
 def embed_segments_wav2vec2(
@@ -64,8 +65,16 @@ def embed_segments_wav2vec2(
     sr: int = 16000,
     model_name: str = "facebook/wav2vec2-base",
     batch_size: int = 8,
+    bucket_by_length: bool = True,
 ) -> Tuple[np.ndarray, dict]:
     """
+    Waves are grouped by sample count before batching (bucket_by_length) so
+    short clips are not padded to the longest one; rows keep input order.
+    Each row is the mean of the frames its own samples produce; frames that
+    only cover padding are left out. (The attention mask is passed when the
+    processor returns one; wav2vec2-base has none, so padding can still
+    shift its frames a little.)
+
     Returns:
       embeddings: (N, D) float32, L2-normalized
       meta: {modelName, dim}
@@ -81,24 +90,129 @@ def embed_segments_wav2vec2(
         w = np.asarray(w, dtype=np.float32).reshape(-1)
         cleaned.append(w)
 
-    embs = []
-    import torch  # safe here because _HAS_TORCH True
+    if bucket_by_length:
+        batches = length_bucketed_batches([len(w) for w in cleaned], batch_size)
+    else:
+        batches = caller_order_batches(len(cleaned), batch_size)
+
+    mat = None
+    import torch  # safe here because _get_wav2vec2 checked it
 
     with torch.no_grad():
-        for i in range(0, len(cleaned), batch_size):
-            batch = cleaned[i : i + batch_size]
+        for idxs in batches:
+            batch = [cleaned[j] for j in idxs]
             inputs = processor(batch, sampling_rate=sr, return_tensors="pt", padding=True)
             inputs = {k: v.to(device) for k, v in inputs.items()}
 
             out = model(**inputs)
             hs = out.last_hidden_state  # (B, T, H)
 
-            # Mean pool across time
-            pooled = hs.mean(dim=1)  # (B, H)
+            # Mean pool across each item's own frames, not the padded tail
+            lengths = torch.as_tensor([len(w) for w in batch])
+            valid = model._get_feat_extract_output_lengths(lengths).clamp(1, hs.shape[1]).to(hs.device)
+            mask = (torch.arange(hs.shape[1], device=hs.device)[None, :] < valid[:, None]).to(hs.dtype)
+            pooled = (hs * mask[:, :, None]).sum(dim=1) / mask.sum(dim=1, keepdim=True)  # (B, H)
             pooled = pooled.detach().cpu().numpy().astype(np.float32, copy=False)
-            embs.append(pooled)
+            if mat is None:
+                mat = np.empty((len(cleaned), pooled.shape[1]), dtype=np.float32)
+            mat[idxs] = pooled
 
-    mat = np.concatenate(embs, axis=0)  # (N, H)
-    mat = _l2_normalize(mat)
+    mat = _l2_normalize(mat)  # (N, H)
+
+    return mat, {"modelName": model_name, "dim": int(mat.shape[1])}
+
+
+def _frame_geometry(model) -> Tuple[int, int]:
+    """(hop, receptive field) in samples of the conv feature encoder; 320/400 for wav2vec2-base."""
+    cfg = getattr(model, "config", None)
+    kernels = list(getattr(cfg, "conv_kernel", (10, 3, 3, 3, 3, 2, 2)))
+    strides = list(getattr(cfg, "conv_stride", (5, 2, 2, 2, 2, 2, 2)))
+    rf, hop = 1, 1
+    for k, s in zip(kernels, strides):
+        rf += (k - 1) * hop
+        hop *= s
+    return hop, rf
+
+
+def embed_windows_wav2vec2(
+    x: np.ndarray,
+    segs: List[Tuple[int, int]],
+    sr: int = 16000,
+    model_name: str = "facebook/wav2vec2-base",
+    chunk_sec: float = 30.0,
+    context_sec: float = 1.0,
+    batch_size: int = 4,
+) -> Tuple[np.ndarray, dict]:
+    """
+    Single-pass alternative to embed_segments_wav2vec2 for overlapping windows.
+
+    The audio is encoded once, in chunks of `chunk_sec` plus `context_sec` of
+    overlap on each side. Each chunk contributes the frame states
+    (last_hidden_state) whose centres fall in its core region, giving one
+    frame-level sequence for the whole signal. Each (a, b) window is then the
+    mean of the frames centred inside it. With hop = window / 2 this halves
+    the transformer work, and the frames also see context beyond the window.
+
+    Chunks are only batched with chunks of the same input length (the tail
+    chunk is encoded on its own): wav2vec2-base has no attention mask and
+    group-normalises its conv features, so zero padding would change the
+    short chunk's frames. The result does not depend on batch_size.
+
+    Returns an (N, D) float32 L2-normalized matrix, like the per-window mode
+    (not the same values: frames here see context beyond their window).
+    """
+    processor, model, device = _get_wav2vec2(model_name)
+    x = np.asarray(x, dtype=np.float32).reshape(-1)
+
+    if not segs or len(x) == 0:
+        return np.zeros((0, 1), dtype=np.float32), {"modelName": model_name, "dim": 1}
 
+    hop, rf = _frame_geometry(model)
+    ctx = max(rf, int(np.ceil(context_sec * sr / hop)) * hop)
+    core = max(hop, int(chunk_sec * sr) // hop * hop)
+
+    # (core_start, core_end, input_start, input_end); starts are multiples of hop
+    chunks = []
+    for c0 in range(0, len(x), core):
+        chunks.append((c0, min(len(x), c0 + core), max(0, c0 - ctx), min(len(x), c0 + core + ctx)))
+
+    n_frames = max(1, (len(x) - rf) // hop + 1)
+    frames = None
+    import torch  # safe here because _get_wav2vec2 checked it
+
+    with torch.no_grad():
+        for idxs in equal_length_batches([c[3] - c[2] for c in chunks], batch_size):
+            batch = [x[chunks[j][2] : chunks[j][3]] for j in idxs]
+            inputs = processor(batch, sampling_rate=sr, return_tensors="pt", padding=True)
+            inputs = {k: v.to(device) for k, v in inputs.items()}
+            hs = model(**inputs).last_hidden_state.detach().cpu().numpy().astype(np.float32, copy=False)
+
+            if frames is None:
+                frames = np.zeros((n_frames, hs.shape[2]), dtype=np.float32)
+
+            for row, j in enumerate(idxs):
+                c0, c1, s, e = chunks[j]
+                valid = max(1, (e - s - rf) // hop + 1)
+                first = s // hop
+                # global frames centred in this chunk's core region
+                g_lo = max(0, int(np.ceil((c0 - rf / 2.0) / hop)))
+                g_hi = min(n_frames, int(np.ceil((c1 - rf / 2.0) / hop)) if c1 < len(x) else n_frames)
+                g_hi = min(g_hi, first + valid, first + hs.shape[1])
+                if g_hi > g_lo:
+                    frames[g_lo:g_hi] = hs[row, g_lo - first : g_hi - first]
+
+    centres = np.arange(n_frames, dtype=np.float64) * hop + rf / 2.0
+    bounds = np.asarray(segs, dtype=np.float64)
+    lo = np.searchsorted(centres, bounds[:, 0], side="left")
+    hi = np.searchsorted(centres, bounds[:, 1], side="left")
+
+    mat = np.empty((len(segs), frames.shape[1]), dtype=np.float32)
+    for i, (a, b) in enumerate(zip(lo.tolist(), hi.tolist())):
+        if b <= a:
+            # window shorter than one frame: use the nearest frame
+            a = min(max(0, a), n_frames - 1)
+            b = a + 1
+        mat[i] = frames[a:b].mean(axis=0)
+
+    mat = _l2_normalize(mat)
     return mat, {"modelName": model_name, "dim": int(mat.shape[1])}
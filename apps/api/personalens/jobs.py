@@ -0,0 +1,508 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from personalens.workers import POOLS, MediaPool, PoolBusy, audio_shift_job, video_shift_job
+
+# Long media analyses can run as background jobs instead of one long request:
+#   PERSONALENS_JOB_STORE    memory (default) | sqlite:/path/to/jobs.db
+#   PERSONALENS_JOB_TTL_SEC  how long finished jobs (and their results) are kept (default 3600)
+#   PERSONALENS_JOB_DIR      where uploads wait for their job (default <tmp>/personalens-jobs)
+#   PERSONALENS_JOB_MAX_QUEUED  queued + running jobs (in the whole store) before new ones get 429 (default 16)
+# The SQLite store lets several API processes on one host share one queue.
+DEFAULT_TTL_SEC = 3600.0
+DEFAULT_MAX_QUEUED = 16
+TERMINAL = ("done", "error")
+
+log = logging.getLogger(__name__)
+
+Event = Tuple[int, str, Dict[str, Any]]  # (seq, event name, data)
+
+
+def _new_id() -> str:
+    return uuid.uuid4().hex
+
+
+def public_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Status payload for GET /jobs/{id}."""
+    out = {
+        "ok": True,
+        "jobId": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "progress": {"done": job["done"], "total": job["total"]},
+        "createdAt": job["created_at"],
+        "startedAt": job["started_at"],
+        "finishedAt": job["finished_at"],
+        "expiresAt": job["expires_at"],
+        "error": job["error"],
+    }
+    if job["status"] == "done":
+        out["result"] = job["result"]
+    return out
+
+
+class MemoryJobStore:
+    """Jobs and their event logs in process memory (single API process)."""
+
+    def __init__(self, ttl_sec: float = DEFAULT_TTL_SEC):
+        self.ttl_sec = float(ttl_sec)
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._events: Dict[str, List[Event]] = {}
+
+    def active(self) -> int:
+        """Jobs not finished yet (queued or running)."""
+        with self._lock:
+            return sum(1 for j in self._jobs.values() if j["status"] not in TERMINAL)
+
+    def create(
+        self, kind: str, params: Dict[str, Any], input_path: str, max_active: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """New queued job; None if `max_active` jobs are already queued or running."""
+        job = {
+            "id": _new_id(),
+            "kind": kind,
+            "status": "queued",
+            "stage": "queued",
+            "done": 0,
+            "total": None,
+            "params": dict(params),
+            "input_path": input_path,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "expires_at": None,
+            "error": None,
+            "result": None,
+        }
+        with self._lock:
+            if max_active is not None and sum(1 for j in self._jobs.values() if j["status"] not in TERMINAL) >= max_active:
+                return None
+            self._jobs[job["id"]] = job
+            self._events[job["id"]] = []
+        return dict(job)
+
+    def claim(self, kinds: Iterable[str]) -> Optional[Dict[str, Any]]:
+        kinds = set(kinds)
+        with self._lock:
+            queued = [j for j in self._jobs.values() if j["status"] == "queued" and j["kind"] in kinds]
+            if not queued:
+                return None
+            job = min(queued, key=lambda j: j["created_at"])
+            job.update(status="running", stage="starting", started_at=time.time())
+            return dict(job)
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(fields)
+
+    def add_event(self, job_id: str, event: str, data: Dict[str, Any]) -> int:
+        with self._lock:
+            log = self._events.get(job_id)
+            if log is None:
+                return 0
+            seq = len(log) + 1
+            log.append((seq, event, data))
+            return seq
+
+    def events(self, job_id: str, after: int = 0) -> List[Event]:
+        with self._lock:
+            return list(self._events.get(job_id, ())[after:])
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def purge(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        with self._lock:
+            dead = [k for k, j in self._jobs.items() if j["expires_at"] is not None and j["expires_at"] <= now]
+            for k in dead:
+                del self._jobs[k]
+                self._events.pop(k, None)
+        return len(dead)
+
+
+class SqliteJobStore:
+    """
+    Same interface backed by one SQLite file, so jobs survive an API restart
+    and any process on the host can claim, update or stream them. Each call
+    uses a short-lived connection; claim() is a single guarded UPDATE.
+
+    A running job records the pid of the process that claimed it. Opening the
+    store and every purge() fail running jobs whose process is gone (it
+    crashed or was killed mid-job), so they expire like any finished job and
+    their inputs are removed; queued jobs simply wait for the next runner.
+    """
+
+    _COLS = (
+        "id", "kind", "status", "stage", "done", "total", "params", "input_path",
+        "created_at", "started_at", "finished_at", "expires_at", "error", "result",
+    )
+    _JSON = ("params", "result")
+
+    def __init__(self, path: str, ttl_sec: float = DEFAULT_TTL_SEC):
+        self.path = path
+        self.ttl_sec = float(ttl_sec)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT, status TEXT, stage TEXT, done INTEGER, total INTEGER, "
+                "params TEXT, input_path TEXT, created_at REAL, started_at REAL, finished_at REAL, "
+                "expires_at REAL, error TEXT, result TEXT)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS events ("
+                "job_id TEXT, seq INTEGER, event TEXT, data TEXT, PRIMARY KEY (job_id, seq))"
+            )
+            if "owner" not in [r[1] for r in db.execute("PRAGMA table_info(jobs)")]:
+                db.execute("ALTER TABLE jobs ADD COLUMN owner INTEGER")
+        self.recover()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        db = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def _row(self, row: Optional[tuple]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(zip(self._COLS, row))
+        for k in self._JSON:
+            job[k] = json.loads(job[k]) if job[k] is not None else None
+        return job
+
+    def active(self) -> int:
+        with self._connect() as db:
+            return int(db.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')").fetchone()[0])
+
+    def create(
+        self, kind: str, params: Dict[str, Any], input_path: str, max_active: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        job_id = _new_id()
+        with self._connect() as db:
+            # one statement, so processes sharing the file cannot overshoot the limit together
+            cur = db.execute(
+                "INSERT INTO jobs (id, kind, status, stage, done, total, params, input_path, created_at) "
+                "SELECT ?, ?, 'queued', 'queued', 0, NULL, ?, ?, ? "
+                "WHERE ? IS NULL OR (SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')) < ?",
+                (job_id, kind, json.dumps(params), input_path, time.time(), max_active, max_active),
+            )
+            if cur.rowcount != 1:
+                return None
+        return self.get(job_id)
+
+    def claim(self, kinds: Iterable[str]) -> Optional[Dict[str, Any]]:
+        kinds = list(kinds)
+        if not kinds:
+            return None
+        marks = ",".join("?" * len(kinds))
+        with self._connect() as db:
+            while True:
+                row = db.execute(
+                    f"SELECT id FROM jobs WHERE status = 'queued' AND kind IN ({marks}) "
+                    "ORDER BY created_at LIMIT 1",
+                    kinds,
+                ).fetchone()
+                if row is None:
+                    return None
+                cur = db.execute(
+                    "UPDATE jobs SET status = 'running', stage = 'starting', started_at = ?, owner = ? "
+                    "WHERE id = ? AND status = 'queued'",
+                    (time.time(), os.getpid(), row[0]),
+                )
+                if cur.rowcount == 1:  # otherwise another process took it first
+                    return self.get(row[0])
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        if not fields:
+            return
+        cols = ", ".join(f"{k} = ?" for k in fields)
+        vals = [json.dumps(v) if k in self._JSON and v is not None else v for k, v in fields.items()]
+        with self._connect() as db:
+            db.execute(f"UPDATE jobs SET {cols} WHERE id = ?", (*vals, job_id))
+
+    def add_event(self, job_id: str, event: str, data: Dict[str, Any]) -> int:
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            seq = db.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM events WHERE job_id = ?", (job_id,)).fetchone()[0]
+            db.execute(
+                "INSERT INTO events (job_id, seq, event, data) VALUES (?, ?, ?, ?)",
+                (job_id, seq, event, json.dumps(data)),
+            )
+            db.execute("COMMIT")
+        return int(seq)
+
+    def events(self, job_id: str, after: int = 0) -> List[Event]:
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT seq, event, data FROM events WHERE job_id = ? AND seq > ? ORDER BY seq",
+                (job_id, int(after)),
+            ).fetchall()
+        return [(int(seq), ev, json.loads(data)) for seq, ev, data in rows]
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as db:
+            row = db.execute(f"SELECT {', '.join(self._COLS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row(row)
+
+    def recover(self) -> int:
+        """Fail running jobs whose process no longer exists; returns how many."""
+        with self._connect() as db:
+            rows = db.execute("SELECT id, owner, input_path FROM jobs WHERE status = 'running'").fetchall()
+        dead = [(job_id, path) for job_id, owner, path in rows if not _pid_alive(owner)]
+        now = time.time()
+        for job_id, path in dead:
+            self.update(
+                job_id,
+                status="error",
+                stage="error",
+                error="The process running this job stopped before it finished.",
+                finished_at=now,
+                expires_at=now + self.ttl_sec,
+            )
+            self.add_event(job_id, "error", {"status": "error", "error": "interrupted"})
+            try:
+                os.unlink(path)
+            except (OSError, TypeError):
+                pass
+        return len(dead)
+
+    def purge(self, now: Optional[float] = None) -> int:
+        self.recover()
+        now = time.time() if now is None else now
+        with self._connect() as db:
+            ids = [r[0] for r in db.execute("SELECT id FROM jobs WHERE expires_at <= ?", (now,)).fetchall()]
+            for job_id in ids:
+                db.execute("DELETE FROM events WHERE job_id = ?", (job_id,))
+                db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        return len(ids)
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False  # claimed before owners were recorded
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # exists, owned by another user
+    return True
+
+
+JobStore = Any  # MemoryJobStore | SqliteJobStore
+
+
+def make_store(spec: Optional[str] = None, ttl_sec: Optional[float] = None) -> JobStore:
+    spec = (os.environ.get("PERSONALENS_JOB_STORE", "memory") if spec is None else spec).strip()
+    ttl = float(os.environ.get("PERSONALENS_JOB_TTL_SEC", DEFAULT_TTL_SEC)) if ttl_sec is None else ttl_sec
+    if spec in ("", "memory"):
+        return MemoryJobStore(ttl_sec=ttl)
+    if spec.startswith("sqlite:"):
+        path = spec[len("sqlite:") :]
+        if path.startswith("//"):  # sqlite:///abs/path.db
+            path = path[2:]
+        return SqliteJobStore(path, ttl_sec=ttl)
+    raise ValueError(f"Unknown job store '{spec}'. Use 'memory' or 'sqlite:/path/to/jobs.db'.")
+
+
+_HANDLERS: Dict[str, Callable[..., Dict[str, Any]]] = {
+    "audio": audio_shift_job,
+    "video": video_shift_job,
+}
+
+
+class JobRunner:
+    """
+    Pulls queued jobs from the store into the media pools.
+
+    A job is only claimed while its pool has room, so queued work waits in
+    the store (not in the executor) and other API processes sharing a SQLite
+    store can pick it up. Progress from the analysis becomes job fields plus
+    "progress"/"segment" events; the upload file is removed when the job ends.
+
+    Store calls can block (a SQLite store waits up to 30 s for a lock held by
+    another process), so from the event loop they always go through
+    asyncio.to_thread.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        pools: Dict[str, MediaPool],
+        poll_sec: float = 0.5,
+        max_queued: Optional[int] = None,
+    ):
+        self.store = store
+        self.pools = pools
+        self.poll_sec = float(poll_sec)
+        if max_queued is None:
+            try:
+                max_queued = int(os.environ.get("PERSONALENS_JOB_MAX_QUEUED", DEFAULT_MAX_QUEUED))
+            except ValueError:
+                max_queued = DEFAULT_MAX_QUEUED
+        self.max_queued = max(1, int(max_queued))
+        self.job_dir = os.environ.get("PERSONALENS_JOB_DIR") or os.path.join(tempfile.gettempdir(), "personalens-jobs")
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._running: Dict[str, asyncio.Task] = {}
+
+    # ---- submission (called from routes) ----
+
+    async def has_room(self) -> bool:
+        """Whether a submission right now would be queued (checked before reading an upload)."""
+        return await asyncio.to_thread(self.store.active) < self.max_queued
+
+    def _create(self, kind: str, params: Dict[str, Any], input_path: str) -> Optional[Dict[str, Any]]:
+        job = self.store.create(kind, params, input_path, max_active=self.max_queued)
+        if job is not None:
+            self.store.add_event(job["id"], "progress", {"stage": "queued"})
+        return job
+
+    async def submit(self, kind: str, params: Dict[str, Any], input_path: str) -> Dict[str, Any]:
+        """Queue a job; raises PoolBusy once max_queued jobs are queued or running."""
+        if kind not in _HANDLERS:
+            raise ValueError(f"Unknown job kind '{kind}'.")
+        job = await asyncio.to_thread(self._create, kind, params, input_path)
+        if job is None:
+            raise PoolBusy(f"Job queue is full ({self.max_queued} jobs queued or running); retry later.")
+        if self._wake is not None:
+            self._wake.set()
+        return job
+
+    # ---- background loop ----
+
+    def start(self) -> None:
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for t in list(self._running.values()):
+            t.cancel()
+
+    def _free_kinds(self) -> List[str]:
+        return [k for k, p in self.pools.items() if k in _HANDLERS and p.has_room()]
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.store.purge)
+                while True:
+                    kinds = self._free_kinds()
+                    job = await asyncio.to_thread(self.store.claim, kinds) if kinds else None
+                    if job is None:
+                        break
+                    self._running[job["id"]] = asyncio.get_running_loop().create_task(self._run(job))
+            except Exception:
+                # e.g. sqlite3.OperationalError under lock contention; try again next poll
+                log.exception("job runner: store access failed")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_sec)  # type: ignore[union-attr]
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()  # type: ignore[union-attr]
+
+    def _progress(self, job_id: str) -> Callable[[Dict[str, Any]], None]:
+        store = self.store
+
+        def report(event: Dict[str, Any]) -> None:
+            stage = event.get("stage", "running")
+            fields: Dict[str, Any] = {"stage": stage}
+            if "done" in event:
+                fields["done"] = int(event["done"])
+            if "total" in event:
+                fields["total"] = int(event["total"])
+            store.update(job_id, **fields)
+            store.add_event(job_id, "progress", fields)
+            for seg in event.get("segments") or ():
+                store.add_event(job_id, "segment", seg)
+
+        return report
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        job_id = job["id"]
+        try:
+            f = open(job["input_path"], "rb")
+            try:
+                result = await self.pools[job["kind"]].run(
+                    _HANDLERS[job["kind"]], f, progress=self._progress(job_id), on_done=f.close, **job["params"]
+                )
+            except PoolBusy:
+                f.close()
+                raise
+            status = "done" if result.get("ok", True) else "error"
+            error = None if status == "done" else result.get("error")
+        except PoolBusy:
+            # a direct (non-job) request took the slot first; back to the queue
+            self._running.pop(job_id, None)
+            await self._store_write(job_id, self.store.update, job_id, status="queued", stage="queued", started_at=None)
+            return
+        except Exception as ex:
+            result, status, error = None, "error", repr(ex)
+
+        try:
+            now = time.time()
+            fields = dict(
+                status=status,
+                stage=status,
+                result=result,
+                error=error,
+                finished_at=now,
+                expires_at=now + self.store.ttl_sec,
+            )
+            if not await self._store_write(job_id, self.store.update, job_id, **fields):
+                # e.g. a result the store cannot serialise: still end the job
+                await self._store_write(
+                    job_id, self.store.update, job_id, **{**fields, "status": "error", "stage": "error",
+                                                          "result": None, "error": "Could not store the job result."}
+                )
+            await self._store_write(job_id, self.store.add_event, job_id, status, {"status": status, "error": error})
+        finally:
+            self._running.pop(job_id, None)
+            try:
+                os.unlink(job["input_path"])
+            except OSError:
+                pass
+            if self._wake is not None:
+                self._wake.set()
+
+    async def _store_write(self, job_id: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> bool:
+        # a few tries off the event loop, so a briefly locked store does not leave the job "running"
+        for attempt in range(3):
+            try:
+                await asyncio.to_thread(fn, *args, **kwargs)
+                return True
+            except Exception:
+                if attempt == 2:
+                    log.exception("job %s: store write failed", job_id)
+                    return False
+                await asyncio.sleep(1.0 + attempt)
+        return False
+
+
+JOBS = JobRunner(make_store(), POOLS)
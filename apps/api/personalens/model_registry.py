@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+RegistryKey = Tuple[str, str, str]  # (kind, model name, device)
+
+
+def estimate_bytes(obj: Any, _seen: set | None = None) -> int:
+    """
+    Rough resident size of a loaded model: parameter + buffer bytes of every
+    torch module reachable from `obj` (tuples/lists/dicts/dataclasses are walked).
+    Processors/tokenizers are small and not counted.
+    """
+    seen = _seen if _seen is not None else set()
+    if obj is None or id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if hasattr(obj, "parameters") and hasattr(obj, "buffers"):
+        total = 0
+        for t in list(obj.parameters()) + list(obj.buffers()):
+            total += int(t.numel()) * int(t.element_size())
+        return total
+    if isinstance(obj, dict):
+        return sum(estimate_bytes(v, seen) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(estimate_bytes(v, seen) for v in obj)
+    if hasattr(obj, "__dataclass_fields__"):
+        return sum(estimate_bytes(getattr(obj, f), seen) for f in obj.__dataclass_fields__)
+    return 0
+
+
+@dataclass
+class _Entry:
+    value: Any
+    size_bytes: int
+    load_sec: float
+    loaded_at: float = field(default_factory=time.time)
+    last_used: float = field(default_factory=time.time)
+    hits: int = 0
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded encoders (text, audio, video).
+
+    - get() loads each (kind, name, device) at most once, even under
+      concurrent requests; other callers for the same key wait for that load.
+    - Entries are kept in LRU order. After a load, least-recently-used models
+      are evicted until the estimated total fits `budget_mb` (0 = unlimited).
+      The model that was just requested is never evicted.
+    """
+
+    def __init__(self, budget_mb: float = 0.0):
+        self.budget_bytes = int(max(0.0, float(budget_mb)) * 1024 * 1024)
+        self._entries: "OrderedDict[RegistryKey, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        # per-key load locks with their number of holders/waiters; a lock only
+        # exists while someone is loading that key, so names clients send
+        # (failed loads, evicted models) do not pile up here
+        self._key_locks: Dict[RegistryKey, List[Any]] = {}
+        self.evictions = 0
+
+    @contextmanager
+    def _key_lock(self, key: RegistryKey) -> Iterator[None]:
+        with self._lock:
+            slot = self._key_locks.get(key)
+            if slot is None:
+                slot = self._key_locks[key] = [threading.Lock(), 0]
+            slot[1] += 1
+        try:
+            with slot[0]:
+                yield
+        finally:
+            with self._lock:
+                slot[1] -= 1
+                if slot[1] == 0:
+                    del self._key_locks[key]
+
+    def _lookup(self, key: RegistryKey) -> Any:
+        with self._lock:
+            e = self._entries.get(key)
+            if e is None:
+                return None
+            self._entries.move_to_end(key)
+            e.hits += 1
+            e.last_used = time.time()
+            return e
+
+    def get(self, kind: str, name: str, loader: Callable[[], Any], device: str = "cpu") -> Any:
+        key = (kind, name, device)
+        e = self._lookup(key)
+        if e is not None:
+            return e.value
+
+        with self._key_lock(key):
+            e = self._lookup(key)  # loaded while we waited
+            if e is not None:
+                return e.value
+
+            t0 = time.perf_counter()
+            value = loader()
+            entry = _Entry(value=value, size_bytes=estimate_bytes(value), load_sec=time.perf_counter() - t0)
+
+            with self._lock:
+                self._entries[key] = entry
+                self._evict_over_budget(keep=key)
+            return value
+
+    def _evict_over_budget(self, keep: RegistryKey) -> None:
+        # caller holds self._lock
+        if self.budget_bytes <= 0:
+            return
+        while self._used_bytes() > self.budget_bytes:
+            victim = next((k for k in self._entries if k != keep), None)
+            if victim is None:
+                break
+            del self._entries[victim]
+            self.evictions += 1
+
+    def _used_bytes(self) -> int:
+        return sum(e.size_bytes for e in self._entries.values())
+
+    def evict(self, kind: str, name: str, device: str = "cpu") -> bool:
+        with self._lock:
+            return self._entries.pop((kind, name, device), None) is not None
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            items: List[Dict[str, Any]] = [
+                {
+                    "kind": k[0],
+                    "name": k[1],
+                    "device": k[2],
+                    "sizeMB": round(e.size_bytes / (1024 * 1024), 1),
+                    "loadSec": round(e.load_sec, 3),
+                    "hits": e.hits,
+                    "loadedAt": round(e.loaded_at, 3),
+                    "lastUsed": round(e.last_used, 3),
+                }
+                for k, e in self._entries.items()
+            ]
+            used = self._used_bytes()
+        return {
+            "budgetMB": round(self.budget_bytes / (1024 * 1024), 1) if self.budget_bytes else None,
+            "usedMB": round(used / (1024 * 1024), 1),
+            "evictions": self.evictions,
+            "models": items,  # least recently used first
+        }
+
+
+# PERSONALENS_MODEL_BUDGET_MB caps the estimated weight memory of all loaded
+# encoders together (default 4 GB); 0 keeps everything that was ever loaded.
+# The budget is per process: media pool and shard worker processes each have
+# their own registry, so with N of them up to N budgets can be in use.
+REGISTRY = ModelRegistry(budget_mb=float(os.environ.get("PERSONALENS_MODEL_BUDGET_MB", "4096") or 0))
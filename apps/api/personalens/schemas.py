@@ -4,6 +4,9 @@ from typing import List, Optional
 
 class TextRequest(BaseModel):
     text: str = Field(..., min_length=1)
+    embedding_model: Optional[str] = Field(
+        None, description="Sentence-transformers model from PERSONALENS_TEXT_MODELS; defaults to the server's text model"
+    )
 
 
 class TextSignalsResponse(BaseModel):
@@ -17,6 +20,10 @@ class TextSignalsResponse(BaseModel):
     buzzwordPer100Words: float
 
 
+class TextBatchRequest(BaseModel):
+    texts: List[str] = Field(..., min_length=1)
+
+
 class TextMLResponse(TextSignalsResponse):
     embeddingModel: str
     embeddingDim: int
@@ -25,6 +32,9 @@ class TextMLResponse(TextSignalsResponse):
 
 class DriftRequest(BaseModel):
     texts: List[str] = Field(..., min_length=2)
+    embedding_model: Optional[str] = Field(
+        None, description="Sentence-transformers model from PERSONALENS_TEXT_MODELS; defaults to the server's text model"
+    )
 
 
 class DriftResponse(BaseModel):
@@ -56,6 +66,9 @@ class TimelineRequest(BaseModel):
     items: List[TimelineItem] = Field(..., min_length=2)
     window: int = Field(3, ge=2, description="Rolling window size")
     stride: int = Field(1, ge=1, description="Step size between windows")
+    embedding_model: Optional[str] = Field(
+        None, description="Sentence-transformers model from PERSONALENS_TEXT_MODELS; defaults to the server's text model"
+    )
 
 
 class TimelinePairwisePoint(BaseModel):
@@ -95,6 +108,9 @@ class TimelineResponse(BaseModel):
 class ReasonsRequest(BaseModel):
     texts: List[str] = Field(..., min_length=1)
     indices: Optional[List[int]] = Field(None, description="Optional: only compute for these indices")
+    embedding_model: Optional[str] = Field(
+        None, description="Sentence-transformers model from PERSONALENS_TEXT_MODELS; defaults to the server's text model"
+    )
 
 
 class ReasonItem(BaseModel):
@@ -118,6 +134,9 @@ class ClustersRequest(BaseModel):
     k: int = Field(3, ge=2, le=12)
     seed: int = Field(42, description="Random seed for deterministic clustering")
     max_iter: int = Field(25, ge=5, le=100)
+    embedding_model: Optional[str] = Field(
+        None, description="Sentence-transformers model from PERSONALENS_TEXT_MODELS; defaults to the server's text model"
+    )
 
 
 class ClusterAssign(BaseModel):
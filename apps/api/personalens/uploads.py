@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO, Dict, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+
+# Media uploads are streamed from the request body straight to a file on disk
+# instead of being parsed into memory first:
+#   PERSONALENS_MAX_UPLOAD_MB   largest accepted file part (default 512; 0 = no limit)
+#   PERSONALENS_UPLOAD_DIR      where uploads are written (default <tmp>)
+# Only about _WRITE_CHUNK bytes (plus one body chunk) of file data per request
+# are held in memory at any time.
+DEFAULT_MAX_UPLOAD_MB = 512.0
+_WRITE_CHUNK = 1 << 20
+# multipart framing + small form fields allowed on top of the file in Content-Length
+_FORM_OVERHEAD = 64 * 1024
+
+# OpenAPI body for routes that take `request: Request` instead of `file: UploadFile`
+UPLOAD_OPENAPI: Dict[str, Any] = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                }
+            }
+        },
+    }
+}
+
+
+class UploadError(ValueError):
+    status_code = 400
+
+
+class UploadTooLarge(UploadError):
+    status_code = 413
+
+
+def max_upload_bytes() -> Optional[int]:
+    try:
+        mb = float(os.environ.get("PERSONALENS_MAX_UPLOAD_MB", DEFAULT_MAX_UPLOAD_MB))
+    except ValueError:
+        mb = DEFAULT_MAX_UPLOAD_MB
+    return int(mb * 1024 * 1024) if mb > 0 else None
+
+
+@dataclass
+class StoredUpload:
+    path: str
+    filename: str
+    size: int = 0
+    peak_buffered: int = 0  # most file bytes held in memory while receiving (see add_memory for the rest)
+    seconds: float = 0.0
+    fields: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def suffix(self) -> str:
+        return os.path.splitext(self.filename)[1]
+
+    def open(self) -> BinaryIO:
+        return open(self.path, "rb")
+
+    def remove(self) -> None:
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "bytes": self.size,
+            "peakUploadBufferBytes": self.peak_buffered,
+            "sec": round(self.seconds, 3),
+        }
+
+
+def add_memory(result: Any, upload: StoredUpload) -> None:
+    """
+    Merge the upload buffer peak into an analysis result's "memory" block,
+    next to the buffer peaks the analyzer reports (audio samples or decoded
+    frames). These are the per-request buffers; model weights and the
+    process as a whole are not included.
+    """
+    if isinstance(result, dict):
+        result.setdefault("memory", {})["uploadBufferPeakBytes"] = upload.peak_buffered
+
+
+class _Part:
+    def __init__(self) -> None:
+        self.headers: Dict[bytes, bytes] = {}
+        self.name = ""
+        self.filename: Optional[str] = None
+        self.data = bytearray()
+
+
+async def receive_upload(
+    request: Request,
+    field_name: str = "file",
+    max_bytes: Optional[int] = None,
+    dir: Optional[str] = None,
+    default_suffix: str = "",
+) -> StoredUpload:
+    """
+    Stream the `field_name` file part of a multipart request to a new file in
+    `dir` and return it (caller removes it). Other small form fields end up in
+    StoredUpload.fields.
+
+    Raises UploadTooLarge as soon as either Content-Length or the bytes
+    received so far show that the file exceeds `max_bytes` (default:
+    PERSONALENS_MAX_UPLOAD_MB), before the rest of the body is read.
+    """
+    from python_multipart.multipart import MultipartParser, parse_options_header
+
+    limit = max_upload_bytes() if max_bytes is None else max_bytes
+    too_large = f"Upload exceeds the {limit / (1024 * 1024):.0f} MB limit." if limit else ""
+    length = request.headers.get("content-length", "")
+    if limit and length.isdigit() and int(length) > limit + _FORM_OVERHEAD:
+        raise UploadTooLarge(too_large)
+
+    ctype, params = parse_options_header(request.headers.get("content-type", ""))
+    if ctype != b"multipart/form-data" or b"boundary" not in params:
+        raise UploadError(f"Expected a multipart/form-data body with a '{field_name}' file part.")
+
+    t0 = time.perf_counter()
+    dir = dir or os.environ.get("PERSONALENS_UPLOAD_DIR") or None
+    if dir:
+        os.makedirs(dir, exist_ok=True)
+
+    parts: List[_Part] = []
+    header: List[bytes] = [b"", b""]
+    pending = bytearray()  # file bytes not yet written
+    out: Optional[BinaryIO] = None
+    stored: Optional[StoredUpload] = None
+
+    def on_part_begin() -> None:
+        parts.append(_Part())
+
+    def on_header_field(data: bytes, start: int, end: int) -> None:
+        header[0] += data[start:end]
+
+    def on_header_value(data: bytes, start: int, end: int) -> None:
+        header[1] += data[start:end]
+
+    def on_header_end() -> None:
+        parts[-1].headers[header[0].lower()] = header[1]
+        header[0] = header[1] = b""
+
+    def on_headers_finished() -> None:
+        part = parts[-1]
+        _, opts = parse_options_header(part.headers.get(b"content-disposition", b""))
+        part.name = opts.get(b"name", b"").decode("utf-8", "replace")
+        if b"filename" in opts:
+            part.filename = opts[b"filename"].decode("utf-8", "replace")
+
+    def on_part_data(data: bytes, start: int, end: int) -> None:
+        part = parts[-1]
+        if part.name == field_name and part.filename is not None:
+            pending.extend(data[start:end])
+        elif len(part.data) + (end - start) > _FORM_OVERHEAD:
+            raise UploadError(f"Form field '{part.name}' is too large.")
+        else:
+            part.data.extend(data[start:end])
+
+    parser = MultipartParser(
+        params[b"boundary"],
+        {
+            "on_part_begin": on_part_begin,
+            "on_header_field": on_header_field,
+            "on_header_value": on_header_value,
+            "on_header_end": on_header_end,
+            "on_headers_finished": on_headers_finished,
+            "on_part_data": on_part_data,
+        },
+    )
+
+    written = 0
+    try:
+        async for chunk in request.stream():
+            try:
+                parser.write(chunk)
+            except UploadError:
+                raise
+            except Exception as ex:  # python_multipart's own parse errors
+                raise UploadError(f"Malformed multipart body: {ex}") from ex
+
+            if out is None:
+                part = next((p for p in parts if p.name == field_name and p.filename is not None), None)
+                if part is None:
+                    continue
+                suffix = os.path.splitext(part.filename or "")[1] or default_suffix
+                fd, path = tempfile.mkstemp(suffix=suffix, prefix="upload-", dir=dir)
+                out = os.fdopen(fd, "wb")
+                stored = StoredUpload(path=path, filename=part.filename or "")
+
+            # the chunk is already in `pending` (parser.write above), so don't count it twice
+            stored.peak_buffered = max(stored.peak_buffered, len(pending))  # type: ignore[union-attr]
+            if limit and written + len(pending) > limit:
+                raise UploadTooLarge(too_large)
+            if len(pending) >= _WRITE_CHUNK:
+                data = bytes(pending)
+                pending.clear()
+                await run_in_threadpool(out.write, data)
+                written += len(data)
+
+        if out is None or stored is None:
+            raise UploadError(f"Missing '{field_name}' file part.")
+        if limit and written + len(pending) > limit:
+            raise UploadTooLarge(too_large)
+        if pending:
+            await run_in_threadpool(out.write, bytes(pending))
+            written += len(pending)
+            pending.clear()
+        await run_in_threadpool(out.close)
+    except BaseException:
+        if out is not None:
+            out.close()
+        if stored is not None:
+            stored.remove()
+        raise
+
+    stored.size = written
+    stored.seconds = time.perf_counter() - t0
+    stored.fields = {p.name: p.data.decode("utf-8", "replace") for p in parts if p.filename is None}
+    return stored
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+# Models to preload at startup (comma-separated): text, audio, video.
+# Empty string disables preloading; /ready then turns true immediately.
+DEFAULT_PRELOAD = "text"
+
+
+def _text() -> Tuple[Callable[[], Any], Callable[[], Any]]:
+    from personalens.analyzers import text_embeddings as te
+
+    def warm():
+        te._encode(["PersonaLens warmup sentence.", "Shipped 3 releases in Q2."], True)
+
+    return te.get_model, warm
+
+
+def _audio() -> Tuple[Callable[[], Any], Callable[[], Any]]:
+    from personalens.analyzers.wav2vec2_embedder import _get_wav2vec2, embed_segments_wav2vec2
+
+    def warm():
+        embed_segments_wav2vec2([np.zeros(16000, dtype=np.float32)], sr=16000)
+
+    return _get_wav2vec2, warm
+
+
+def _video() -> Tuple[Callable[[], Any], Callable[[], Any]]:
+    from personalens.analyzers.videomae_embedder import _get_videomae_bundle, embed_segment_videomae, _default_device
+
+    def load():
+        return _get_videomae_bundle("MCG-NJU/videomae-base", _default_device())
+
+    def warm():
+        frames = [np.zeros((3, 224, 224), dtype=np.uint8) for _ in range(16)]
+        embed_segment_videomae(frames)
+
+    return load, warm
+
+
+_WARMERS: Dict[str, Callable[[], Tuple[Callable[[], Any], Callable[[], Any]]]] = {
+    "text": _text,
+    "audio": _audio,
+    "video": _video,
+}
+
+_LOCK = threading.Lock()
+_STATE: Dict[str, Any] = {
+    "ready": False,
+    "started": False,
+    "finished": False,
+    "requested": [],
+    "models": {},
+}
+
+
+def preload_targets() -> List[str]:
+    raw = os.environ.get("PERSONALENS_PRELOAD", DEFAULT_PRELOAD)
+    return [x.strip().lower() for x in raw.split(",") if x.strip()]
+
+
+def _warm_one(name: str) -> Dict[str, Any]:
+    rec: Dict[str, Any] = {"loaded": False, "loadSec": None, "warmupSec": None, "error": None}
+    if name not in _WARMERS:
+        rec["error"] = f"Unknown model group '{name}'. Use one of: {', '.join(_WARMERS)}."
+        return rec
+    try:
+        t0 = time.perf_counter()
+        load, warm = _WARMERS[name]()
+        load()
+        rec["loadSec"] = round(time.perf_counter() - t0, 3)
+        rec["loaded"] = True
+
+        t1 = time.perf_counter()
+        warm()
+        rec["warmupSec"] = round(time.perf_counter() - t1, 3)
+    except Exception as ex:
+        rec["error"] = repr(ex)
+    return rec
+
+
+def run_warmup(names: List[str]) -> None:
+    with _LOCK:
+        _STATE["started"] = True
+        _STATE["requested"] = list(names)
+
+    for name in names:
+        rec = _warm_one(name)
+        with _LOCK:
+            _STATE["models"][name] = rec
+
+    with _LOCK:
+        _STATE["finished"] = True
+        _STATE["ready"] = all(
+            m["loaded"] and m["error"] is None for m in _STATE["models"].values()
+        )
+
+
+def start_warmup(names: List[str] | None = None) -> threading.Thread:
+    """Runs run_warmup in a daemon thread so /health answers while models load."""
+    names = preload_targets() if names is None else names
+    t = threading.Thread(target=run_warmup, args=(names,), name="model-warmup", daemon=True)
+    t.start()
+    return t
+
+
+def readiness() -> Dict[str, Any]:
+    with _LOCK:
+        return {
+            "ready": bool(_STATE["ready"]),
+            "started": bool(_STATE["started"]),
+            "finished": bool(_STATE["finished"]),
+            "requested": list(_STATE["requested"]),
+            "models": {k: dict(v) for k, v in _STATE["models"].items()},
+        }
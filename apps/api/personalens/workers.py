@@ -0,0 +1,397 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from multiprocessing import get_context
+from multiprocessing import shared_memory
+from multiprocessing import util as mp_util
+from typing import Any, BinaryIO, Callable, Dict, Optional, Tuple, Union
+
+# Media analysis (audio/video shift) is CPU-bound and runs for seconds to
+# minutes, so it never runs on the event loop. Each media kind gets its own pool:
+#   PERSONALENS_MEDIA_POOL            thread | process (default thread)
+#   PERSONALENS_<KIND>_WORKERS        analyses running at once (default 1)
+#   PERSONALENS_<KIND>_MAX_PENDING    running + queued before new jobs get 429 (default 4)
+POOL_MODES = ("thread", "process")
+_COPY_CHUNK = 1 << 20
+
+
+class PoolBusy(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class SharedUpload:
+    """Handle to an upload copied into a shared memory block (picklable)."""
+
+    name: str
+    size: int
+
+
+class SharedMemoryFile(io.RawIOBase):
+    """Read-only, seekable file over a shared memory block; reads copy straight out of the mapping."""
+
+    def __init__(self, handle: SharedUpload):
+        super().__init__()
+        self._shm = _attach(handle.name)
+        self._view = self._shm.buf[: handle.size]
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._view)}[whence]
+        self._pos = max(0, base + int(offset))
+        return self._pos
+
+    def readinto(self, b) -> int:
+        n = max(0, min(len(b), len(self._view) - self._pos))
+        memoryview(b).cast("B")[:n] = self._view[self._pos : self._pos + n]
+        self._pos += n
+        return n
+
+    def close(self) -> None:
+        if not self.closed:
+            self._view.release()
+            self._shm.close()
+        super().close()
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    # The parent owns (and unlinks) the block. Spawned workers share the
+    # parent's resource tracker, so a plain attach on older Pythons only
+    # re-registers a name it already tracks.
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+def share_upload(fileobj: BinaryIO) -> Tuple[shared_memory.SharedMemory, SharedUpload]:
+    """Copy a (spooled) upload into a new shared memory block. Caller must close() and unlink() it."""
+    fileobj.seek(0, io.SEEK_END)
+    size = fileobj.tell()
+    fileobj.seek(0)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, size))
+    pos = 0
+    while pos < size:
+        chunk = fileobj.read(min(_COPY_CHUNK, size - pos))
+        if not chunk:
+            break
+        shm.buf[pos : pos + len(chunk)] = chunk
+        pos += len(chunk)
+    return shm, SharedUpload(name=shm.name, size=pos)
+
+
+Source = Union[BinaryIO, SharedUpload, str]  # str: path of an upload already on disk
+
+
+def _disk_path(fileobj: Any) -> Optional[str]:
+    name = getattr(fileobj, "name", None)
+    return name if isinstance(name, str) and os.path.isfile(name) else None
+
+
+def _open_source(src: Source) -> BinaryIO:
+    if isinstance(src, SharedUpload):
+        return io.BufferedReader(SharedMemoryFile(src), buffer_size=_COPY_CHUNK)
+    if isinstance(src, str):
+        return open(src, "rb")
+    src.seek(0)
+    return src
+
+
+# ---- job entry points (module level so process pools can pickle them) ----
+
+
+def audio_shift_job(src: Source, max_audio_sec: Optional[float] = None, **kwargs: Any) -> Dict[str, Any]:
+    from personalens.analyzers.audio_shift import AudioShiftConfig, analyze_audio_shift_file
+
+    f = _open_source(src)
+    try:
+        return analyze_audio_shift_file(f, cfg=AudioShiftConfig(max_audio_sec=max_audio_sec), **kwargs)
+    finally:
+        if isinstance(src, (SharedUpload, str)):
+            f.close()
+
+
+def video_shift_job(src: Source, suffix: str = ".mp4", **kwargs: Any) -> Dict[str, Any]:
+    from personalens.analyzers.video_shift import analyze_video_shift
+
+    if isinstance(src, SharedUpload):
+        with _open_source(src) as f:
+            return analyze_video_shift(file_path=f, **kwargs)
+
+    path = src if isinstance(src, str) else _disk_path(src)
+    if path is not None:  # already on disk (a streamed upload or a queued job's input)
+        return analyze_video_shift(file_path=path, **kwargs)
+
+    # Persist upload to temp file so PyAV can open it reliably.
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+    try:
+        src.seek(0)
+        shutil.copyfileobj(src, tmp, _COPY_CHUNK)
+        tmp.close()
+        return analyze_video_shift(file_path=tmp.name, **kwargs)
+    finally:
+        try:
+            os.unlink(tmp.name)
+        except Exception:
+            pass
+
+
+class _QueueProgress:
+    """Picklable progress callback for process workers: events go onto a manager queue."""
+
+    def __init__(self, queue: Any):
+        self.queue = queue
+
+    def __call__(self, event: Dict[str, Any]) -> None:
+        self.queue.put(event)
+
+
+def _forward_events(queue: Any, progress: Callable[[Dict[str, Any]], None]) -> None:
+    while True:
+        event = queue.get()
+        if event is None:
+            return
+        try:
+            progress(event)
+        except Exception:
+            pass  # progress is best effort; never take the job down with it
+
+
+class MediaPool:
+    """
+    Bounded executor for one media kind.
+
+    `workers` analyses run at once; up to `max_pending` may be admitted
+    (running + queued) and further submissions raise PoolBusy instead of
+    piling up. In process mode uploads that are already files on disk are
+    handed to workers by path; anything else (e.g. an in-memory spooled
+    upload) as a SharedUpload handle: the bytes are copied once into shared
+    memory and read in place by the worker, never pickled through the
+    executor's pipe.
+    """
+
+    def __init__(self, kind: str, mode: str = "thread", workers: int = 1, max_pending: int = 4):
+        if mode not in POOL_MODES:
+            raise ValueError(f"Unknown pool mode '{mode}'. Use one of: {', '.join(POOL_MODES)}.")
+        self.kind = kind
+        self.mode = mode
+        self.workers = max(1, int(workers))
+        self.max_pending = max(self.workers, int(max_pending))
+        self._executor: Executor | None = None
+        self._manager: Any = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0}
+        self._tasks: set = set()  # strong refs: work outlives a cancelled caller
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.mode == "process":
+                    # spawn: forking a process that already holds torch threads is unsafe
+                    self._executor = ProcessPoolExecutor(self.workers, mp_context=get_context("spawn"))
+                else:
+                    self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix=f"{self.kind}-pool")
+            return self._executor
+
+    def has_room(self) -> bool:
+        """Whether a submission right now would be admitted (checked before reading an upload)."""
+        with self._lock:
+            return self._pending < self.max_pending
+
+    def _admit(self) -> None:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._stats["rejected"] += 1
+                raise PoolBusy(f"{self.kind} pool is busy ({self._pending} jobs pending); retry later.")
+            self._pending += 1
+            self._stats["submitted"] += 1
+
+    def _release(self, ok: bool) -> None:
+        with self._lock:
+            self._pending -= 1
+            self._stats["completed" if ok else "failed"] += 1
+
+    def _get_manager(self) -> Any:
+        with self._lock:
+            if self._manager is None:
+                self._manager = get_context("spawn").Manager()
+            return self._manager
+
+    async def run(
+        self,
+        fn: Callable[..., Any],
+        upload: BinaryIO,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+        on_done: Optional[Callable[[], None]] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        Run fn(source, **kwargs) in the pool; source is the upload itself or its
+        SharedUpload. `progress` is passed on as fn(..., progress=...); in process
+        mode events travel back through a manager queue and are delivered on a
+        forwarding thread in this process.
+
+        An executor job cannot be stopped, so the work is shielded from the
+        caller: if the awaiting request is cancelled (client gone, timeout)
+        the analysis finishes anyway and keeps its pool slot and shared memory
+        until it does. `on_done()` runs once it is over, whether or not anyone
+        still waits, and is where the caller closes or removes the upload. It
+        is not called when PoolBusy is raised.
+        """
+        self._admit()
+        work = asyncio.get_running_loop().create_task(self._run(fn, upload, progress, kwargs))
+        self._tasks.add(work)
+
+        def finished(t: "asyncio.Task[Any]") -> None:
+            self._tasks.discard(t)
+            if not t.cancelled():
+                t.exception()  # retrieved here in case the caller is gone
+            if on_done is not None:
+                on_done()
+
+        work.add_done_callback(finished)
+        return await asyncio.shield(work)
+
+    async def _run(
+        self,
+        fn: Callable[..., Any],
+        upload: BinaryIO,
+        progress: Optional[Callable[[Dict[str, Any]], None]],
+        kwargs: Dict[str, Any],
+    ) -> Any:
+        # admitted by run(); always releases the slot
+        ok = False
+        shm = None
+        forward = None
+        try:
+            loop = asyncio.get_running_loop()
+            src: Source = upload
+            if self.mode == "process":
+                path = _disk_path(upload)
+                if path is not None:
+                    src = path
+                else:
+                    shm, src = await loop.run_in_executor(None, share_upload, upload)
+            if progress is not None:
+                if self.mode == "process":
+                    q = await loop.run_in_executor(None, lambda: self._get_manager().Queue())
+                    forward = threading.Thread(target=_forward_events, args=(q, progress), daemon=True)
+                    forward.start()
+                    kwargs["progress"] = _QueueProgress(q)
+                else:
+                    kwargs["progress"] = progress
+            result = await loop.run_in_executor(self._get_executor(), partial(fn, src, **kwargs))
+            ok = True
+            return result
+        finally:
+            if forward is not None:
+                kwargs["progress"].queue.put(None)
+                await loop.run_in_executor(None, forward.join)
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+            self._release(ok)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "workers": self.workers,
+                "maxPending": self.max_pending,
+                "pending": self._pending,
+                **self._stats,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            ex, self._executor = self._executor, None
+            mgr, self._manager = self._manager, None
+        if ex is not None:
+            ex.shutdown(wait=True, cancel_futures=True)
+        if mgr is not None:
+            mgr.shutdown()
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+# One analysis can also be split across processes (decode_workers /
+# shard_workers on the media routes):
+#   PERSONALENS_SHARD_WORKERS_MAX     largest shard pool, and per-request limit (default: CPU count)
+# Shard workers that embed audio each load their own model copy, outside the
+# parent's PERSONALENS_MODEL_BUDGET_MB, so this also bounds model memory.
+_SHARD_POOL: Optional[ProcessPoolExecutor] = None
+_SHARD_POOL_SIZE = 0
+_SHARD_LOCK = threading.Lock()
+
+
+def max_shard_workers() -> int:
+    return max(1, _env_int("PERSONALENS_SHARD_WORKERS_MAX", os.cpu_count() or 1))
+
+
+def shard_executor(workers: int) -> ProcessPoolExecutor:
+    """
+    Process pool for splitting a single analysis into shards (e.g. time
+    ranges of one video). It is kept between calls and only replaced by a
+    larger one when more workers are asked for; work already submitted to
+    the old pool still finishes. Never larger than max_shard_workers().
+    """
+    global _SHARD_POOL, _SHARD_POOL_SIZE
+    workers = min(max(1, int(workers)), max_shard_workers())
+    with _SHARD_LOCK:
+        if _SHARD_POOL is None or workers > _SHARD_POOL_SIZE:
+            old = _SHARD_POOL
+            _SHARD_POOL = ProcessPoolExecutor(workers, mp_context=get_context("spawn"))
+            _SHARD_POOL_SIZE = workers
+            if old is None:
+                # A MediaPool process worker joins its children when it exits,
+                # before the executor's own exit hook would stop them; run
+                # ahead of the executor queues' finalizers so the stop
+                # messages still go out.
+                mp_util.Finalize(None, shutdown_shard_executor, exitpriority=100)
+            else:
+                old.shutdown(wait=False)
+        return _SHARD_POOL
+
+
+def shutdown_shard_executor() -> None:
+    global _SHARD_POOL, _SHARD_POOL_SIZE
+    with _SHARD_LOCK:
+        ex, _SHARD_POOL, _SHARD_POOL_SIZE = _SHARD_POOL, None, 0
+    if ex is not None:
+        ex.shutdown(wait=True, cancel_futures=True)
+
+
+def _make_pool(kind: str) -> MediaPool:
+    upper = kind.upper()
+    return MediaPool(
+        kind,
+        mode=os.environ.get("PERSONALENS_MEDIA_POOL", "thread").strip().lower() or "thread",
+        workers=_env_int(f"PERSONALENS_{upper}_WORKERS", 1),
+        max_pending=_env_int(f"PERSONALENS_{upper}_MAX_PENDING", 4),
+    )
+
+
+POOLS: Dict[str, MediaPool] = {"audio": _make_pool("audio"), "video": _make_pool("video")}
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from personalens.analyzers.audio_shift import _segments, _window_features
+
+SR = 16000
+THR = 0.01
+EPS = 1e-8
+
+
+# the slice-by-slice features _window_features replaced
+def _rms(x):
+    return float(np.sqrt(np.mean(x * x) + EPS))
+
+
+def _zcr(x):
+    s = np.sign(x)
+    s[s == 0] = 1
+    return float(np.mean(s[1:] != s[:-1]))
+
+
+def _pause_ratio(x):
+    return float(np.mean(np.abs(x) < THR))
+
+
+def _signal(seconds, seed):
+    rng = np.random.default_rng(seed)
+    x = (0.05 * rng.standard_normal(int(seconds * SR))).astype(np.float32)
+    x[rng.random(len(x)) < 0.05] = 0.0  # exact zeros count as positive for ZCR
+    x[SR : 2 * SR] *= 0.01  # a quiet stretch
+    return x
+
+
+@pytest.mark.parametrize("window_sec, hop_sec", [(4.0, 2.0), (2.0, 0.5), (3.0, 1.7), (0.5, 0.5)])
+def test_prefix_sum_features_match_slices(window_sec, hop_sec):
+    x = _signal(23.3, seed=int(hop_sec * 10))
+    segs = _segments(x, SR, window_sec, hop_sec)
+    got = _window_features(x, segs, THR, EPS)
+    assert len(got["rms"]) == len(segs) > 0
+    for i, (a, b) in enumerate(segs):
+        w = x[a:b]
+        assert got["rms"][i] == pytest.approx(_rms(w), rel=1e-6)
+        assert got["zcr"][i] == _zcr(w)
+        assert got["pauseRatio"][i] == _pause_ratio(w)
+
+
+def test_irregular_windows_match_slices():
+    x = _signal(7.0, seed=3)
+    segs = [(0, 1000), (500, 16000), (16000, 16001 + 2999), (3, 90001), (40000, 40002)]
+    got = _window_features(x, segs, THR, EPS)
+    for i, (a, b) in enumerate(segs):
+        w = x[a:b]
+        assert got["rms"][i] == pytest.approx(_rms(w), rel=1e-6)
+        assert got["zcr"][i] == _zcr(w)
+        assert got["pauseRatio"][i] == _pause_ratio(w)
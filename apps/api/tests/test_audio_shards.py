@@ -0,0 +1,43 @@
+import pytest
+
+from personalens.analyzers.audio_shift import AudioShiftConfig, analyze_audio_shift_file
+from personalens.workers import shutdown_shard_executor
+
+sf = pytest.importorskip("soundfile")
+
+
+@pytest.fixture(scope="module")
+def wav(tmp_path_factory):
+    from benchmarks.bench_wav2vec2_single_pass import make_signal
+
+    path = str(tmp_path_factory.mktemp("audio") / "speech.wav")
+    sf.write(path, make_signal(95.0), 16000)
+    return path
+
+
+@pytest.fixture
+def shard_workers(monkeypatch):
+    monkeypatch.setenv("PERSONALENS_SHARD_WORKERS_MAX", "2")
+    yield 2
+    shutdown_shard_executor()
+
+
+def _analyze(path, workers, cfg):
+    with open(path, "rb") as f:
+        res = analyze_audio_shift_file(f, cfg=cfg, use_embeddings=False, shard_workers=workers)
+    assert res["ok"], res
+    return res
+
+
+@pytest.mark.parametrize("shard_sec", [10.0, 25.0])
+def test_sharded_analysis_matches_single_process(wav, shard_workers, shard_sec):
+    cfg = AudioShiftConfig(stream_batch_sec=10.0, shard_sec=shard_sec)
+    ref = _analyze(wav, 1, cfg)
+    res = _analyze(wav, shard_workers, cfg)
+    assert res["config"].pop("shardWorkers") == shard_workers
+    assert res["config"].pop("shardSec") == shard_sec
+    ref["config"].pop("shardWorkers")
+    ref["config"].pop("shardSec")
+    res.pop("memory")  # buffer peaks differ by design
+    ref.pop("memory")
+    assert res == ref
@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+
+from personalens.analyzers.audio_stream import StreamingResampler
+
+signal = pytest.importorskip("scipy.signal")
+
+
+@pytest.mark.parametrize("sr", [44100, 48000, 22050, 8000, 16000])
+@pytest.mark.parametrize("chunk", [1, 997, 4096, 100000])
+def test_streaming_resampler_matches_resample_poly(sr, chunk):
+    rng = np.random.default_rng(sr + chunk)
+    x = rng.standard_normal(int(2.3 * sr)).astype(np.float32)
+    if chunk == 1:
+        x = x[: sr // 10]  # keep the one-sample case quick
+    rs = StreamingResampler(sr, 16000)
+    parts = [rs.push(x[i : i + chunk]) for i in range(0, len(x), chunk)]
+    parts.append(rs.flush())
+    got = np.concatenate(parts)
+
+    want = signal.resample_poly(x, rs.up, rs.down)
+    assert got.shape == want.shape
+    np.testing.assert_allclose(got, want, rtol=0, atol=1e-5)
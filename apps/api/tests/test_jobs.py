@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from personalens.jobs import JobRunner, MemoryJobStore, SqliteJobStore
+from personalens.workers import PoolBusy
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryJobStore(ttl_sec=60)
+    return SqliteJobStore(str(tmp_path / "jobs.db"), ttl_sec=60)
+
+
+def test_create_respects_max_active(store):
+    assert store.create("audio", {}, "a", max_active=2) is not None
+    assert store.create("audio", {}, "b", max_active=2) is not None
+    assert store.create("audio", {}, "c", max_active=2) is None
+    assert store.active() == 2
+
+    job = store.claim(["audio"])
+    store.update(job["id"], status="done")
+    assert store.active() == 1
+    assert store.create("audio", {}, "d", max_active=2) is not None
+
+
+def test_runner_rejects_when_queue_full(store):
+    runner = JobRunner(store, {}, max_queued=1)
+
+    async def go():
+        assert await runner.has_room()
+        await runner.submit("audio", {}, "a")
+        assert not await runner.has_room()
+        with pytest.raises(PoolBusy):
+            await runner.submit("audio", {}, "b")
+
+    asyncio.run(go())
+
+
+def test_sqlite_fails_jobs_of_dead_processes(tmp_path):
+    import sqlite3
+    import subprocess
+    import sys
+
+    path = str(tmp_path / "jobs.db")
+    store = SqliteJobStore(path, ttl_sec=60)
+    upload = tmp_path / "upload.wav"
+    upload.write_bytes(b"x")
+    orphan = store.create("audio", {}, str(upload))
+    mine = store.create("audio", {}, "b")
+    waiting = store.create("audio", {}, "c")
+    store.claim(["audio"])
+    store.claim(["audio"])
+
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    db = sqlite3.connect(path, isolation_level=None)
+    db.execute("UPDATE jobs SET owner = ? WHERE id = ?", (dead.pid, orphan["id"]))
+    db.close()
+
+    store = SqliteJobStore(path, ttl_sec=60)  # reopen, as after a restart
+    job = store.get(orphan["id"])
+    assert job["status"] == "error"
+    assert job["expires_at"] is not None
+    assert not upload.exists()
+    assert store.get(mine["id"])["status"] == "running"  # this process is alive
+    assert store.get(waiting["id"])["status"] == "queued"
+    assert store.purge(now=job["expires_at"]) == 1
@@ -0,0 +1,56 @@
+from personalens.analyzers.segments import WindowedTimeline, grid_windows
+from personalens.analyzers.video_shift import build_segments
+
+# Window k starts at exactly k * hop. The builder before the shared grid
+# accumulated t0 += hop, which drifts for hops that are not exact in binary
+# (0.1, 0.7, ...), so segment counts and frame membership differ from it there.
+
+
+def test_grid_starts_are_k_times_hop():
+    wins, nxt = grid_windows(4.0, 0.4, 0.1, final=True, tail=True)
+    assert [t0 for t0, _ in wins] == [k * 0.1 for k in range(41)]
+    assert [t1 for _, t1 in wins] == [k * 0.1 + 0.4 for k in range(41)]
+    assert nxt == 41
+
+
+def test_video_segments_on_k_times_hop_grid():
+    times = [i / 10 for i in range(41)]
+    segs = build_segments(times, 0.4, 0.1)
+    assert len(segs) == 41
+    # 6 * 0.1 == 0.6000000000000001, so the frame at 0.6 s falls before window 6
+    assert segs[6].t0 == 6 * 0.1
+    assert segs[6].frame_indices == [7, 8, 9]
+
+    # 10 * 0.7 == 7.0 exactly: a window starts at the last frame (the running sum overshot it)
+    times = [i / 10 for i in range(71)]
+    segs = build_segments(times, 1.4, 0.7)
+    assert len(segs) == 11
+    assert segs[-1].t0 == 10 * 0.7
+    assert segs[-1].frame_indices == [70]
+
+
+def test_incremental_close_matches_final_build_when_monotonic():
+    times = [i / 8 for i in range(200)]
+    tl = WindowedTimeline(4.0, 2.0)
+    got = []
+    for t in times:
+        tl.append(t)
+        got.extend(tl.close())
+    got.extend(tl.close(final=True))
+    assert [(s.t0, s.t1, s.frame_indices) for s in build_segments(times, 4.0, 2.0)] == got
+
+
+def test_out_of_order_timestamp_stops_early_closing():
+    times = [i / 8 for i in range(100)]
+    times.insert(60, times.pop(5))  # the frame at 0.625 s arrives late
+    tl = WindowedTimeline(4.0, 2.0)
+    early = []
+    for t in times:
+        tl.append(t)
+        early.extend(tl.close())
+    assert not tl.monotonic
+    tl.reopen()
+    rebuilt = tl.close(final=True)
+    assert [(s.t0, s.t1, s.frame_indices) for s in build_segments(times, 4.0, 2.0)] == rebuilt
+    assert 60 in rebuilt[0][2]  # the late frame's arrival index
+    assert early and 60 not in early[0][2]  # handed out before it arrived
@@ -0,0 +1,17 @@
+import json
+
+from fastapi.testclient import TestClient
+
+import main
+
+
+def test_jsonl_index_counts_records_not_blank_lines():
+    body = '\n"first"\n\n{"text": "second"}\n  \n{"oops": 1}\n"third"\n\n'
+    r = TestClient(main.app).post(
+        "/analyze/text/batch/jsonl", files={"file": ("t.jsonl", body.encode(), "application/x-ndjson")}
+    )
+    assert r.status_code == 200
+    rows = [json.loads(line) for line in r.text.splitlines() if line]
+    assert [row["index"] for row in rows] == [0, 1, 2, 3]
+    assert "error" not in rows[0] and "error" not in rows[1] and "error" not in rows[3]
+    assert rows[2]["error"].startswith("Line 6:")
@@ -0,0 +1,30 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from personalens.analyzers import text_embeddings as te
+
+
+def test_only_configured_models_are_allowed():
+    te.check_model_name(None)
+    te.check_model_name(te.allowed_models()[0])
+    with pytest.raises(ValueError):
+        te.check_model_name("someone/huge-model")
+    with pytest.raises(ValueError):
+        te.get_model("someone/huge-model")
+
+
+@pytest.mark.parametrize(
+    "path, body",
+    [
+        ("/analyze/text/ml", {"text": "hi"}),
+        ("/analyze/text/drift", {"texts": ["a", "b"]}),
+        ("/analyze/text/reasons", {"texts": ["a", "b"]}),
+        ("/analyze/text/clusters", {"texts": ["a", "b"]}),
+        ("/analyze/text/timeline", {"items": [{"date": "2024-01-01", "text": "a"}, {"date": "2024-01-02", "text": "b"}]}),
+    ],
+)
+def test_routes_reject_unknown_models(path, body):
+    r = TestClient(main.app).post(path, json={**body, "embedding_model": "someone/huge-model"})
+    assert r.status_code == 400
+    assert r.json()["ok"] is False
@@ -0,0 +1,45 @@
+import random
+import re
+
+from personalens.analyzers.text_signals import (
+    ABSOLUTES,
+    BUZZWORDS,
+    HEDGES,
+    count_lexicon_hits,
+    count_phrases,
+    normalize,
+)
+
+
+def _per_term(text, phrases):
+    # the original implementation: one \bphrase\b search per entry
+    t = normalize(text)
+    return sum(len(re.findall(r"\b" + re.escape(p) + r"\b", t)) for p in phrases)
+
+
+def _random_texts(n=300, seed=0):
+    rng = random.Random(seed)
+    vocab = BUZZWORDS + HEDGES + ABSOLUTES + [
+        "we", "shipped", "the", "team", "of", "3", "in", "q2", "-", ",", ".", "AI-driven", "Never!",
+        "maybe,", "mostly", "always-on", "leveraged", "e-mail", "100%", "(guaranteed)",
+    ]
+    for _ in range(n):
+        words = [rng.choice(vocab) for _ in range(rng.randint(0, 40))]
+        yield rng.choice([" ", "  ", "\n"]).join(w.upper() if rng.random() < 0.1 else w for w in words)
+
+
+def test_single_pass_matches_per_term_counts():
+    for text in _random_texts():
+        hits = count_lexicon_hits(text)
+        assert hits == {
+            "buzzword": _per_term(text, BUZZWORDS),
+            "hedge": _per_term(text, HEDGES),
+            "absolute": _per_term(text, ABSOLUTES),
+        }, text
+
+
+def test_count_phrases_matches_per_term_counts():
+    for text in _random_texts(seed=1):
+        for phrases in (BUZZWORDS, HEDGES, ABSOLUTES):
+            assert count_phrases(text, phrases) == _per_term(text, phrases), text
+    assert count_phrases("anything", []) == 0
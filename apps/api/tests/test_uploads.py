@@ -0,0 +1,29 @@
+import io
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+import main
+
+
+def _wav(seconds: float) -> bytes:
+    import soundfile as sf
+
+    t = np.arange(int(seconds * 16000)) / 16000.0
+    out = io.BytesIO()
+    sf.write(out, (0.1 * np.sin(2 * np.pi * 220 * t)).astype(np.float32), 16000, format="WAV")
+    return out.getvalue()
+
+
+def test_audio_route_reports_upload_and_analysis_peaks():
+    body = _wav(30.0)
+    r = TestClient(main.app).post(
+        "/analyze/audio/shift?use_embeddings=false", files={"file": ("a.wav", body, "audio/wav")}
+    )
+    assert r.status_code == 200
+    res = r.json()
+    assert res["upload"]["bytes"] == len(body)
+    # one body chunk is buffered at most once
+    assert 0 < res["upload"]["peakUploadBufferBytes"] <= len(body)
+    assert res["memory"]["uploadBufferPeakBytes"] == res["upload"]["peakUploadBufferBytes"]
+    assert res["memory"]["audioBufferPeakBytes"] > 0
@@ -0,0 +1,25 @@
+import pytest
+
+from personalens.analyzers import video_shift
+
+av = pytest.importorskip("av")
+
+
+@pytest.fixture(scope="module")
+def clip(tmp_path_factory):
+    from benchmarks.bench_sparse_decode import make_clip
+
+    path = str(tmp_path_factory.mktemp("video") / "clip.mp4")
+    make_clip(path, seconds=4, fps=24, size="64x48", gop=12, bframes=2)
+    return path
+
+
+def test_frame_buffer_peak_counts_both_buffers_while_growing(clip, monkeypatch):
+    monkeypatch.setattr(video_shift, "_expected_kept", lambda *a, **k: 1)  # force growth from one frame
+    frames, times, meta = video_shift.decode_video_to_frames(clip, target_fps=8.0, short_side=None)
+    frame_bytes = frames[0].nbytes
+    size, peak = 1, frame_bytes
+    while size < len(frames):
+        peak = max(peak, (size + 2 * size) * frame_bytes)
+        size *= 2
+    assert meta["frame_buffer_peak_mb"] == round(peak / (1024.0 * 1024.0), 2)
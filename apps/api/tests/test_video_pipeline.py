@@ -0,0 +1,59 @@
+import pytest
+
+from personalens.analyzers.video_shift import analyze_video_shift
+from personalens.model_registry import REGISTRY
+
+av = pytest.importorskip("av")
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+MODEL = "test/tiny-videomae"
+
+
+@pytest.fixture(scope="module")
+def tiny_videomae():
+    from personalens.analyzers.videomae_embedder import _VideoMAEBundle
+
+    torch.manual_seed(0)
+    cfg = transformers.VideoMAEConfig(
+        image_size=32, patch_size=16, num_frames=4, hidden_size=32,
+        num_hidden_layers=1, num_attention_heads=2, intermediate_size=64,
+    )
+    bundle = _VideoMAEBundle(
+        processor=transformers.VideoMAEImageProcessor(
+            size={"shortest_edge": 32}, crop_size={"height": 32, "width": 32}
+        ),
+        model=transformers.VideoMAEModel(cfg).eval(),
+        device=torch.device("cpu"),
+    )
+    REGISTRY.get("video", MODEL, lambda: bundle, device="cpu")
+    yield MODEL
+    REGISTRY.evict("video", MODEL, device="cpu")
+
+
+@pytest.fixture(scope="module")
+def clip(tmp_path_factory):
+    from benchmarks.bench_sparse_decode import make_clip
+
+    path = str(tmp_path_factory.mktemp("video") / "clip.mp4")
+    make_clip(path, seconds=8, fps=24, size="64x48", gop=12, bframes=2)
+    return path
+
+
+def _analyze(clip, model, **kwargs):
+    res = analyze_video_shift(
+        clip, model_name=model, frames_per_segment=4, window_sec=2.0, hop_sec=1.0,
+        baseline_sec=4.0, short_side=None, **kwargs,
+    )
+    assert res["ok"], res
+    return res
+
+
+@pytest.mark.parametrize("batch,queue", [(4, 8), (8, 128), (1, 128), (8, 1)])
+def test_result_does_not_depend_on_batch_or_queue_size(clip, tiny_videomae, batch, queue):
+    ref = _analyze(clip, tiny_videomae, embed_batch_size=1, decode_queue_frames=1)
+    res = _analyze(clip, tiny_videomae, embed_batch_size=batch, decode_queue_frames=queue)
+    assert res["summary"]["totalSegments"] > 3
+    for key in ("segments", "summary", "baseline"):
+        assert res[key] == ref[key]
+    assert res["meta"]["kept_frames"] == ref["meta"]["kept_frames"]
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from personalens.analyzers.video_shift import decode_video_to_frames
+from personalens.workers import shutdown_shard_executor
+
+av = pytest.importorskip("av")
+
+
+@pytest.fixture(scope="module")
+def clip(tmp_path_factory):
+    from benchmarks.bench_sparse_decode import make_clip
+
+    path = str(tmp_path_factory.mktemp("video") / "clip.mp4")
+    make_clip(path, seconds=6, fps=24, size="64x48", gop=12, bframes=2)
+    return path
+
+
+@pytest.fixture
+def shard_workers(monkeypatch):
+    monkeypatch.setenv("PERSONALENS_SHARD_WORKERS_MAX", "2")
+    yield 2
+    shutdown_shard_executor()
+
+
+@pytest.mark.parametrize("target_fps,short_side", [(8.0, None), (5.0, 32)])
+def test_sharded_decode_matches_sequential(clip, shard_workers, target_fps, short_side):
+    frames, times, meta = decode_video_to_frames(clip, target_fps=target_fps, short_side=short_side)
+    s_frames, s_times, s_meta = decode_video_to_frames(
+        clip, target_fps=target_fps, short_side=short_side, workers=shard_workers
+    )
+    assert s_meta["decode_workers"] == shard_workers and s_meta["shards"] > 1
+    assert s_times == times
+    assert s_frames.shape == frames.shape
+    assert np.array_equal(s_frames, frames)
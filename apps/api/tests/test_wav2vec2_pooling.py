@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from personalens.analyzers.wav2vec2_embedder import embed_segments_wav2vec2
+from personalens.model_registry import REGISTRY
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+MODEL = "test/tiny-wav2vec2"
+
+
+@pytest.fixture(scope="module")
+def tiny_wav2vec2():
+    # layer-norm variant: takes an attention mask, so padding leaves the
+    # frames of shorter clips unchanged and only the pooling can differ
+    torch.manual_seed(0)
+    cfg = transformers.Wav2Vec2Config(
+        hidden_size=32, num_hidden_layers=2, num_attention_heads=2, intermediate_size=64,
+        conv_dim=(32,) * 7, feat_extract_norm="layer", do_stable_layer_norm=True,
+        num_conv_pos_embeddings=16, num_conv_pos_embedding_groups=4,
+    )
+    model = transformers.Wav2Vec2Model(cfg).eval()
+    processor = transformers.Wav2Vec2FeatureExtractor(return_attention_mask=True)
+    REGISTRY.get("audio", MODEL, lambda: (processor, model, torch.device("cpu")), device="cpu")
+    yield MODEL
+    REGISTRY.evict("audio", MODEL, device="cpu")
+
+
+def test_padded_clip_embeds_like_it_does_alone(tiny_wav2vec2):
+    rng = np.random.default_rng(0)
+    short, long = rng.standard_normal(8000).astype(np.float32), rng.standard_normal(24000).astype(np.float32)
+
+    alone, _ = embed_segments_wav2vec2([short], model_name=tiny_wav2vec2)
+    padded, _ = embed_segments_wav2vec2([short, long], model_name=tiny_wav2vec2, bucket_by_length=False)
+    long_alone, _ = embed_segments_wav2vec2([long], model_name=tiny_wav2vec2)
+
+    np.testing.assert_allclose(padded[0], alone[0], atol=1e-5)
+    np.testing.assert_allclose(padded[1], long_alone[0], atol=1e-5)
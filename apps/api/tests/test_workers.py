@@ -0,0 +1,43 @@
+import asyncio
+import io
+import time
+
+import pytest
+
+from personalens.workers import MediaPool, PoolBusy
+
+
+def _slow(src, seconds=0.3):
+    time.sleep(seconds)
+    return {"ok": True, "read": src.read()}
+
+
+def test_cancelled_caller_keeps_slot_until_work_ends():
+    pool = MediaPool("test", mode="thread", workers=1, max_pending=1)
+    done = []
+
+    async def go():
+        caller = asyncio.ensure_future(pool.run(_slow, io.BytesIO(b"x"), on_done=lambda: done.append(1)))
+        await asyncio.sleep(0.05)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+
+        # still running: the slot is taken and the upload must stay open
+        assert pool.stats()["pending"] == 1
+        assert done == []
+        with pytest.raises(PoolBusy):
+            await pool.run(_slow, io.BytesIO(b"y"))
+
+        for _ in range(100):
+            if done:
+                break
+            await asyncio.sleep(0.02)
+        assert done == [1]
+        assert pool.stats()["pending"] == 0
+        assert (await pool.run(_slow, io.BytesIO(b"z"), seconds=0))["read"] == b"z"
+
+    try:
+        asyncio.run(go())
+    finally:
+        pool.shutdown()